@@ -0,0 +1,206 @@
+"""
+This file will contain the asyncio based scaling engine which
+reconciles many namespace/deployment targets at once.
+
+Every target runs on its own tick, and a semaphore bounds how many
+reconciles talk to the API server at the same time, so one slow
+workload no longer delays the scaling decisions of the others. A tick
+is the cls: Scaling_Loop() tick of the controller, and a
+namespace/deployment target only counts and measures its own Pods.
+
+Usage:
+    python async_scaler.py my-app-namespace other-namespace/other-deployment
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Optional
+
+from controller_metrics import Metrics_Server, record_reconcile_error
+from forecasting import Forecaster, make_forecaster
+from k8s_controller import K8s_Controller
+from metric_sources import Metric_Source, Metrics_Server_Source, make_metric_source
+from scaling_loop import Scaling_Loop
+from scaling_policy import Policy_Engine, Scaling_Policy, load_policies
+
+
+class Scale_Target:
+    """One namespace/deployment pair reconciled by the engine."""
+
+    def __init__(self, namespace: str, deployment_name: Optional[str] = None,
+                 target_cpu: int = 50, interval: float = 1.0,
+                 min_replicas: int = 1,
+                 forecaster: Optional[Forecaster] = None,
+                 startup_time: float = 10.0,
+                 policy: Optional[Scaling_Policy] = None,
+                 metric_source: Optional[Metric_Source] = None):
+        """
+        :param namespace: Namespace of the Deployment.
+        :param deployment_name: Name of the Deployment, looked up when None.
+        :param target_cpu: Desired avg CPU usage of the pods in millicores.
+        :param interval: Seconds between two reconciles of this target.
+        :param min_replicas: Lowest replica count the engine scales to.
+        :param forecaster: cls: Forecaster() for predictive scaling,
+                           None to scale on the current CPU usage only.
+        :param startup_time: Seconds a new pod needs, the forecast horizon.
+        :param policy: cls: Scaling_Policy() of this Deployment, by default
+                       one built from target_cpu and min_replicas.
+        :param metric_source: cls: Metric_Source() to scale on, by default
+                              the CPU usage from metrics-server. The
+                              target_cpu is then the target of that metric.
+        """
+        self.namespace = namespace
+        self.deployment_name = deployment_name
+        self.target_cpu = target_cpu
+        self.interval = interval
+        self.min_replicas = min_replicas
+        self.forecaster = forecaster
+        self.startup_time = startup_time
+        self.metric_source = metric_source
+        self.policy_engine = Policy_Engine(
+            policy or Scaling_Policy(target_cpu=target_cpu, min_replicas=min_replicas))
+
+        self.scaling_loop = None  # Set by cls: Async_Scaling_Engine()
+        self.reconcile_count = 0
+        self.scale_count = 0
+        self.error_count = 0
+        self.last_desired = None
+
+    @classmethod
+    def parse(cls, value: str, **kwargs) -> 'Scale_Target':
+        """:param value: 'namespace' or 'namespace/deployment'"""
+        namespace, _, deployment_name = value.partition('/')
+        return cls(namespace, deployment_name or None, **kwargs)
+
+    def __repr__(self):
+        return f"Scale_Target({self.namespace}/{self.deployment_name})"
+
+
+class Async_Scaling_Engine:
+    """This class runs one reconcile loop per cls: Scale_Target()."""
+
+    def __init__(self, k8s_controller: K8s_Controller, targets: list,
+                 max_concurrency: int = 8):
+        """
+        :param k8s_controller: Long lived controller shared by all targets.
+        :param targets: List of cls: Scale_Target().
+        :param max_concurrency: Max reconciles running at the same time.
+        """
+        self.k8s_controller = k8s_controller
+        self.targets = targets
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self._stopped = None
+
+        for target in targets:
+            target.scaling_loop = Scaling_Loop(
+                k8s_controller, target.metric_source or Metrics_Server_Source(k8s_controller),
+                target.policy_engine, target.namespace, target.deployment_name,
+                target.forecaster, target.startup_time)
+
+    def _reconcile_sync(self, target: Scale_Target) -> int:
+        """Blocking reconcile of one target, run in a worker thread."""
+        scaling_loop = target.scaling_loop
+        scaling_loop.tick()
+
+        target.deployment_name = scaling_loop.deployment_name
+        target.scale_count = scaling_loop.scale_count
+        return scaling_loop.last_decision.desired
+
+    async def reconcile(self, target: Scale_Target) -> Optional[int]:
+        """
+        Reconcile one target while holding a concurrency slot.
+
+        :return: Desired replica count of the policy or None on an error.
+        """
+        async with self._semaphore:
+            try:
+                desired = await asyncio.to_thread(self._reconcile_sync, target)
+            except Exception as e:
+                # API errors, transport errors (urllib3 MaxRetryError,
+                # connection resets), Metric_Unavailable... only fail
+                # this target, the others keep being scaled.
+                target.error_count += 1
+                record_reconcile_error(target.namespace, e)
+                print(f"{target}: exception occurred: {e!r}")
+                return None
+
+        target.reconcile_count += 1
+        target.last_desired = desired
+        return desired
+
+    async def _run_target(self, target: Scale_Target) -> None:
+        """Tick loop of a single target."""
+        while not self._stopped.is_set():
+            started = time.monotonic()
+            await self.reconcile(target)
+
+            # Sleep the rest of the interval, or until stop()
+            remaining = target.interval - (time.monotonic() - started)
+            try:
+                await asyncio.wait_for(self._stopped.wait(), max(0.0, remaining))
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self, duration: Optional[float] = None) -> None:
+        """
+        Reconcile all targets until stop() is called.
+
+        :param duration: Optional seconds after which the engine stops.
+        """
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._stopped = asyncio.Event()
+
+        tasks = [asyncio.create_task(self._run_target(target))
+                 for target in self.targets]
+        if duration is not None:
+            asyncio.get_running_loop().call_later(duration, self._stopped.set)
+
+        await asyncio.gather(*tasks)
+
+    def stop(self) -> None:
+        if self._stopped is not None:
+            self._stopped.set()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scale many Deployments concurrently.')
+    parser.add_argument('targets', nargs='+',
+                        help="'namespace' or 'namespace/deployment'")
+    parser.add_argument('--target-cpu', type=int, default=50)
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--max-concurrency', type=int, default=8)
+    parser.add_argument('--forecaster', choices=('none', 'last', 'holt', 'linear'),
+                        default='none', help='Forecaster of the predictive mode')
+    parser.add_argument('--startup-time', type=float, default=10.0)
+    parser.add_argument('--policy-file',
+                        help="JSON file of {'namespace/deployment': policy options}")
+    parser.add_argument('--metric-source', choices=('metrics-server', 'pod-stats'),
+                        default='metrics-server',
+                        help='pod-stats scales on the /stats of the Pods, '
+                             '--target-cpu is then the target per Pod')
+    parser.add_argument('--metrics-port', type=int, default=9100,
+                        help='Port of the Prometheus /metrics endpoint, 0 to disable')
+    args = parser.parse_args()
+    policies = load_policies(args.policy_file) if args.policy_file else {}
+
+    k8s_controller = K8s_Controller()
+    k8s_controller.start_informers(nodes=True)
+    if args.metrics_port:
+        Metrics_Server(port=args.metrics_port).start()
+
+    targets = [Scale_Target.parse(
+        value, target_cpu=args.target_cpu, interval=args.interval,
+        forecaster=None if args.forecaster == 'none' else make_forecaster(args.forecaster),
+        startup_time=args.startup_time, policy=policies.get(value),
+        metric_source=(None if args.metric_source == 'metrics-server'
+                       else make_metric_source(args.metric_source, k8s_controller)))
+        for value in args.targets]
+    engine = Async_Scaling_Engine(k8s_controller, targets, args.max_concurrency)
+
+    print('Running at...')
+    try:
+        asyncio.run(engine.run())
+    except KeyboardInterrupt:
+        k8s_controller.stop_informers()
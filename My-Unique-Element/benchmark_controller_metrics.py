@@ -0,0 +1,37 @@
+"""
+Benchmark of the overhead which the controller metrics add to the
+scaling loop: one stage() timer and one labelled Counter increment per
+call, measured in microseconds.
+
+Usage:
+    python benchmark_controller_metrics.py --calls 100000 --repeat 5
+"""
+
+import argparse
+import timeit
+
+from controller_metrics import API_CALLS, stage
+
+
+def time_stage() -> None:
+    with stage('benchmark'):
+        pass
+
+
+def count_call() -> None:
+    API_CALLS.labels('benchmark').inc()
+
+
+def run(calls: int, repeat: int) -> None:
+    print(f"{calls} calls, best of {repeat} runs")
+    for func in (time_stage, count_call):
+        best = min(timeit.repeat(func, number=calls, repeat=repeat))
+        print(f"  {func.__name__:<12} {best / calls * 1_000_000:8.2f} us per call")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--calls', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.calls, args.repeat)
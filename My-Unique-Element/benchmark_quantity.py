@@ -0,0 +1,94 @@
+"""
+Benchmark of the quantity parser against the per-string loops it
+replaced, on a generated metrics.k8s.io payload. Each pair computes the
+same result and the run fails when the new path is not faster.
+
+Usage:
+    python benchmark_quantity.py --pods 10000 --repeat 20
+"""
+
+import argparse
+import random
+import timeit
+
+from quantity import container_cpu, cpu_to_millicores, memory_to_bytes, parse_pod_metrics
+
+
+def make_payload(n_pods: int, containers: int = 1) -> list:
+    """:return: 'items' of a PodMetricsList with n_pods pods."""
+    rnd = random.Random(0)
+    return [{
+        'metadata': {'name': f'my-app-deployment-{i}', 'namespace': 'my-app-namespace'},
+        'containers': [{'name': f'c{c}',
+                        'usage': {'cpu': f'{rnd.randint(1, 100_000_000)}n',
+                                  'memory': f'{rnd.randint(10_000, 80_000)}Ki'}}
+                       for c in range(containers)],
+    } for i in range(n_pods)]
+
+
+def legacy_controller_average(items: list) -> float:
+    """Branch chain and average of the old K8s_Controller.pod_cpu_usage()."""
+    pod_cpu_usage = {}
+    for pod in items:
+        total_cpu = 0
+        for container in pod["containers"]:
+            cpu_usage = container["usage"]["cpu"]
+            if cpu_usage.endswith("n"):
+                total_cpu += int(cpu_usage[:-1]) / 1_000_000
+            elif cpu_usage.endswith("u"):
+                total_cpu += int(cpu_usage[:-1]) / 1_000
+            elif cpu_usage.endswith("m"):
+                total_cpu += int(cpu_usage[:-1])
+            else:
+                total_cpu += int(cpu_usage) * 1_000
+        pod_cpu_usage[pod["metadata"]["name"]] = total_cpu
+
+    cpu_sum = 1
+    for pod, cpu in pod_cpu_usage.items():
+        cpu_sum += cpu
+    return cpu_sum // len(pod_cpu_usage)
+
+
+def controller_average(items: list) -> float:
+    """CPU average of the current K8s_Controller.pod_cpu_usage()."""
+    return (1 + float(container_cpu(items).sum())) // len(items)
+
+
+def per_string_pod_usage(items: list) -> tuple:
+    """cpu_to_millicores() and memory_to_bytes() called for every container."""
+    names, cpu, memory = [], [], []
+    for pod in items:
+        names.append(pod['metadata']['name'])
+        cpu.append(sum(cpu_to_millicores(c['usage']['cpu']) for c in pod['containers']))
+        memory.append(sum(memory_to_bytes(c['usage']['memory']) for c in pod['containers']))
+    return names, cpu, memory
+
+
+def run(n_pods: int, repeat: int) -> None:
+    """:raise AssertionError: When a new path is not faster than the loop it replaced."""
+    items = make_payload(n_pods)
+    # (what, legacy loop, new path), each pair computes the same result
+    cases = [
+        ('CPU average of the pods', legacy_controller_average, controller_average),
+        ('CPU and memory of each pod', per_string_pod_usage, parse_pod_metrics),
+    ]
+
+    print(f"{n_pods} pods, best of {repeat} runs")
+    slower = []
+    for what, legacy, new in cases:
+        legacy_best, new_best = (min(timeit.repeat(lambda: func(items), number=1, repeat=repeat))
+                                 for func in (legacy, new))
+        print(f"  {what:<28} {legacy.__name__:<28} {legacy_best * 1_000:8.2f} ms")
+        print(f"  {'':<28} {new.__name__:<28} {new_best * 1_000:8.2f} ms")
+        if new_best >= legacy_best:
+            slower.append(what)
+    if slower:
+        raise AssertionError(f"The new path is not faster for: {', '.join(slower)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pods', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    run(args.pods, args.repeat)
@@ -0,0 +1,463 @@
+"""
+This file will contain the benchmark runner of the scaler, which runs a
+whole comparison load test in one process instead of four terminals:
+
+- the app (app/main.py) in one uvicorn process per Pod on its own port
+  of 127.0.0.1, started and stopped to follow the replicas of a
+  cls: Fake_Cluster(). Their CPU usage is read from /proc, or with
+  psutil where there is no /proc (macOS);
+- the scaling tick of real_time_dynamic_pod_scaler_controller.py
+  (cls: Scaling_Loop()) against the cls: Fake_Api_Server() of that cluster;
+- the asyncio load generator with the stages of the k6 scripts.
+
+Each run writes a results bundle (summary.json, requests.csv and
+timeline.csv) tagged with the git commit, and two bundles are compared
+to catch regressions of the latency or of the scale up speed.
+
+Usage:
+    python benchmark_runner.py run --profile comparison --time-scale 0.25 --vu-scale 0.1
+    python benchmark_runner.py compare results/<old bundle> results/<new bundle>
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from fake_api_server import Fake_Api_Server, Fake_Cluster
+from forecasting import make_forecaster
+from k8s_controller import K8s_Controller
+from kube_client import Kube_Client
+from load_analytics import Load_Test_Analyzer
+from load_generator import Load_Generator
+from metric_sources import Metric_Unavailable, Metrics_Server_Source, Pod_Stats_Source
+from metrics_recorder import Metrics_Recorder
+from poll_scheduler import RETRY_EXCEPTIONS, Poll_Scheduler
+from scaling_loop import Scaling_Loop
+from scaling_policy import Policy_Engine, Scaling_Policy
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+# Stages (duration seconds, VUs) of the k6 scripts in Testing/
+PROFILES = {
+    'comparison': [(30, 100), (180, 400), (30, 100)],  # comparison_load_test.js
+    'hpa': [(60, 100), (180, 100), (1, 0)],            # load_test_hpa.js
+    'real-time-hpa': [(30, 20), (60, 20), (30, 0)],    # load_test_real_time_hpa.js
+}
+
+# Metrics compared between two bundles, a higher value is worse
+COMPARED_METRICS = (
+    ('latency', 'p50'),
+    ('latency', 'p95'),
+    ('latency', 'p99'),
+    ('latency', 'failure_rate'),
+    ('scaling', 'reaction_time'),
+    ('scaling', 'scale_up_latency'),
+)
+
+NAMESPACE = 'my-app-namespace'
+DEPLOYMENT = 'my-app-deployment'
+
+
+class Benchmark_Config(NamedTuple):
+    profile: str = 'comparison'
+    stages: Optional[list] = None    # Overrides the stages of the profile
+    time_scale: float = 1.0          # Factor of the stage durations
+    vu_scale: float = 1.0            # Factor of the stage VUs
+    think_time: float = 1.0          # Seconds between two requests of a VU
+    metric_source: str = 'metrics-server'
+    forecaster: str = 'holt'         # 'last', 'holt', 'linear' or 'none'
+    pod_startup_time: float = 10.0   # Forecast horizon in seconds
+    target_value: float = 50.0       # Millicores, or in-flight requests for pod-stats
+    min_replicas: int = 1
+    max_replicas: int = 8
+    startup_delay: float = 0.0       # Seconds before a started Pod may become Ready
+    scale_down_stabilization: float = 60.0
+    min_interval: float = 1.0
+    max_interval: float = 10.0
+    window: float = 10.0             # Seconds of the analytics windows
+    execution_mode: str = 'threadpool'
+    kernel: str = 'python'
+    seed: int = 0
+    results_dir: str = 'results'
+
+    def scaled_stages(self) -> list:
+        stages = self.stages or PROFILES[self.profile]
+        return [(duration * self.time_scale, max(0, round(vus * self.vu_scale)))
+                for duration, vus in stages]
+
+
+def process_cpu_seconds(pid: int) -> Optional[float]:
+    """:return: User + system CPU seconds of a process, None if unknown."""
+    try:
+        with open(f'/proc/{pid}/stat') as file:
+            fields = file.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS  # utime + stime
+    except OSError:
+        pass
+    if psutil is not None:
+        try:
+            times = psutil.Process(pid).cpu_times()
+            return times.user + times.system
+        except psutil.Error:
+            pass
+    return None
+
+
+def cpu_measurable() -> bool:
+    """:return: True when the CPU usage of the App_Pods can be read."""
+    return process_cpu_seconds(os.getpid()) is not None
+
+
+class App_Pod:
+    """One uvicorn process of the app standing in for a Pod."""
+
+    def __init__(self, host: str, port: int, env: dict):
+        self.host = host
+        self.port = port
+        self.created = time.monotonic()
+        self.ready = False
+        self._last_cpu = (self.created, 0.0)
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'app.main:app', '--host', host,
+             '--port', str(port), '--log-level', 'warning'],
+            cwd=REPO_ROOT, env={**os.environ, **env})
+
+    def check_ready(self) -> bool:
+        """Probe /readyz until it answers once."""
+        if not self.ready and self.process.poll() is None:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=0.5)
+            try:
+                connection.request('GET', '/readyz')
+                self.ready = connection.getresponse().status == 200
+                if self.ready:
+                    self.cpu_millicores()  # The start-up CPU is not usage
+            except OSError:
+                pass
+            finally:
+                connection.close()
+        return self.ready
+
+    def cpu_millicores(self) -> Optional[float]:
+        """:return: CPU usage since the previous call, None if unknown."""
+        cpu_seconds = process_cpu_seconds(self.process.pid)
+        if cpu_seconds is None:
+            return None
+        now = time.monotonic()
+        last_time, last_cpu = self._last_cpu
+        self._last_cpu = (now, cpu_seconds)
+        return max(0.0, (cpu_seconds - last_cpu) / max(now - last_time, 1e-3) * 1000)
+
+    def stop(self) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class Local_Deployment:
+    """
+    Keeps the App_Pods in line with the replicas of a Deployment of the
+    fake cluster, and reports their readiness and CPU usage to it.
+    """
+
+    def __init__(self, cluster: Fake_Cluster, namespace: str, name: str,
+                 env: Optional[dict] = None, startup_delay: float = 0.0,
+                 host: str = '127.0.0.1'):
+        """:param host: Address of every Pod, each Pod gets a free port."""
+        self.cluster = cluster
+        self.namespace = namespace
+        self.name = name
+        self.host = host
+        self.env = env or {}
+        self.startup_delay = startup_delay
+        self.pods = []
+        self.targets = ()  # (host, port) of the Ready Pods, replaced atomically
+        self.timeline = []  # (POSIX time, replicas, Ready Pods, avg CPU millicores)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def reconcile(self) -> int:
+        """:return: Number of Ready Pods."""
+        replicas = self.cluster.replicas(self.namespace, self.name)
+        while len(self.pods) < replicas:
+            self.pods.append(App_Pod(self.host, free_port(self.host), self.env))
+        while len(self.pods) > replicas:
+            self.pods.pop().stop()
+
+        # Pod i is Running when the Pods before it are, like Fake_Cluster
+        now = time.monotonic()
+        ready = 0
+        for pod in self.pods:
+            if now - pod.created < self.startup_delay or not pod.check_ready():
+                break
+            ready += 1
+
+        cpu = [pod.cpu_millicores() for pod in self.pods[:ready]]
+        if None in cpu:
+            self.cluster.set_pods(self.namespace, self.name, ready)
+        else:
+            self.cluster.set_pods(self.namespace, self.name, ready,
+                                  [f'{round(value)}m' for value in cpu])
+        self.targets = tuple((pod.host, pod.port) for pod in self.pods[:ready])
+        self.timeline.append((time.time(), replicas, ready,
+                              float(np.mean(cpu)) if cpu and None not in cpu else float('nan')))
+        return ready
+
+    def wait_ready(self, timeout: float = 30.0) -> None:
+        deadline = time.monotonic() + timeout
+        while self.reconcile() < self.cluster.replicas(self.namespace, self.name):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"The Pods of {self.name} are not Ready after {timeout}s.")
+            time.sleep(0.1)
+
+    def start(self, interval: float = 0.5) -> 'Local_Deployment':
+        def run():
+            while not self._stopped.wait(interval):
+                self.reconcile()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        for pod in self.pods:
+            pod.stop()
+        self.pods = []
+
+
+def scale_up_latencies(decisions: list, timeline: list) -> list:
+    """
+    :param decisions: cls: Decision() of the scaler ticks.
+    :param timeline: (time, replicas, Ready Pods, ...) samples.
+    :return: Seconds from each patch scaling up until as many Pods
+             were Ready, for the patches that got there. The ticks
+             repeating a scale up while the Pods start are not counted.
+    """
+    latencies = []
+    for decision in decisions:
+        if decision.patched is None or decision.patched <= decision.current:
+            continue
+        for later, _, ready, *_ in timeline:
+            if later >= decision.timestamp and ready >= decision.patched:
+                latencies.append(later - decision.timestamp)
+                break
+    return latencies
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def free_port(host: str = '127.0.0.1') -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class Local_Pod_Stats_Source(Pod_Stats_Source):
+    """Scrapes the Ready App_Pods of a cls: Local_Deployment()."""
+
+    def __init__(self, deployment: Local_Deployment, **kwargs):
+        super().__init__(None, **kwargs)
+        self.deployment = deployment
+
+    def pod_addresses(self, namespace: str, deployment_name: Optional[str] = None) -> list:
+        return [f'{host}:{port}' for host, port in self.deployment.targets]
+
+
+def run_benchmark(config: Benchmark_Config) -> str:
+    """
+    Run one benchmark and write its results bundle.
+
+    :return: Directory of the bundle.
+    """
+    if config.metric_source not in ('metrics-server', 'pod-stats'):
+        raise ValueError(f"Unknown metric source '{config.metric_source}'.")
+    if config.metric_source == 'metrics-server' and not cpu_measurable():
+        raise RuntimeError("The CPU usage of the Pods cannot be read without /proc, "
+                           "install psutil or use --metric-source pod-stats.")
+
+    cluster = Fake_Cluster()
+    cluster.add_deployment(NAMESPACE, DEPLOYMENT, config.min_replicas)
+    server = Fake_Api_Server(cluster).start()
+    fd, config_file = tempfile.mkstemp(suffix='.kubeconfig')
+    os.close(fd)
+    server.write_kubeconfig(config_file)
+
+    deployment = Local_Deployment(cluster, NAMESPACE, DEPLOYMENT,
+                                  {'EXECUTION_MODE': config.execution_mode, 'KERNEL': config.kernel},
+                                  config.startup_delay)
+    k8s_controller = K8s_Controller(Kube_Client(config_file))
+    if config.metric_source == 'metrics-server':
+        metric_source = Metrics_Server_Source(k8s_controller)
+    else:
+        metric_source = Local_Pod_Stats_Source(deployment)
+    policy_engine = Policy_Engine(Scaling_Policy(
+        target_cpu=config.target_value, min_replicas=config.min_replicas,
+        max_replicas=config.max_replicas,
+        scale_down_stabilization=config.scale_down_stabilization))
+    forecaster = make_forecaster(config.forecaster) if config.forecaster != 'none' else None
+    scheduler = Poll_Scheduler(config.min_interval, config.max_interval,
+                               retry_exceptions=RETRY_EXCEPTIONS + (Metric_Unavailable,))
+
+    # The same tick as real_time_dynamic_pod_scaler_controller.py
+    scaling_loop = Scaling_Loop(k8s_controller, metric_source, policy_engine, NAMESPACE,
+                                DEPLOYMENT, forecaster, config.pod_startup_time,
+                                keep_decisions=True)
+
+    load_generator = Load_Generator(lambda: deployment.targets, config.scaled_stages(),
+                                    url='Real-Time-HPA', think_time=config.think_time,
+                                    seed=config.seed)
+    scaler = threading.Thread(target=scheduler.run, args=(scaling_loop.tick,), daemon=True)
+    try:
+        deployment.wait_ready()
+        deployment.start()
+        load_start = time.time()
+        scaler.start()
+        records = asyncio.run(load_generator.run())
+    finally:
+        scheduler.stop()
+        if scaler.is_alive():
+            scaler.join()
+        deployment.stop()
+        server.stop()
+        os.remove(config_file)
+        if hasattr(metric_source, 'close'):
+            metric_source.close()
+
+    return write_bundle(config, load_start, records, deployment.timeline, scaling_loop.decisions)
+
+
+def write_bundle(config: Benchmark_Config, load_start: float, records: list,
+                 timeline: list, decisions: list) -> str:
+    commit = git_commit()
+    name = f"{config.profile}-{commit[:8]}-{datetime.now().strftime('%Y%m%dT%H%M%S')}"
+    directory = os.path.join(config.results_dir, name)
+    os.makedirs(directory, exist_ok=True)
+
+    analyzer = Load_Test_Analyzer(config.window)
+    if records:
+        analyzer.add_requests([record.timestamp for record in records],
+                              [record.url for record in records],
+                              [record.http_req_duration for record in records],
+                              [record.http_req_failed for record in records])
+    for moment, _, ready, _ in timeline:
+        analyzer.add_pod_sample(moment, 'Real-Time-HPA', ready)
+
+    latencies = scale_up_latencies(decisions, timeline)
+    timeline = [sample for sample in timeline if sample[0] >= load_start]
+    scale_ups = [decision.timestamp - load_start for decision in decisions
+                 if decision.patched is not None and decision.patched > decision.current]
+    totals = analyzer.summary().get('Real-Time-HPA', {})
+    summary = {
+        'config': config._asdict(),
+        'environment': {'commit': commit, 'python': platform.python_version(),
+                        'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'latency': {key: totals.get(key) for key in
+                    ('requests', 'throughput', 'failure_rate', 'mean', 'p50', 'p95', 'p99')},
+        'scaling': {
+            'reaction_time': scale_ups[0] if scale_ups else None,
+            'scale_up_latency': float(np.mean(latencies)) if latencies else None,
+            'scale_up_latencies': latencies,
+            'max_replicas': max((replicas for _, replicas, _, _ in timeline), default=0),
+            'pod_seconds': totals.get('pod_seconds'),
+            'decisions': len(decisions),
+        },
+        'windows': analyzer.report(),
+    }
+    with open(os.path.join(directory, 'summary.json'), 'w') as file:
+        json.dump(summary, file, indent=2, default=float)
+
+    with Metrics_Recorder(os.path.join(directory, 'requests.csv'),
+                          ['timestamp', 'url', 'vus', 'http_req_duration', 'http_req_failed']) as recorder:
+        for record in records:
+            recorder.append(list(record))
+    with Metrics_Recorder(os.path.join(directory, 'timeline.csv'),
+                          ['seconds', 'replicas', 'ready', 'cpu_millicores']) as recorder:
+        for moment, replicas, ready, cpu in timeline:
+            recorder.append([round(moment - load_start, 3), replicas, ready, round(cpu, 1)])
+    return directory
+
+
+def compare_bundles(old_directory: str, new_directory: str, tolerance: float = 0.1) -> list:
+    """
+    :param tolerance: Relative increase above which a metric regressed.
+    :return: (metric, old value, new value, regressed) of the compared metrics.
+    """
+    summaries = []
+    for directory in (old_directory, new_directory):
+        with open(os.path.join(directory, 'summary.json')) as file:
+            summaries.append(json.load(file))
+
+    result = []
+    for section, key in COMPARED_METRICS:
+        old, new = summaries[0][section].get(key), summaries[1][section].get(key)
+        if old is None or new is None:
+            regressed = old is not None and new is None and section == 'scaling'
+        else:
+            regressed = new > old * (1 + tolerance) and new - old > 1e-9
+        result.append((f'{section}.{key}', old, new, regressed))
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run a benchmark and write its bundle')
+    for field, default in Benchmark_Config._field_defaults.items():
+        if field == 'stages':
+            continue
+        option = '--' + field.replace('_', '-')
+        if field == 'profile':
+            run_parser.add_argument(option, choices=sorted(PROFILES), default=default)
+        else:
+            run_parser.add_argument(option, type=type(default), default=default)
+
+    compare_parser = commands.add_parser('compare', help='Compare two bundles')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        options = {key: value for key, value in vars(args).items() if key != 'command'}
+        bundle = run_benchmark(Benchmark_Config(**options))
+        with open(os.path.join(bundle, 'summary.json')) as summary_file:
+            bundle_summary = json.load(summary_file)
+        print(f"Results in {bundle}")
+        print(json.dumps({'latency': bundle_summary['latency'],
+                          'scaling': bundle_summary['scaling']}, indent=2))
+    else:
+        comparison = compare_bundles(args.old, args.new, args.tolerance)
+        for metric, old_value, new_value, regressed in comparison:
+            print(f"{metric:<28}{old_value!s:>22}{new_value!s:>22}  {'REGRESSION' if regressed else 'ok'}")
+        sys.exit(1 if any(regressed for *_, regressed in comparison) else 0)
@@ -0,0 +1,145 @@
+"""
+This file will contain the index of the schedulable capacity of the
+cluster, used by cls: K8s_Controller() to cap the scale ups.
+
+For every Node it keeps the allocatable CPU, memory and Pod slots and
+the sum of the requests of the Pods bound to it. The informers update
+it on each Node and Pod event (or it is filled from one LIST of each),
+so the number of Pods of a given size that still fit on the Nodes is
+known without any API call.
+"""
+
+import math
+import threading
+from typing import Optional
+
+from quantity import cpu_to_millicores, memory_to_bytes
+
+TERMINATED_PHASES = ('Succeeded', 'Failed')
+
+
+def pod_requests(pod_spec) -> tuple:
+    """
+    :param pod_spec: V1PodSpec of a Pod or of a Pod template.
+    :return: (CPU millicores, memory bytes) requested by the Pod, the
+             init containers run one at a time before the others.
+    """
+    def requests(containers) -> list:
+        result = []
+        for container in containers or ():
+            values = (container.resources.requests if container.resources else None) or {}
+            result.append((cpu_to_millicores(values.get('cpu', 0)),
+                           memory_to_bytes(values.get('memory', 0))))
+        return result
+
+    if pod_spec is None:
+        return 0.0, 0
+    containers = requests(pod_spec.containers)
+    init_containers = requests(pod_spec.init_containers)
+    cpu = max([sum(cpu for cpu, _ in containers)] + [cpu for cpu, _ in init_containers])
+    memory = max([sum(memory for _, memory in containers)] + [memory for _, memory in init_containers])
+    return cpu, memory
+
+
+def is_schedulable(node) -> bool:
+    """:return: False when the Node is cordoned or not Ready."""
+    if node.spec is not None and node.spec.unschedulable:
+        return False
+    for condition in (node.status.conditions if node.status else None) or ():
+        if condition.type == 'Ready':
+            return condition.status == 'True'
+    return True
+
+
+class Capacity_Index:
+    """Allocatable and requested resources per Node."""
+
+    def __init__(self):
+        self._allocatable = {}  # Node -> (CPU millicores, memory bytes, Pods)
+        self._requested = {}  # Node -> [CPU millicores, memory bytes, Pods]
+        self._pods = {}  # (namespace, name) -> (Node, CPU millicores, memory bytes)
+        self._lock = threading.Lock()
+
+    def reset_nodes(self) -> None:
+        with self._lock:
+            self._allocatable = {}
+
+    def reset_pods(self) -> None:
+        with self._lock:
+            self._requested = {}
+            self._pods = {}
+
+    def add_node(self, node) -> None:
+        if not is_schedulable(node):
+            self.remove_node(node)
+            return
+        allocatable = (node.status.allocatable if node.status else None) or {}
+        pods = allocatable.get('pods')
+        with self._lock:
+            self._allocatable[node.metadata.name] = (
+                cpu_to_millicores(allocatable.get('cpu', 0)),
+                memory_to_bytes(allocatable.get('memory', 0)),
+                int(pods) if pods is not None else math.inf)
+
+    def remove_node(self, node) -> None:
+        with self._lock:
+            self._allocatable.pop(node.metadata.name, None)
+
+    def add_pod(self, pod) -> None:
+        """Count the requests of a Pod bound to a Node until it terminates."""
+        node = pod.spec.node_name if pod.spec else None
+        if node is None or (pod.status is not None and pod.status.phase in TERMINATED_PHASES):
+            return
+        cpu, memory = pod_requests(pod.spec)
+        key = (pod.metadata.namespace, pod.metadata.name)
+        with self._lock:
+            self._remove_pod(key)
+            self._pods[key] = (node, cpu, memory)
+            requested = self._requested.setdefault(node, [0.0, 0, 0])
+            requested[0] += cpu
+            requested[1] += memory
+            requested[2] += 1
+
+    def remove_pod(self, pod) -> None:
+        with self._lock:
+            self._remove_pod((pod.metadata.namespace, pod.metadata.name))
+
+    def _remove_pod(self, key: tuple) -> None:
+        bound = self._pods.pop(key, None)
+        if bound is not None:
+            node, cpu, memory = bound
+            requested = self._requested[node]
+            requested[0] -= cpu
+            requested[1] -= memory
+            requested[2] -= 1
+
+    def has_nodes(self) -> bool:
+        return bool(self._allocatable)
+
+    def free(self) -> dict:
+        """:return: {Node: (free CPU millicores, free memory bytes, free Pod slots)}"""
+        with self._lock:
+            result = {}
+            for node, (cpu, memory, pods) in self._allocatable.items():
+                used_cpu, used_memory, used_pods = self._requested.get(node, (0.0, 0, 0))
+                result[node] = (cpu - used_cpu, memory - used_memory, pods - used_pods)
+            return result
+
+    def headroom(self, cpu: float, memory: int) -> Optional[int]:
+        """
+        :param cpu: CPU millicores requested by one Pod.
+        :param memory: Memory bytes requested by one Pod.
+        :return: Number of such Pods that fit on the schedulable Nodes,
+                 None when no Node is known or nothing limits it.
+        """
+        if not self.has_nodes():
+            return None
+        total = 0
+        for free_cpu, free_memory, free_pods in self.free().values():
+            fits = free_pods
+            if cpu > 0:
+                fits = min(fits, free_cpu // cpu)
+            if memory > 0:
+                fits = min(fits, free_memory // memory)
+            total += max(0, fits)
+        return int(total) if total != math.inf else None
@@ -0,0 +1,326 @@
+"""
+This file will contain the columnar storage of the load-test and scaling
+logs, for analysis over millions of rows.
+
+Rows are written in batches of typed columns to one directory per time
+partition (`<time column>=<partition start>/part-00000.<ext>`), as
+Parquet when pyarrow is installed and as compressed NumPy .npz files
+otherwise. Text columns of the 'category' type are stored as int32 codes
+of a dictionary shared by all the partitions (_categories.json).
+
+Usage:
+    python columnar_store.py ../Testing/metrics_logs.json k6_store --bucket 10 --q 95
+"""
+
+import argparse
+import csv
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+from forecast_replay import ENDPOINTS, iter_k6_metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+BACKENDS = ('parquet', 'npz')
+CATEGORY = 'category'
+
+# Stored for the null values of k6, e.g. iteration_duration
+_MISSING = {'float64': np.nan, CATEGORY: ''}
+
+# One row per k6 request
+K6_SCHEMA = {
+    'timestamp': 'float64',  # POSIX seconds
+    'url': CATEGORY,         # Endpoint label, e.g. 'Real-Time-HPA'
+    'vus': 'int32',
+    'iterations': 'int32',
+    'http_req_duration': 'float64',
+    'http_req_waiting': 'float64',
+    'http_req_failed': 'int8',
+    'iteration_duration': 'float64',
+    'http_reqs': 'int32',
+}
+
+# One row per namespace and monitor tick
+MONITOR_SCHEMA = {
+    'timestamp': 'float64',
+    'namespace': CATEGORY,
+    'pod_count': 'int32',
+    'cpu_usage': 'float64',
+    'desired_replicas': 'int32',
+}
+
+
+class Columnar_Store:
+    """Time-partitioned column files of one schema."""
+
+    def __init__(self, directory: str, schema: dict, time_column: str = 'timestamp',
+                 partition_seconds: int = 3600, backend: str = None):
+        """
+        :param schema: {column: numpy dtype name or 'category'}
+        :param partition_seconds: Time span of one partition directory.
+        :param backend: 'parquet' or 'npz', by default parquet when
+                        pyarrow is installed.
+        """
+        if backend is None:
+            backend = 'parquet' if pq is not None else 'npz'
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', use one of {BACKENDS}.")
+        if backend == 'parquet' and pq is None:
+            raise ValueError("The parquet backend needs pyarrow, use 'npz'.")
+        if time_column not in schema:
+            raise ValueError(f"Time column '{time_column}' is not in the schema.")
+
+        self.directory = directory
+        self.schema = dict(schema)
+        self.time_column = time_column
+        self.partition_seconds = partition_seconds
+        self.backend = backend
+        self.extension = '.parquet' if backend == 'parquet' else '.npz'
+
+        os.makedirs(directory, exist_ok=True)
+        self._categories_file = os.path.join(directory, '_categories.json')
+        self.categories = {name: [] for name, dtype in self.schema.items() if dtype == CATEGORY}
+        if os.path.exists(self._categories_file):
+            with open(self._categories_file) as file:
+                self.categories.update(json.load(file))
+        self._codes = {name: {value: code for code, value in enumerate(values)}
+                       for name, values in self.categories.items()}
+
+    def _dtype(self, column: str) -> np.dtype:
+        dtype = self.schema[column]
+        return np.dtype(np.int32 if dtype == CATEGORY else dtype)
+
+    def encode(self, column: str, values) -> np.ndarray:
+        """:return: Dictionary codes of the values of a category column."""
+        unique, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+        codes = self._codes[column]
+        for value in unique:
+            if value not in codes:
+                codes[value] = len(self.categories[column])
+                self.categories[column].append(str(value))
+        mapping = np.array([codes[value] for value in unique], dtype=np.int32)
+        return mapping[inverse.reshape(-1)]
+
+    def _typed(self, columns: dict) -> dict:
+        missing = set(self.schema) - set(columns)
+        if missing:
+            raise ValueError(f"Missing columns {sorted(missing)}.")
+        typed = {}
+        for name, dtype in self.schema.items():
+            values = columns[name]
+            if dtype == CATEGORY and np.asarray(values).dtype.kind in 'OUS':
+                typed[name] = self.encode(name, values)
+            else:
+                typed[name] = np.asarray(values, dtype=self._dtype(name))
+        return typed
+
+    def write(self, columns: dict) -> int:
+        """
+        Append a batch of rows, split by time partition.
+
+        :param columns: {column: array-like} of equal lengths; text or
+                        codes for the category columns.
+        :return: Number of rows written.
+        """
+        columns = self._typed(columns)
+        times = columns[self.time_column]
+        if not len(times):
+            return 0
+
+        partition = (times // self.partition_seconds).astype(np.int64)
+        for key in np.unique(partition):
+            selected = partition == key
+            self._write_part(int(key) * self.partition_seconds,
+                             {name: values[selected] for name, values in columns.items()})
+
+        with open(self._categories_file, 'w') as file:
+            json.dump(self.categories, file)
+        return len(times)
+
+    def _write_part(self, start: int, columns: dict) -> None:
+        directory = os.path.join(self.directory, f'{self.time_column}={start}')
+        os.makedirs(directory, exist_ok=True)
+        sequence = sum(name.endswith(self.extension) for name in os.listdir(directory))
+        path = os.path.join(directory, f'part-{sequence:05d}{self.extension}')
+        if self.backend == 'parquet':
+            pq.write_table(pa.table(columns), path, compression='zstd')
+        else:
+            np.savez_compressed(path, **columns)
+
+    def partitions(self) -> list:
+        """:return: Sorted (partition start, [files]) of the store."""
+        prefix = f'{self.time_column}='
+        result = []
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix):
+                directory = os.path.join(self.directory, name)
+                files = sorted(os.path.join(directory, part) for part in os.listdir(directory)
+                               if part.endswith(self.extension))
+                result.append((int(name[len(prefix):]), files))
+        return sorted(result)
+
+    def _read_part(self, path: str, columns: list) -> dict:
+        if self.backend == 'parquet':
+            table = pq.read_table(path, columns=columns)
+            return {name: table[name].to_numpy() for name in columns}
+        with np.load(path) as data:
+            return {name: data[name] for name in columns}
+
+    def read(self, columns: list = None, start: float = None, end: float = None) -> dict:
+        """
+        Load the columns of the rows with start <= time < end, reading
+        only the partitions that overlap the range.
+
+        :return: {column: numpy array}, category columns as codes.
+        """
+        columns = list(self.schema) if columns is None else list(columns)
+        loaded = columns if self.time_column in columns else columns + [self.time_column]
+
+        parts = []
+        for partition_start, files in self.partitions():
+            if end is not None and partition_start >= end:
+                continue
+            if start is not None and partition_start + self.partition_seconds <= start:
+                continue
+            for path in files:
+                part = self._read_part(path, loaded)
+                if start is not None or end is not None:
+                    times = part[self.time_column]
+                    selected = np.ones(len(times), dtype=bool)
+                    if start is not None:
+                        selected &= times >= start
+                    if end is not None:
+                        selected &= times < end
+                    part = {name: values[selected] for name, values in part.items()}
+                parts.append(part)
+
+        if not parts:
+            return {name: np.empty(0, dtype=self._dtype(name)) for name in columns}
+        return {name: np.concatenate([part[name] for part in parts]) for name in columns}
+
+
+def bucket_percentiles(times: np.ndarray, keys: np.ndarray, values: np.ndarray,
+                       bucket: float = 10.0, q=(50, 95, 99)) -> dict:
+    """
+    Percentiles of the values per (key, time bucket), vectorized: one
+    lexsort and a linear interpolation (numpy's default method) at the
+    group offsets.
+
+    :param keys: Integer group of each row, e.g. the url codes.
+    :return: {'key', 'bucket_start', 'count', 'p<q>'...} arrays, one
+             entry per non-empty group.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    keys = np.asarray(keys)
+    values = np.asarray(values, dtype=np.float64)
+    bucket_index = np.floor(times / bucket).astype(np.int64)
+
+    order = np.lexsort((values, bucket_index, keys))
+    keys, bucket_index, values = keys[order], bucket_index[order], values[order]
+
+    if not len(values):
+        starts = np.empty(0, dtype=np.int64)
+    else:
+        new_group = np.ones(len(values), dtype=bool)
+        new_group[1:] = (keys[1:] != keys[:-1]) | (bucket_index[1:] != bucket_index[:-1])
+        starts = np.flatnonzero(new_group)
+    counts = np.diff(np.append(starts, len(values)))
+
+    result = {
+        'key': keys[starts],
+        'bucket_start': bucket_index[starts] * bucket,
+        'count': counts,
+    }
+    for percent in q:
+        position = starts + (counts - 1) * (percent / 100.0)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, starts + counts - 1)
+        fraction = position - low
+        result[f'p{percent:g}'] = values[low] + (values[high] - values[low]) * fraction
+    return result
+
+
+def ingest_k6_log(log_file: str, store: Columnar_Store, batch_rows: int = 100_000) -> int:
+    """
+    Write the k6 console lines of the log file to a K6_SCHEMA store, in
+    batches of batch_rows.
+
+    :return: Number of rows written.
+    """
+    names = list(K6_SCHEMA)
+    batch = {name: [] for name in names}
+    count = 0
+
+    def flush():
+        nonlocal batch, count
+        count += store.write(batch)
+        batch = {name: [] for name in names}
+
+    for metrics in iter_k6_metrics(log_file):
+        metrics['url'] = ENDPOINTS.get(metrics.get('url'), metrics.get('url'))
+        for name in names:
+            value = metrics.get(name)
+            if value is None:
+                value = _MISSING.get(K6_SCHEMA[name], 0)
+            batch[name].append(value)
+        if len(batch['timestamp']) >= batch_rows:
+            flush()
+    if batch['timestamp']:
+        flush()
+    return count
+
+
+def ingest_monitor_csv(csv_file: str, store: Columnar_Store, namespaces: dict) -> int:
+    """
+    Write a CSV of comparison_monitor_metrics.py to a MONITOR_SCHEMA
+    store, one row per namespace and tick.
+
+    :param namespaces: {namespace: (pod count column, CPU usage column)}
+    :return: Number of rows written.
+    """
+    with open(csv_file, newline='') as file:
+        rows = list(csv.DictReader(file))
+    # The monitor writes the local time of the machine
+    times = [datetime.strptime(row['Datetime'], '%Y-%m-%dT%H:%M:%S').timestamp() for row in rows]
+    desired = [int(row.get('Revised Replica Count') or 0) for row in rows]
+
+    count = 0
+    for namespace, (pod_column, cpu_column) in namespaces.items():
+        count += store.write({
+            'timestamp': times,
+            'namespace': [namespace] * len(rows),
+            'pod_count': [int(row[pod_column]) for row in rows],
+            'cpu_usage': [float(row[cpu_column]) for row in rows],
+            'desired_replicas': desired,
+        })
+    return count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('log_file', nargs='?', default='../Testing/metrics_logs.json')
+    parser.add_argument('directory', nargs='?', default='k6_store')
+    parser.add_argument('--backend', choices=BACKENDS)
+    parser.add_argument('--bucket', type=float, default=10.0)
+    parser.add_argument('--q', type=float, default=95.0)
+    args = parser.parse_args()
+
+    k6_store = Columnar_Store(args.directory, K6_SCHEMA, backend=args.backend)
+    print(f"{ingest_k6_log(args.log_file, k6_store)} rows written to {args.directory} ({k6_store.backend})")
+
+    data = k6_store.read(['timestamp', 'url', 'http_req_duration'])
+    table = bucket_percentiles(data['timestamp'], data['url'], data['http_req_duration'],
+                               args.bucket, (args.q,))
+    label = f'p{args.q:g}'
+    print(f"{'URL':<15}{'Bucket':>22}{'Requests':>10}{label + ' ms':>12}")
+    for key, bucket_start, count, value in zip(table['key'], table['bucket_start'],
+                                               table['count'], table[label]):
+        moment = datetime.fromtimestamp(bucket_start).strftime('%Y-%m-%dT%H:%M:%S')
+        print(f"{k6_store.categories['url'][key]:<15}{moment:>22}{count:>10}{value:>12.1f}")
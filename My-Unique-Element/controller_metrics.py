@@ -0,0 +1,303 @@
+"""
+This file will contain the instrumentation of the controllers: counters,
+gauges and latency histograms exposed in the Prometheus text format on
+an embedded HTTP /metrics endpoint.
+
+Recording is a dict lookup plus a few additions under a lock, cheap
+enough to leave on at sub-second tick rates.
+
+Usage:
+    Metrics_Server(port=9100).start()
+    curl http://localhost:9100/metrics
+"""
+
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from kubernetes import client
+
+# Seconds, from a cached read to a slow API server
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class of the metric families, one child per label values."""
+
+    TYPE = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 registry: Optional['Registry'] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values):
+        """:return: Child metric of the label values, created on first use."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}.")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self, values: tuple, child) -> list:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}',
+                 f'# TYPE {self.name} {self.TYPE}']
+        # Copy under the lock, labels() may add a child while rendering
+        with self._lock:
+            children = sorted(self._children.items())
+        for values, child in children:
+            lines.extend(self._samples(values, child))
+        return '\n'.join(lines)
+
+
+class _Value:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    TYPE = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def _samples(self, values, child):
+        labels = _format_labels(self.labelnames, values)
+        return [f'{self.name}{labels} {_format_value(child.value)}']
+
+
+class Gauge(Counter):
+    TYPE = 'gauge'
+
+
+class _Histogram_Value:
+    __slots__ = ('upper_bounds', 'counts', 'sum', '_lock')
+
+    def __init__(self, upper_bounds: tuple):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)  # The last one is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> '_Timer':
+        """:return: Context manager observing its duration in seconds."""
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    TYPE = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 registry: Optional['Registry'] = None,
+                 buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _Histogram_Value(self.buckets)
+
+    def _samples(self, values, child):
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        samples, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+            samples.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labelnames, values)
+        samples.append(f'{self.name}_sum{labels} {_format_value(total)}')
+        samples.append(f'{self.name}_count{labels} {cumulative}')
+        return samples
+
+
+class _Timer:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram: _Histogram_Value):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class Registry:
+    """Collection of metric families rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """:return: All metrics in the Prometheus text exposition format."""
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = Histogram(
+    'k8s_controller_stage_seconds',
+    'Latency of the stages of a reconcile cycle.', ('stage',), REGISTRY)
+API_CALLS = Counter(
+    'k8s_controller_api_calls_total',
+    'Kubernetes API calls sent by the controller.', ('call',), REGISTRY)
+API_ERRORS = Counter(
+    'k8s_controller_api_errors_total',
+    'Kubernetes API calls that failed, by HTTP status.', ('call', 'status'), REGISTRY)
+API_SECONDS = Histogram(
+    'k8s_controller_api_call_seconds',
+    'Latency of the Kubernetes API calls.', ('call',), REGISTRY)
+DECISIONS = Counter(
+    'k8s_controller_scaling_decisions_total',
+    'Scaling decisions by outcome and reason.', ('namespace', 'outcome', 'reason'), REGISTRY)
+CURRENT_REPLICAS = Gauge(
+    'k8s_controller_current_replicas',
+    'Running Pods seen by the last decision.', ('namespace',), REGISTRY)
+DESIRED_REPLICAS = Gauge(
+    'k8s_controller_desired_replicas',
+    'Replicas asked for by the last decision.', ('namespace',), REGISTRY)
+RECONCILE_ERRORS = Counter(
+    'k8s_controller_reconcile_errors_total',
+    'Reconciles that failed, by exception type.', ('namespace', 'error'), REGISTRY)
+
+
+def stage(name: str) -> _Timer:
+    """:return: Context manager timing one reconcile stage."""
+    return _Timer(STAGE_SECONDS.labels(name))
+
+
+class api_call:
+    """Context manager counting and timing one Kubernetes API call,
+    failures are counted by HTTP status and re-raised."""
+
+    __slots__ = ('call', 'started')
+
+    def __init__(self, call: str):
+        self.call = call
+
+    def __enter__(self):
+        API_CALLS.labels(self.call).inc()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        API_SECONDS.labels(self.call).observe(time.perf_counter() - self.started)
+        if exc_type is not None:
+            status = exc.status if isinstance(exc, client.exceptions.ApiException) else None
+            API_ERRORS.labels(self.call, str(status or exc_type.__name__)).inc()
+        return False
+
+
+def record_reconcile_error(namespace: str, error: BaseException) -> None:
+    """Count one failed reconcile of a namespace."""
+    RECONCILE_ERRORS.labels(namespace, type(error).__name__).inc()
+
+
+def record_decision(namespace: str, current_replicas: int, desired_replicas: int,
+                    reason: Optional[str] = None) -> None:
+    """Count one scaling decision and keep the current/desired replicas."""
+    if desired_replicas > current_replicas:
+        outcome = 'scale_up'
+    elif desired_replicas < current_replicas:
+        outcome = 'scale_down'
+    else:
+        outcome = 'hold'
+    DECISIONS.labels(namespace, outcome, reason or '').inc()
+    CURRENT_REPLICAS.labels(namespace).set(current_replicas)
+    DESIRED_REPLICAS.labels(namespace).set(desired_replicas)
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        payload = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class Metrics_Server:
+    """Serves a cls: Registry() on /metrics from a daemon thread."""
+
+    def __init__(self, registry: Registry = REGISTRY,
+                 host: str = '0.0.0.0', port: int = 9100):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.registry = registry
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def start(self) -> 'Metrics_Server':
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,267 @@
+"""
+This file will contain the sliding window store of the CPU samples
+collected by the controllers.
+
+Samples live in fixed size NumPy ring buffers bounded by sample count
+and age, so memory stays flat over long runs. A running prefix sum
+gives the rolling mean of a window in O(1) (plus a binary search when
+the window is given in seconds), the EWMA is updated on every append
+and a monotonic queue keeps the max of the live window.
+
+The store keeps one series per deployment. Series per pod are opt-in
+and short, at 10k pods a full size series each would take ~860 MB.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+
+class Cpu_Series:
+    """Ring buffer of (timestamp, millicores) samples of one pod
+    or one deployment."""
+
+    def __init__(self, capacity: int = 3600, max_age: Optional[float] = None,
+                 ewma_tau: float = 30.0):
+        """
+        :param capacity: Max number of samples kept.
+        :param max_age: Max age of a sample in seconds, None for no limit.
+        :param ewma_tau: Time constant of the EWMA in seconds.
+        """
+        self.capacity = capacity
+        self.max_age = max_age
+        self.ewma_tau = ewma_tau
+
+        # One spare slot keeps the prefix sum before the oldest sample
+        self._size = capacity + 1
+        self._times = np.zeros(self._size, dtype=np.float64)
+        self._values = np.zeros(self._size, dtype=np.float64)
+        # Prefix sum of all values up to and including the sample
+        self._csum = np.zeros(self._size, dtype=np.float64)
+        self._total = 0.0
+
+        self._start = 0  # Global index of the oldest live sample
+        self._end = 0  # Global index after the newest sample
+        self._max_queue = deque()  # (index, value), decreasing values
+
+        self.ewma = None
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def _slot(self, index: int) -> int:
+        return index % self._size
+
+    def append(self, value: float, timestamp: Optional[float] = None) -> None:
+        """
+        :param value: CPU usage in millicores.
+        :param timestamp: Seconds, default is time.time().
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        value = float(value)
+
+        # EWMA weighted by the time passed since the last sample
+        if self.ewma is None:
+            self.ewma = value
+        else:
+            dt = max(0.0, timestamp - self._times[self._slot(self._end - 1)])
+            alpha = 1.0 - math.exp(-dt / self.ewma_tau) if self.ewma_tau > 0 else 1.0
+            self.ewma += alpha * (value - self.ewma)
+
+        slot = self._slot(self._end)
+        self._total += value
+        self._times[slot] = timestamp
+        self._values[slot] = value
+        self._csum[slot] = self._total
+        self._end += 1
+
+        while self._max_queue and self._max_queue[-1][1] <= value:
+            self._max_queue.pop()
+        self._max_queue.append((self._end - 1, value))
+
+        if len(self) > self.capacity:
+            self._start = self._end - self.capacity
+        if self.max_age is not None:
+            self.expire(timestamp - self.max_age)
+
+        while self._max_queue[0][0] < self._start:
+            self._max_queue.popleft()
+
+    def expire(self, before: float) -> None:
+        """Drop the samples older than the timestamp."""
+        while self._start < self._end and self._times[self._slot(self._start)] < before:
+            self._start += 1
+        while self._max_queue and self._max_queue[0][0] < self._start:
+            self._max_queue.popleft()
+
+    def _window_start(self, seconds: Optional[float],
+                      samples: Optional[int]) -> int:
+        """:return: Global index of the first sample in the window."""
+        start = self._start
+        if samples is not None:
+            start = max(start, self._end - samples)
+        if seconds is not None and self._end > start:
+            # Binary search, the timestamps are increasing
+            since = self._times[self._slot(self._end - 1)] - seconds
+            low, high = start, self._end - 1
+            while low < high:
+                middle = (low + high) // 2
+                if self._times[self._slot(middle)] < since:
+                    low = middle + 1
+                else:
+                    high = middle
+            start = low
+        return start
+
+    def _prefix(self, index: int) -> float:
+        """:return: Sum of all values before the global index."""
+        if index == 0:
+            return 0.0
+        return self._csum[self._slot(index - 1)]
+
+    def _ordered(self, array: np.ndarray, start: int) -> np.ndarray:
+        """:return: Values of the array from the global index to the end."""
+        first, last = self._slot(start), self._slot(self._end)
+        if start == self._end:
+            return array[:0]
+        if first < last:
+            return array[first:last]
+        return np.concatenate((array[first:], array[:last]))
+
+    def timestamps(self) -> np.ndarray:
+        return self._ordered(self._times, self._start)
+
+    def values(self, seconds: Optional[float] = None,
+               samples: Optional[int] = None) -> np.ndarray:
+        """:return: Values of the window, oldest first."""
+        return self._ordered(self._values, self._window_start(seconds, samples))
+
+    @property
+    def last(self) -> Optional[float]:
+        if not len(self):
+            return None
+        return float(self._values[self._slot(self._end - 1)])
+
+    def mean(self, seconds: Optional[float] = None,
+             samples: Optional[int] = None) -> Optional[float]:
+        """
+        :param seconds: Window length in seconds, None for all samples.
+        :param samples: Window length in samples, None for all samples.
+        :return: Mean of the window or None if it is empty.
+        """
+        start = self._window_start(seconds, samples)
+        if start == self._end:
+            return None
+        total = self._prefix(self._end) - self._prefix(start)
+        return total / (self._end - start)
+
+    def max(self, seconds: Optional[float] = None,
+            samples: Optional[int] = None) -> Optional[float]:
+        """:return: Max of the window or None if it is empty."""
+        if seconds is None and samples is None:
+            return self._max_queue[0][1] if self._max_queue else None
+        values = self.values(seconds, samples)
+        return float(values.max()) if len(values) else None
+
+    def percentile(self, q: float, seconds: Optional[float] = None,
+                   samples: Optional[int] = None) -> Optional[float]:
+        """
+        :param q: Percentile between 0 and 100.
+        :return: Percentile of the window or None if it is empty.
+        """
+        values = self.values(seconds, samples)
+        return float(np.percentile(values, q)) if len(values) else None
+
+
+class Cpu_Store:
+    """Keeps one cls: Cpu_Series() per deployment and, when enabled,
+    one per pod. Safe to share between the scaler threads."""
+
+    def __init__(self, capacity: int = 3600, max_age: Optional[float] = 3600.0,
+                 ewma_tau: float = 30.0, pod_ttl: float = 300.0,
+                 pod_history: bool = False, pod_capacity: int = 60):
+        """
+        :param pod_ttl: Seconds after which the series of a pod which
+                        is no longer reported is dropped.
+        :param pod_history: Keep a series per pod as well.
+        :param pod_capacity: Max number of samples of a pod series.
+        """
+        self.capacity = capacity
+        self.max_age = max_age
+        self.ewma_tau = ewma_tau
+        self.pod_ttl = pod_ttl
+        self.pod_history = pod_history
+        self.pod_capacity = pod_capacity
+
+        self.pods = {}  # (namespace, pod_name) -> Cpu_Series
+        self.deployments = {}  # (namespace, deployment_name) -> Cpu_Series
+        self._pod_seen = {}  # (namespace, pod_name) -> timestamp
+        self._lock = threading.Lock()
+
+    def _new_series(self, capacity: Optional[int] = None) -> Cpu_Series:
+        return Cpu_Series(capacity or self.capacity, self.max_age, self.ewma_tau)
+
+    def record(self, namespace: str, pod_cpu: dict,
+               deployment_name: Optional[str] = None,
+               timestamp: Optional[float] = None) -> Optional[float]:
+        """
+        Store the CPU usage of one poll.
+
+        :param namespace: Namespace of the pods.
+        :param pod_cpu: {pod_name: millicores}
+        :param deployment_name: Deployment of the pods, None for the
+                                whole namespace.
+        :return: Mean CPU usage of the pods in this poll.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+
+        if self.pod_history:
+            with self._lock:
+                for pod_name, cpu in pod_cpu.items():
+                    key = (namespace, pod_name)
+                    if key not in self.pods:
+                        self.pods[key] = self._new_series(self.pod_capacity)
+                    self.pods[key].append(cpu, timestamp)
+                    self._pod_seen[key] = timestamp
+                self._evict(timestamp)
+
+        if not pod_cpu:
+            return None
+        avg = sum(pod_cpu.values()) / len(pod_cpu)
+        self.record_mean(namespace, avg, deployment_name, timestamp)
+        return avg
+
+    def record_mean(self, namespace: str, avg: float,
+                    deployment_name: Optional[str] = None,
+                    timestamp: Optional[float] = None) -> None:
+        """Store the mean CPU usage of the pods of one poll."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self._series(namespace, deployment_name).append(avg, timestamp)
+
+    def _evict(self, now: float) -> None:
+        """Called with the lock held."""
+        for key, seen in list(self._pod_seen.items()):
+            if now - seen > self.pod_ttl:
+                self._pod_seen.pop(key, None)
+                self.pods.pop(key, None)
+
+    def _series(self, namespace: str, deployment_name: Optional[str]) -> Cpu_Series:
+        key = (namespace, deployment_name)
+        series = self.deployments.get(key)
+        if series is None:
+            series = self.deployments[key] = self._new_series()
+        return series
+
+    def series(self, namespace: str,
+               deployment_name: Optional[str] = None) -> Cpu_Series:
+        """:return: Series of the deployment, created when missing."""
+        with self._lock:
+            return self._series(namespace, deployment_name)
+
+    def pod_series(self, namespace: str, pod_name: str) -> Optional[Cpu_Series]:
+        return self.pods.get((namespace, pod_name))
@@ -0,0 +1,391 @@
+"""
+This file will contain a small local stand-in for the Kubernetes API
+server so that the controllers can be tested without a cluster.
+
+It serves the endpoints cls: K8s_Controller() uses (Pods, Deployments,
+Nodes, metrics.k8s.io) from an in-memory cls: Fake_Cluster().
+"""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from quantity import cpu_to_millicores, memory_to_bytes
+
+
+class Fake_Cluster:
+    """In-memory state of the fake cluster."""
+
+    def __init__(self, pod_ip_prefix: str = '10.0.0.'):
+        """
+        :param pod_ip_prefix: Pod i of a Deployment gets the IP
+                              f'{pod_ip_prefix}{i + 1}'.
+        """
+        self.pod_ip_prefix = pod_ip_prefix
+        self.deployments = {}  # (namespace, name) -> {'replicas', 'cpu', 'requests'}
+        self.nodes = {}  # name -> {'cpu', 'memory', 'pods', 'unschedulable'}
+        self.delays = {}  # namespace -> seconds added to each request
+        self.requests = []  # (method, path) of every request
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.resource_version = 1
+        self._lock = threading.Lock()
+
+    def add_deployment(self, namespace: str, name: str, replicas: int = 1,
+                       cpu: str = '50m', requests: Optional[dict] = None) -> None:
+        """
+        :param cpu: CPU usage reported for each pod of the Deployment.
+        :param requests: Resource requests of each pod, e.g.
+                         {'cpu': '500m', 'memory': '256Mi'}.
+        """
+        self.deployments[(namespace, name)] = {'replicas': replicas, 'cpu': cpu,
+                                               'requests': requests or {}}
+
+    def add_node(self, name: str, cpu: str = '2', memory: str = '4Gi',
+                 pods: int = 110, unschedulable: bool = False) -> None:
+        """
+        Once a Node is added the Pods are bound first fit to the Nodes,
+        in Deployment order, and the Pods that fit nowhere stay Pending.
+
+        :param cpu: Allocatable CPU of the Node.
+        :param memory: Allocatable memory of the Node.
+        :param pods: Allocatable Pod slots of the Node.
+        """
+        with self._lock:
+            self.nodes[name] = {'cpu': cpu, 'memory': memory, 'pods': pods,
+                                'unschedulable': unschedulable}
+            self.resource_version += 1
+
+    def replicas(self, namespace: str, name: str) -> int:
+        return self.deployments[(namespace, name)]['replicas']
+
+    def set_replicas(self, namespace: str, name: str, replicas: int) -> None:
+        with self._lock:
+            self.deployments[(namespace, name)]['replicas'] = replicas
+            self.resource_version += 1
+
+    def set_cpu(self, namespace: str, name: str, cpu: str) -> None:
+        self.deployments[(namespace, name)]['cpu'] = cpu
+
+    def set_pods(self, namespace: str, name: str, ready: int,
+                 pod_cpu: Optional[list] = None) -> None:
+        """
+        Simulated Pod state: the first `ready` Pods are Running, the
+        rest of the replicas are Pending and report no metrics.
+
+        :param pod_cpu: CPU usage of each Running Pod, by default the
+                        CPU usage of the Deployment.
+        """
+        spec = self.deployments[(namespace, name)]
+        spec['ready'] = ready
+        spec['pod_cpu'] = pod_cpu
+
+    def _enter(self, method: str, path: str) -> None:
+        with self._lock:
+            self.requests.append((method, path))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _exit(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def _namespace_deployments(self, namespace: str) -> list:
+        return [(name, spec) for (ns, name), spec in self.deployments.items()
+                if ns == namespace]
+
+    def _schedule(self) -> dict:
+        """:return: {(namespace, name, i): Node or None} of every Pod."""
+        free = {name: [cpu_to_millicores(node['cpu']), memory_to_bytes(node['memory']),
+                       node['pods']]
+                for name, node in self.nodes.items() if not node['unschedulable']}
+        bindings = {}
+        for (namespace, name), spec in self.deployments.items():
+            cpu = cpu_to_millicores(spec['requests'].get('cpu', 0))
+            memory = memory_to_bytes(spec['requests'].get('memory', 0))
+            for i in range(spec['replicas']):
+                node = next((node for node, (free_cpu, free_memory, free_pods) in free.items()
+                             if free_cpu >= cpu and free_memory >= memory and free_pods >= 1),
+                            None)
+                if node is not None:
+                    free[node][0] -= cpu
+                    free[node][1] -= memory
+                    free[node][2] -= 1
+                bindings[(namespace, name, i)] = node
+        return bindings
+
+    def pods(self, namespace: Optional[str] = None) -> list:
+        """:param namespace: Pods of one namespace, by default of all."""
+        bindings = self._schedule() if self.nodes else {}
+        items = []
+        for (ns, name), spec in self.deployments.items():
+            if namespace is not None and ns != namespace:
+                continue
+            ready = spec.get('ready', spec['replicas'])
+            for i in range(spec['replicas']):
+                node = bindings.get((ns, name, i))
+                running = i < ready and (node is not None or not self.nodes)
+                pod_spec = {'containers': [{'name': name,
+                                            'resources': {'requests': spec['requests']}}]}
+                if node is not None:
+                    pod_spec['nodeName'] = node
+                items.append({
+                    'metadata': {'name': f'{name}-{i}', 'namespace': ns,
+                                 'labels': {'app': name},
+                                 'creationTimestamp': '2024-12-05T21:58:50Z'},
+                    'spec': pod_spec,
+                    'status': {'phase': 'Running' if running else 'Pending',
+                               'podIP': f'{self.pod_ip_prefix}{i + 1}'},
+                })
+        return items
+
+    def node_list(self) -> list:
+        return [{
+            'metadata': {'name': name},
+            'spec': {'unschedulable': node['unschedulable']},
+            'status': {'allocatable': {'cpu': node['cpu'], 'memory': node['memory'],
+                                       'pods': str(node['pods'])},
+                       'conditions': [{'type': 'Ready', 'status': 'True'}]},
+        } for name, node in self.nodes.items()]
+
+    def deployment(self, namespace: str, name: str) -> dict:
+        spec = self.deployments[(namespace, name)]
+        return {
+            'metadata': {'name': name, 'namespace': namespace,
+                         'resourceVersion': str(self.resource_version)},
+            'spec': {'replicas': spec['replicas'],
+                     'selector': {'matchLabels': {'app': name}},
+                     'template': {'metadata': {'labels': {'app': name}},
+                                  'spec': {'containers': [{
+                                      'name': name,
+                                      'resources': {'requests': spec['requests']}}]}}},
+            'status': {'replicas': spec['replicas']},
+        }
+
+    def scale(self, namespace: str, name: str) -> dict:
+        replicas = self.replicas(namespace, name)
+        return {
+            'kind': 'Scale', 'apiVersion': 'autoscaling/v1',
+            'metadata': {'name': name, 'namespace': namespace,
+                         'resourceVersion': str(self.resource_version)},
+            'spec': {'replicas': replicas},
+            'status': {'replicas': replicas},
+        }
+
+    def pod_metrics(self, namespace: str) -> list:
+        running = {pod['metadata']['name'] for pod in self.pods(namespace)
+                   if pod['status']['phase'] == 'Running'}
+        items = []
+        for name, spec in self._namespace_deployments(namespace):
+            pod_cpu = spec.get('pod_cpu')
+            for i in range(spec['replicas']):
+                if f'{name}-{i}' not in running:
+                    continue
+                cpu = pod_cpu[i] if pod_cpu else spec['cpu']
+                items.append({
+                    'metadata': {'name': f'{name}-{i}', 'namespace': namespace,
+                                 'labels': {'app': name},
+                                 'creationTimestamp': '2024-12-05T21:58:50Z'},
+                    'timestamp': '2024-12-05T21:58:50Z',
+                    'window': '15s',
+                    'containers': [{'name': name,
+                                    'usage': {'cpu': cpu, 'memory': '25Mi'}}],
+                })
+        return items
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Routes the REST calls of the kubernetes client."""
+
+    PODS = re.compile(r'^/api/v1/namespaces/([^/]+)/pods$')
+    ALL_PODS = re.compile(r'^/api/v1/pods$')
+    NODES = re.compile(r'^/api/v1/nodes$')
+    DEPLOYMENTS = re.compile(r'^/apis/apps/v1/namespaces/([^/]+)/deployments$')
+    DEPLOYMENT = re.compile(r'^/apis/apps/v1/namespaces/([^/]+)/deployments/([^/]+)$')
+    SCALE = re.compile(r'^/apis/apps/v1/namespaces/([^/]+)/deployments/([^/]+)/scale$')
+    POD_METRICS = re.compile(r'^/apis/metrics.k8s.io/v1beta1/namespaces/([^/]+)/pods$')
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # Headers and body are separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def cluster(self) -> Fake_Cluster:
+        return self.server.cluster
+
+    def _send(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _not_found(self) -> None:
+        self._send(404, {'kind': 'Status', 'status': 'Failure',
+                         'reason': 'NotFound', 'code': 404})
+
+    def _handle(self, method: str) -> None:
+        path = self.path.split('?')[0]
+        match = re.match(r'^/apis?/(?:[^/]+/)*namespaces/([^/]+)/', path)
+        self.cluster._enter(method, path)
+        try:
+            if match:
+                time.sleep(self.cluster.delays.get(match.group(1), 0))
+            getattr(self, f'_{method.lower()}')(path)
+        finally:
+            self.cluster._exit()
+
+    def _selected(self, items: list) -> list:
+        """:return: Items matching the labelSelector of the query, 'key=value' terms only."""
+        selector = parse_qs(urlsplit(self.path).query).get('labelSelector')
+        if not selector:
+            return items
+        match_labels = dict(term.split('=', 1) for term in selector[0].split(','))
+        return [item for item in items
+                if all(item['metadata'].get('labels', {}).get(key) == value
+                       for key, value in match_labels.items())]
+
+    def _get(self, path: str) -> None:
+        cluster = self.cluster
+        rv = str(cluster.resource_version)
+        if m := self.PODS.match(path):
+            self._send(200, {'kind': 'PodList', 'metadata': {'resourceVersion': rv},
+                             'items': self._selected(cluster.pods(m.group(1)))})
+        elif self.ALL_PODS.match(path):
+            self._send(200, {'kind': 'PodList', 'metadata': {'resourceVersion': rv},
+                             'items': cluster.pods()})
+        elif self.NODES.match(path):
+            self._send(200, {'kind': 'NodeList', 'metadata': {'resourceVersion': rv},
+                             'items': cluster.node_list()})
+        elif m := self.DEPLOYMENTS.match(path):
+            items = [cluster.deployment(m.group(1), name)
+                     for name, _ in cluster._namespace_deployments(m.group(1))]
+            self._send(200, {'kind': 'DeploymentList', 'metadata': {'resourceVersion': rv},
+                             'items': items})
+        elif m := self.POD_METRICS.match(path):
+            self._send(200, {'kind': 'PodMetricsList', 'metadata': {},
+                             'items': self._selected(cluster.pod_metrics(m.group(1)))})
+        elif (m := self.SCALE.match(path)) and m.groups() in cluster.deployments:
+            self._send(200, cluster.scale(*m.groups()))
+        elif (m := self.DEPLOYMENT.match(path)) and m.groups() in cluster.deployments:
+            self._send(200, cluster.deployment(*m.groups()))
+        else:
+            self._not_found()
+
+    def _patch(self, path: str) -> None:
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        m = self.SCALE.match(path) or self.DEPLOYMENT.match(path)
+        if not m or m.groups() not in self.cluster.deployments:
+            return self._not_found()
+
+        replicas = body.get('spec', {}).get('replicas')
+        if replicas is not None:
+            self.cluster.set_replicas(*m.groups(), replicas)
+        if self.SCALE.match(path):
+            self._send(200, self.cluster.scale(*m.groups()))
+        else:
+            self._send(200, self.cluster.deployment(*m.groups()))
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+
+class Fake_Api_Server:
+    """Serves a cls: Fake_Cluster() over HTTP on localhost."""
+
+    def __init__(self, cluster: Optional[Fake_Cluster] = None,
+                 host: str = '127.0.0.1', port: int = 0):
+        self.cluster = cluster or Fake_Cluster()
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.cluster = self.cluster
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'Fake_Api_Server':
+        self._thread = threading.Thread(target=self.httpd.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def write_kubeconfig(self, path: str) -> str:
+        """Write a kubeconfig pointing at this server and return its path."""
+        kubeconfig = {
+            'apiVersion': 'v1', 'kind': 'Config',
+            'clusters': [{'name': 'fake', 'cluster': {'server': self.url}}],
+            'users': [{'name': 'fake', 'user': {'token': 'fake-token'}}],
+            'contexts': [{'name': 'fake', 'context': {'cluster': 'fake', 'user': 'fake'}}],
+            'current-context': 'fake',
+        }
+        with open(path, 'w') as f:
+            json.dump(kubeconfig, f)
+        return path
+
+
+class _Pod_Handler(BaseHTTPRequestHandler):
+    """Serves the /stats JSON of one fake Pod."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.server.pod.delay)
+        if self.path.split('?')[0] != '/stats':
+            self.send_error(404)
+            return
+        payload = json.dumps(self.server.pod.stats).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class Fake_Pod_Server:
+    """Stand-in for the /stats endpoint of the app in one Pod."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 stats: Optional[dict] = None, delay: float = 0.0):
+        """
+        :param stats: JSON served on /stats, can be changed while running.
+        :param delay: Seconds added to each request.
+        """
+        self.stats = stats if stats is not None else {'in_flight': 0, 'rps': 0.0}
+        self.delay = delay
+        self.httpd = ThreadingHTTPServer((host, port), _Pod_Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.pod = self
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def start(self) -> 'Fake_Pod_Server':
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,139 @@
+"""
+Replays a recorded k6 trace (Testing/metrics_logs.json) through the
+forecasters and reports how accurate they are and how much earlier a
+predictive scaler would ask for each additional pod.
+
+The offered load of each endpoint is bucketed per `--bucket` seconds
+(max active VUs, or completed requests per second with --signal rps).
+
+Usage:
+    python forecast_replay.py ../Testing/metrics_logs.json --horizon 10
+"""
+
+import argparse
+import json
+import math
+import re
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import numpy as np
+
+from forecasting import FORECASTERS, make_forecaster
+
+_K6_LINE = re.compile(r'^INFO\[\d+\]\s+(\{.*\})')
+
+ENDPOINTS = {
+    'http://127.0.0.1:7080/': 'Real-Time-HPA',
+    'http://127.0.0.1:9080/': 'HPA',
+}
+
+
+def iter_k6_metrics(log_file: str):
+    """
+    Yield the metrics dict of every k6 console line of the log file
+    with the 'timestamp' converted to a POSIX timestamp.
+    """
+    with open(log_file) as file:
+        for line in file:
+            match = _K6_LINE.match(line)
+            if not match:
+                continue
+            metrics = json.loads(match.group(1))
+            timestamp = datetime.strptime(metrics['timestamp'], '%Y-%m-%dT%H:%M:%S.%fZ')
+            metrics['timestamp'] = timestamp.replace(tzinfo=timezone.utc).timestamp()
+            yield metrics
+
+
+def load_trace(log_file: str, bucket: float = 1.0, signal: str = 'vus') -> dict:
+    """
+    :return: {endpoint label: (bucket start times, load values)} with
+             the time in seconds since the first request.
+    """
+    rows = defaultdict(list)
+    for metrics in iter_k6_metrics(log_file):
+        label = ENDPOINTS.get(metrics.get('url'), metrics.get('url', 'k6'))
+        rows[label].append((metrics['timestamp'], metrics.get('vus') or 0))
+
+    start = min(t for values in rows.values() for t, _ in values)
+    traces = {}
+    for label, values in rows.items():
+        values = np.array(values, dtype=np.float64)
+        index = ((values[:, 0] - start) // bucket).astype(np.int64)
+        n = index.max() + 1
+        if signal == 'rps':
+            load = np.bincount(index, minlength=n) / bucket
+        else:
+            load = np.zeros(n)
+            np.maximum.at(load, index, values[:, 1])
+            load = np.maximum.accumulate(load)  # Buckets without samples keep the VUs
+        traces[label] = (np.arange(n) * bucket, load)
+    return traces
+
+
+def evaluate(times: np.ndarray, values: np.ndarray, forecaster_name: str,
+             horizon: float, pod_capacity: float) -> dict:
+    """
+    Feed the trace sample by sample and compare each forecast with the
+    value seen `horizon` seconds later.
+
+    :param pod_capacity: Load one pod can serve, used to turn the load
+                         into a replica count.
+    :return: MAE, MAPE and mean lead time (s) of the scale up decisions.
+    """
+    forecaster = make_forecaster(forecaster_name)
+    step = times[1] - times[0] if len(times) > 1 else 1.0
+    shift = int(round(horizon / step))
+
+    forecasts = np.empty(len(values))
+    for i, (t, value) in enumerate(zip(times, values)):
+        forecaster.update(t, value)
+        forecasts[i] = max(value, forecaster.forecast(horizon))
+
+    actual = values[shift:]
+    predicted = forecasts[:len(forecasts) - shift]
+    errors = np.abs(predicted - actual)
+    nonzero = actual > 0
+
+    # When does each replica count get requested first?
+    lead_times = []
+    needed = np.ceil(values / pod_capacity)
+    requested = np.ceil(forecasts / pod_capacity)
+    for replicas in range(2, int(needed.max()) + 1):
+        needed_at = times[np.argmax(needed >= replicas)]
+        requested_at = times[np.argmax(requested >= replicas)]
+        lead_times.append(needed_at - requested_at)
+
+    return {
+        'mae': float(errors.mean()) if len(errors) else math.nan,
+        'mape': float((errors[nonzero] / actual[nonzero]).mean() * 100) if nonzero.any() else math.nan,
+        'lead_time': float(np.mean(lead_times)) if lead_times else 0.0,
+    }
+
+
+def run(log_file: str, horizon: float, bucket: float, signal: str,
+        pod_capacity: float) -> dict:
+    results = {}
+    traces = load_trace(log_file, bucket, signal)
+    print(f"horizon {horizon}s, bucket {bucket}s, signal {signal}, "
+          f"pod capacity {pod_capacity}")
+    print(f"{'Endpoint':<15}{'Forecaster':<12}{'MAE':>10}{'MAPE %':>10}{'Lead s':>10}")
+    for label, (times, values) in sorted(traces.items()):
+        for name in FORECASTERS:
+            result = evaluate(times, values, name, horizon, pod_capacity)
+            results[(label, name)] = result
+            print(f"{label:<15}{name:<12}{result['mae']:>10.2f}"
+                  f"{result['mape']:>10.1f}{result['lead_time']:>10.1f}")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('log_file', nargs='?', default='../Testing/metrics_logs.json')
+    parser.add_argument('--horizon', type=float, default=10.0,
+                        help='Pod start-up time in seconds')
+    parser.add_argument('--bucket', type=float, default=1.0)
+    parser.add_argument('--signal', choices=('vus', 'rps'), default='vus')
+    parser.add_argument('--pod-capacity', type=float, default=20.0)
+    args = parser.parse_args()
+    run(args.log_file, args.horizon, args.bucket, args.signal, args.pod_capacity)
@@ -0,0 +1,141 @@
+"""
+This file will contain the short horizon load forecasters used by the
+predictive scaling mode of the controllers.
+
+A forecaster is fed (timestamp, value) samples with update() and
+returns the value expected `horizon` seconds ahead with forecast().
+The controllers ask for the load expected once a new pod has started,
+so that pods are requested before the load arrives.
+"""
+
+import math
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+
+class Forecaster:
+    """Base class of the forecasters."""
+
+    def update(self, timestamp: float, value: float) -> None:
+        raise NotImplementedError
+
+    def forecast(self, horizon: float) -> Optional[float]:
+        """
+        :param horizon: Seconds ahead of the last sample.
+        :return: Expected value or None before the first sample.
+        """
+        raise NotImplementedError
+
+
+class Last_Value_Forecaster(Forecaster):
+    """Reactive baseline: the future looks like the last sample."""
+
+    def __init__(self):
+        self.last = None
+
+    def update(self, timestamp: float, value: float) -> None:
+        self.last = value
+
+    def forecast(self, horizon: float) -> Optional[float]:
+        return self.last
+
+
+class Holt_Forecaster(Forecaster):
+    """Double exponential smoothing (EWMA level + EWMA trend) with
+    smoothing factors scaled by the time between samples."""
+
+    def __init__(self, level_tau: float = 10.0, trend_tau: float = 30.0):
+        """
+        :param level_tau: Time constant of the level in seconds.
+        :param trend_tau: Time constant of the trend in seconds.
+        """
+        self.level_tau = level_tau
+        self.trend_tau = trend_tau
+        self.level = None
+        self.trend = 0.0  # Change of the value per second
+        self._last_timestamp = None
+
+    def update(self, timestamp: float, value: float) -> None:
+        if self.level is None:
+            self.level = value
+            self._last_timestamp = timestamp
+            return
+
+        dt = timestamp - self._last_timestamp
+        if dt <= 0:
+            return
+        alpha = 1.0 - math.exp(-dt / self.level_tau)
+        beta = 1.0 - math.exp(-dt / self.trend_tau)
+
+        previous = self.level
+        predicted = self.level + self.trend * dt
+        self.level = alpha * value + (1.0 - alpha) * predicted
+        self.trend = beta * (self.level - previous) / dt + (1.0 - beta) * self.trend
+        self._last_timestamp = timestamp
+
+    def forecast(self, horizon: float) -> Optional[float]:
+        if self.level is None:
+            return None
+        return self.level + self.trend * horizon
+
+
+class Linear_Regression_Forecaster(Forecaster):
+    """Least squares line through the samples of the last `window`
+    seconds, extrapolated to the horizon."""
+
+    def __init__(self, window: float = 30.0, max_samples: int = 600):
+        self.window = window
+        self._samples = deque(maxlen=max_samples)
+
+    def update(self, timestamp: float, value: float) -> None:
+        self._samples.append((timestamp, value))
+        while self._samples and self._samples[0][0] < timestamp - self.window:
+            self._samples.popleft()
+
+    def forecast(self, horizon: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        if len(self._samples) == 1:
+            return self._samples[0][1]
+
+        samples = np.array(self._samples, dtype=np.float64)
+        t = samples[:, 0] - samples[-1, 0]
+        if not t.any():
+            return float(samples[:, 1].mean())
+        slope, intercept = np.polyfit(t, samples[:, 1], 1)
+        return float(intercept + slope * horizon)
+
+
+FORECASTERS = {
+    'last': Last_Value_Forecaster,
+    'holt': Holt_Forecaster,
+    'linear': Linear_Regression_Forecaster,
+}
+
+
+def make_forecaster(name: str, **kwargs) -> Forecaster:
+    """:param name: 'last', 'holt' or 'linear'"""
+    if name not in FORECASTERS:
+        raise ValueError(f"Unknown forecaster '{name}', use one of {sorted(FORECASTERS)}.")
+    return FORECASTERS[name](**kwargs)
+
+
+def predicted_metric_value(forecaster: Optional[Forecaster], timestamp: float,
+                           current_metric_value: float, horizon: float) -> float:
+    """
+    Feed the current value and return the value the scaler should act
+    on: the larger of the current and the forecast one, so the forecast
+    scales up early but never scales down ahead of time.
+
+    :param forecaster: cls: Forecaster() or None for reactive scaling.
+    :param horizon: Seconds a new pod needs to become ready.
+    """
+    if forecaster is None:
+        return current_metric_value
+    forecaster.update(timestamp, current_metric_value)
+    forecast = forecaster.forecast(horizon)
+    if forecast is None:
+        return current_metric_value
+    return max(current_metric_value, forecast)
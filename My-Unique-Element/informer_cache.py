@@ -0,0 +1,356 @@
+"""
+This file will contain the informer style local cache of the
+Kubernetes objects (Pods, Deployments) used by cls: K8s_Controller().
+
+One LIST call fills the cache, after which a resourceVersion aware
+WATCH stream keeps it current. When the API server answers with
+410 Gone the informer relists and starts watching again. Any other
+error (API or transport) marks the cache as not synced, so the reads
+fall back to the API server, and the informer relists after a backoff.
+"""
+
+import threading
+from typing import Callable, Optional
+
+from kubernetes import client, watch
+
+from capacity_index import Capacity_Index
+
+HTTP_STATUS_GONE = 410
+
+
+class Resource_Informer:
+    """This class keeps a local copy of one kind of Kubernetes
+    object and serves reads from memory."""
+
+    min_backoff = 1.0  # Seconds before the first retry after an error
+    max_backoff = 30.0
+
+    def __init__(self, list_func: Callable, watcher=None,
+                 watch_timeout: int = 60, **list_kwargs):
+        """
+        :param list_func: List function of the API client, e.g.
+                          CoreV1Api().list_pod_for_all_namespaces
+        :param watcher: Object with kubernetes.watch.Watch() interface.
+        :param watch_timeout: Seconds after which the WATCH is renewed.
+        :param list_kwargs: Extra arguments passed to list_func.
+        """
+        self.list_func = list_func
+        self.watcher = watcher if watcher is not None else watch.Watch()
+        self.watch_timeout = watch_timeout
+        self.list_kwargs = list_kwargs
+
+        self.resource_version = None
+        self.relist_count = 0
+        self.error_count = 0
+
+        self._store = {}
+        self._lock = threading.Lock()
+        self._synced = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _key(obj) -> tuple:
+        return obj.metadata.namespace, obj.metadata.name
+
+    def _on_add(self, obj) -> None:
+        """Hook for subclasses to update their indexes."""
+
+    def _on_delete(self, obj) -> None:
+        """Hook for subclasses to update their indexes."""
+
+    def _reset_indexes(self) -> None:
+        """Hook for subclasses to clear their indexes."""
+
+    def has_synced(self) -> bool:
+        """:return: True once the first LIST has been stored."""
+        return self._synced.is_set()
+
+    def relist(self) -> None:
+        """Replace the whole cache with a fresh LIST response."""
+        response = self.list_func(**self.list_kwargs)
+
+        with self._lock:
+            self._store = {}
+            self._reset_indexes()
+            for obj in response.items:
+                self._store[self._key(obj)] = obj
+                self._on_add(obj)
+            self.resource_version = response.metadata.resource_version
+
+        self.relist_count += 1
+        self._synced.set()
+
+    def apply_event(self, event_type: str, obj) -> None:
+        """
+        Apply one WATCH event to the cache.
+
+        :param event_type: ADDED, MODIFIED, DELETED or BOOKMARK.
+        :param obj: Kubernetes object attached to the event.
+        """
+        with self._lock:
+            if event_type != 'BOOKMARK':
+                key = self._key(obj)
+                old = self._store.pop(key, None)
+                if old is not None:
+                    self._on_delete(old)
+                if event_type in ('ADDED', 'MODIFIED'):
+                    self._store[key] = obj
+                    self._on_add(obj)
+
+            rv = obj.metadata.resource_version
+            if rv:
+                self.resource_version = rv
+
+    def watch_once(self) -> int:
+        """Consume one WATCH stream, relist first if needed or
+        when the API server answers 410 Gone.
+
+        :return: Number of events received from the stream.
+        """
+        if self.resource_version is None:
+            self.relist()
+
+        events = 0
+        try:
+            for event in self.watcher.stream(
+                    self.list_func,
+                    resource_version=self.resource_version,
+                    timeout_seconds=self.watch_timeout,
+                    **self.list_kwargs):
+                self.apply_event(event['type'], event['object'])
+                events += 1
+                if self._stopped.is_set():
+                    break
+        except client.exceptions.ApiException as e:
+            if e.status != HTTP_STATUS_GONE:
+                raise
+            # resourceVersion too old, start from a fresh LIST.
+            self.resource_version = None
+        return events
+
+    def run(self) -> None:
+        """Keep watching until stop() is called."""
+        backoff = self.min_backoff
+        while not self._stopped.is_set():
+            try:
+                if not self.watch_once():
+                    # A stream closed straight away would spin the CPU
+                    self._stopped.wait(self.min_backoff)
+                backoff = self.min_backoff
+            except Exception as e:
+                # API errors as well as urllib3 protocol errors, read
+                # timeouts and connection resets: stop serving the cache
+                # until a fresh LIST succeeds.
+                print(f"Exception occurred: {e!r}")
+                self.error_count += 1
+                self._synced.clear()
+                self.resource_version = None
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def start(self, wait: bool = True,
+              timeout: Optional[float] = 30.0) -> 'Resource_Informer':
+        """
+        Start watching in a daemon thread.
+
+        :param wait: Block until the first LIST is cached.
+        :param timeout: Max seconds to wait for the first LIST, after
+                        which has_synced() stays False and the reads go
+                        to the API server until the LIST succeeds.
+        """
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        if wait:
+            self._synced.wait(timeout)
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.watcher.stop()
+
+    def get(self, namespace: str, name: str):
+        """:return: Cached object or None if not found."""
+        return self._store.get((namespace, name))
+
+    def list(self, namespace: Optional[str] = None) -> list:
+        """:return: Cached objects, optionally of one namespace."""
+        with self._lock:
+            return [obj for (ns, _), obj in self._store.items()
+                    if namespace is None or ns == namespace]
+
+
+def matches_labels(labels: Optional[dict], match_labels: dict) -> bool:
+    """:return: True when the labels contain all the matchLabels of a selector."""
+    labels = labels or {}
+    return all(labels.get(key) == value for key, value in match_labels.items())
+
+
+class Pod_Informer(Resource_Informer):
+    """Pods cache which counts the Running and Pending pods per
+    namespace, and keeps the requests of the bound pods in a
+    cls: Capacity_Index() if given."""
+
+    def __init__(self, list_func: Callable, watcher=None,
+                 watch_timeout: int = 60,
+                 capacity_index: Optional[Capacity_Index] = None, **list_kwargs):
+        super().__init__(list_func, watcher, watch_timeout, **list_kwargs)
+        self.capacity_index = capacity_index
+        self._running = {}
+        self._pending = {}  # namespace -> [Pending, of which not bound to a Node]
+
+    @staticmethod
+    def _is_running(pod) -> bool:
+        return pod.status is not None and pod.status.phase == "Running"
+
+    @staticmethod
+    def _is_pending(pod) -> bool:
+        return pod.status is not None and pod.status.phase == "Pending"
+
+    @staticmethod
+    def _is_unscheduled(pod) -> bool:
+        return pod.spec is None or not pod.spec.node_name
+
+    def _on_add(self, pod) -> None:
+        ns = pod.metadata.namespace
+        if self._is_running(pod):
+            self._running[ns] = self._running.get(ns, 0) + 1
+        elif self._is_pending(pod):
+            pending = self._pending.setdefault(ns, [0, 0])
+            pending[0] += 1
+            pending[1] += self._is_unscheduled(pod)
+        if self.capacity_index is not None:
+            self.capacity_index.add_pod(pod)
+
+    def _on_delete(self, pod) -> None:
+        ns = pod.metadata.namespace
+        if self._is_running(pod):
+            self._running[ns] -= 1
+        elif self._is_pending(pod):
+            pending = self._pending[ns]
+            pending[0] -= 1
+            pending[1] -= self._is_unscheduled(pod)
+        if self.capacity_index is not None:
+            self.capacity_index.remove_pod(pod)
+
+    def _reset_indexes(self) -> None:
+        self._running = {}
+        self._pending = {}
+        if self.capacity_index is not None:
+            self.capacity_index.reset_pods()
+
+    def selected(self, namespace: str, match_labels: dict) -> list:
+        """:return: Cached pods of the namespace carrying all the labels."""
+        return [pod for pod in self.list(namespace)
+                if matches_labels(pod.metadata.labels, match_labels)]
+
+    def running_count(self, namespace: str, match_labels: Optional[dict] = None) -> int:
+        """
+        :param match_labels: Selector of a Deployment, None for all pods.
+        :return: Number of Running pods in the namespace.
+        """
+        if match_labels is None:
+            return self._running.get(namespace, 0)
+        return sum(1 for pod in self.selected(namespace, match_labels) if self._is_running(pod))
+
+    def pending_count(self, namespace: str, match_labels: Optional[dict] = None) -> tuple:
+        """:return: (Pending pods, of which not bound to a Node) in the namespace."""
+        if match_labels is None:
+            return tuple(self._pending.get(namespace, (0, 0)))
+        pending = [pod for pod in self.selected(namespace, match_labels) if self._is_pending(pod)]
+        return len(pending), sum(1 for pod in pending if self._is_unscheduled(pod))
+
+    def running_pod_ips(self, namespace: str, match_labels: Optional[dict] = None) -> list:
+        """:return: IPs of the Running pods in the namespace."""
+        pods = self.list(namespace) if match_labels is None else self.selected(namespace,
+                                                                               match_labels)
+        return [pod.status.pod_ip for pod in pods
+                if self._is_running(pod) and pod.status.pod_ip]
+
+
+class Node_Informer(Resource_Informer):
+    """Nodes cache feeding the allocatable resources of the schedulable
+    Nodes to a cls: Capacity_Index()."""
+
+    def __init__(self, list_func: Callable, watcher=None,
+                 watch_timeout: int = 60,
+                 capacity_index: Optional[Capacity_Index] = None, **list_kwargs):
+        super().__init__(list_func, watcher, watch_timeout, **list_kwargs)
+        self.capacity_index = capacity_index if capacity_index is not None else Capacity_Index()
+
+    def _on_add(self, node) -> None:
+        self.capacity_index.add_node(node)
+
+    def _on_delete(self, node) -> None:
+        self.capacity_index.remove_node(node)
+
+    def _reset_indexes(self) -> None:
+        self.capacity_index.reset_nodes()
+
+
+class Deployment_Informer(Resource_Informer):
+    """Deployments cache indexed by namespace."""
+
+    def __init__(self, list_func: Callable, watcher=None,
+                 watch_timeout: int = 60, **list_kwargs):
+        super().__init__(list_func, watcher, watch_timeout, **list_kwargs)
+        self._by_namespace = {}
+
+    def _on_add(self, deployment) -> None:
+        ns = deployment.metadata.namespace
+        self._by_namespace.setdefault(ns, {})[deployment.metadata.name] = deployment
+
+    def _on_delete(self, deployment) -> None:
+        deployments = self._by_namespace.get(deployment.metadata.namespace, {})
+        deployments.pop(deployment.metadata.name, None)
+
+    def _reset_indexes(self) -> None:
+        self._by_namespace = {}
+
+    def deployment_name(self, namespace: str) -> Optional[str]:
+        """:return: Name of the first Deployment in the namespace."""
+        deployments = self._by_namespace.get(namespace)
+        if not deployments:
+            return None
+        return next(iter(deployments))
+
+
+class Fake_List_Response:
+    """Stands in for the V1PodList / V1DeploymentList returned
+    by the API client."""
+
+    def __init__(self, items: list, resource_version: str):
+        self.items = items
+        self.metadata = client.V1ListMeta(resource_version=resource_version)
+
+
+class Fake_Watch:
+    """Offline replacement of kubernetes.watch.Watch().
+
+    Every call of stream() consumes the next batch of events.
+    A batch may be the int 410 to simulate an expired resourceVersion.
+    """
+
+    def __init__(self, batches: Optional[list] = None):
+        self.batches = list(batches or [])
+        self.calls = []
+        self._stop = False
+
+    def stream(self, func, *args, **kwargs):
+        self.calls.append(kwargs)
+        self._stop = False
+        if not self.batches:
+            return
+        batch = self.batches.pop(0)
+        if batch == HTTP_STATUS_GONE:
+            raise client.exceptions.ApiException(
+                status=HTTP_STATUS_GONE, reason="Gone: too old resource version")
+        for event_type, obj in batch:
+            if self._stop:
+                break
+            yield {'type': event_type, 'object': obj}
+
+    def stop(self):
+        self._stop = True
@@ -0,0 +1,100 @@
+"""
+This file will contain the incremental JSON parser used to read large
+Kubernetes list responses ({"kind": ..., "items": [...]}) one item at
+a time, without holding the whole payload or the parsed list in memory.
+"""
+
+import codecs
+import json
+from typing import Iterable, Iterator
+
+_WHITESPACE = ' \t\n\r'
+
+
+class _Buffer:
+    """Text decoded from byte chunks, read with a moving position."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+
+    def more(self) -> bool:
+        """Read the next chunk; drop the consumed text first."""
+        for chunk in self._chunks:
+            if not chunk:
+                continue
+            self.text = self.text[self.pos:] + self._decoder.decode(chunk)
+            self.pos = 0
+            return True
+        return False
+
+    def peek(self) -> str:
+        """:return: Next non-whitespace character, '' at the end."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.more():
+                return ''
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at position {self.pos} of JSON stream.")
+        self.pos += 1
+
+    def value(self, decoder: json.JSONDecoder):
+        """:return: Next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.more():
+                    raise
+                continue
+            # A number may continue in the next chunk
+            if end == len(self.text) and isinstance(value, (int, float)) and self.more():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_items(chunks: Iterable[bytes], key: str = 'items') -> Iterator:
+    """
+    Yield the elements of the top level array 'key' of a JSON object
+    one at a time while the chunks are read.
+
+    :param chunks: Byte chunks, e.g. response.iter_content()
+    :param key: Key of the array to stream.
+    """
+    decoder = json.JSONDecoder()
+    buffer = _Buffer(chunks)
+
+    buffer.expect('{')
+    if buffer.peek() == '}':
+        return
+
+    while True:
+        name = buffer.value(decoder)
+        buffer.expect(':')
+
+        if name == key and buffer.peek() == '[':
+            buffer.expect('[')
+            if buffer.peek() == ']':
+                buffer.pos += 1
+            else:
+                while True:
+                    yield buffer.value(decoder)
+                    if buffer.peek() == ']':
+                        buffer.pos += 1
+                        break
+                    buffer.expect(',')
+        else:
+            buffer.value(decoder)  # Skip kind, apiVersion, metadata ...
+
+        if buffer.peek() == '}':
+            return
+        buffer.expect(',')
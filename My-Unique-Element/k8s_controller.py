@@ -1,23 +1,108 @@
 from typing import Optional
 
-from kubernetes import client, config
+from kubernetes import client, watch
 
 import math
 
+from capacity_index import Capacity_Index, pod_requests
+from controller_metrics import api_call, stage
+from cpu_time_series import Cpu_Store
+from informer_cache import Pod_Informer, Deployment_Informer, Node_Informer
+from kube_client import Kube_Client, get_shared_client
+from quantity import container_cpu, parse_pod_metrics
+
+
+def label_selector(match_labels: Optional[dict]) -> Optional[str]:
+    """:return: labelSelector of the API of the matchLabels, None for no selector."""
+    if match_labels is None:
+        return None
+    return ','.join(f'{key}={value}' for key, value in sorted(match_labels.items()))
+
+
 class K8s_Controller:
 
-    def __init__(self):
+    def __init__(self, kube_client: Optional[Kube_Client] = None):
         """
         This class will have all the methods to scale Pods.
+        Create it once and reuse it for the lifetime of the process.
 
-        :param replica_count: len(Pod_CPU_Collector.get_cpu())
+        :param kube_client: Kube_Client() holding the pooled ApiClient,
+                            default is the one shared by the process.
         """
-        # Load Kubernetes configuration
-        config.load_kube_config()
+        self.kube_client = kube_client or get_shared_client()
+        self._api_client = None
+
+        # Local caches, filled by start_informers()
+        self.pod_informer = None
+        self.deployment_informer = None
+        self.node_informer = None
+
+        # Free resources of the Nodes, kept by the informers when
+        # started with nodes=True, otherwise refilled on each scale up
+        self.capacity_index = Capacity_Index()
+
+        # (namespace, deployment) -> replicas set by scale_replicas(),
+        # a hint checked against /scale since anyone may scale in between
+        self.replica_cache = {}
+
+        # (namespace, deployment) -> spec.selector.matchLabels, which
+        # apps/v1 does not allow to change
+        self.selector_cache = {}
+
+        # Sliding window of the CPU samples seen by pod_cpu_usage()
+        self.cpu_store = Cpu_Store()
 
         # API Clients
-        self.core_v1 = client.CoreV1Api()  # Manage resources
-        self.apps_v1 = client.AppsV1Api()  # Manage Deployments
+        self.refresh()
+
+    def refresh(self) -> None:
+        """
+        Rebuild the API clients only when cls: Kube_Client() reloaded
+        the kubeconfig, otherwise keep using the pooled connections.
+        """
+        api_client = self.kube_client.get()
+        if api_client is self._api_client:
+            return
+
+        self._api_client = api_client
+        self.core_v1 = client.CoreV1Api(api_client)  # Manage resources
+        self.apps_v1 = client.AppsV1Api(api_client)  # Manage Deployments
+        self.custom_objects = client.CustomObjectsApi(api_client)  # Metrics API
+
+        if self.pod_informer is not None:
+            self.pod_informer.list_func = self.core_v1.list_pod_for_all_namespaces
+        if self.deployment_informer is not None:
+            self.deployment_informer.list_func = (
+                self.apps_v1.list_deployment_for_all_namespaces)
+        if self.node_informer is not None:
+            self.node_informer.list_func = self.core_v1.list_node
+
+    def start_informers(self, watcher_factory=watch.Watch, nodes: bool = False,
+                        node_timeout: float = 10.0) -> None:
+        """
+        Start the Pod and Deployment informers so that pod_count()
+        and get_deployment_name() are served from memory.
+
+        :param watcher_factory: Callable returning a Watch() like object.
+        :param nodes: Also watch the Nodes (needs the RBAC permission to
+                      list Nodes) to keep the capacity index current.
+        :param node_timeout: Max seconds to wait for the first Node LIST.
+        """
+        self.pod_informer = Pod_Informer(
+            self.core_v1.list_pod_for_all_namespaces,
+            watcher_factory(), capacity_index=self.capacity_index).start()
+        self.deployment_informer = Deployment_Informer(
+            self.apps_v1.list_deployment_for_all_namespaces,
+            watcher_factory()).start()
+        if nodes:
+            self.node_informer = Node_Informer(
+                self.core_v1.list_node, watcher_factory(),
+                capacity_index=self.capacity_index).start(timeout=node_timeout)
+
+    def stop_informers(self) -> None:
+        for informer in (self.pod_informer, self.deployment_informer, self.node_informer):
+            if informer is not None:
+                informer.stop()
 
     def get_namespace(self, pod_name) -> Optional[str]:
         """
@@ -35,8 +120,13 @@ class K8s_Controller:
         :param namespace: Namespace of the pod.
         :return: Deployment name of the pod.
         """
-        deployments = (self.apps_v1.
-                       list_namespaced_deployment(namespace=namespace))
+        with stage('get_deployment_name'):
+            if self.deployment_informer and self.deployment_informer.has_synced():
+                return self.deployment_informer.deployment_name(namespace)
+
+            with api_call('list_namespaced_deployment'):
+                deployments = (self.apps_v1.
+                               list_namespaced_deployment(namespace=namespace))
 
         return deployments.items[0].metadata.name if (
             deployments.items[0].metadata.name) else None
@@ -67,80 +157,310 @@ class K8s_Controller:
 
         try:
             # Patch the Deployment with the new replica count
-            response = self.apps_v1.patch_namespaced_deployment(
-                name=deployment_name,
-                namespace=namespace,
-                body=scale_patch
-            )
+            with stage('scale'), api_call('patch_namespaced_deployment'):
+                response = self.apps_v1.patch_namespaced_deployment(
+                    name=deployment_name,
+                    namespace=namespace,
+                    body=scale_patch
+                )
             return response
         except client.exceptions.ApiException as e:
+            self.kube_client.handle_api_exception(e)
             print(f"Exception occurred: {e}")
 
-    def pod_count(self, namespace: str) -> int:
+    def known_replicas(self, namespace: str,
+                       deployment_name: str) -> Optional[int]:
+        """
+        :return: spec.replicas of the Deployment or None if unknown. The
+                 informer cache is trusted while synced, otherwise the
+                 replicas last set by scale_replicas() are confirmed
+                 with a read of /scale, as kubectl scale or an HPA may
+                 have changed them since.
+        """
+        if self.deployment_informer and self.deployment_informer.has_synced():
+            deployment = self.deployment_informer.get(namespace, deployment_name)
+            if deployment is not None:
+                return deployment.spec.replicas
+
+        key = (namespace, deployment_name)
+        if key not in self.replica_cache:
+            return None
+        return self.read_replicas(namespace, deployment_name)
+
+    def read_replicas(self, namespace: str, deployment_name: str) -> Optional[int]:
+        """:return: spec.replicas read from /scale, None on an API error."""
+        key = (namespace, deployment_name)
+        try:
+            with api_call('read_namespaced_deployment_scale'):
+                scale = self.apps_v1.read_namespaced_deployment_scale(deployment_name, namespace)
+        except client.exceptions.ApiException as e:
+            self.kube_client.handle_api_exception(e)
+            self.replica_cache.pop(key, None)
+            return None
+        self.replica_cache[key] = scale.spec.replicas
+        return scale.spec.replicas
+
+    def _unchanged(self, namespace: str, deployment_name: str, replicas: int) -> bool:
+        """:return: True when spec.replicas already is `replicas`."""
+        if self.deployment_informer and self.deployment_informer.has_synced():
+            return self.known_replicas(namespace, deployment_name) == replicas
+        # A cache hit is only a hint, a miss is patched right away
+        if self.replica_cache.get((namespace, deployment_name)) != replicas:
+            return False
+        return self.read_replicas(namespace, deployment_name) == replicas
+
+    def scale_replicas(self, namespace: str, deployment_name: str,
+                       replicas: int) -> Optional[client.V1Scale]:
+        """
+        Fast path of scale_deployment(): patch only spec.replicas
+        through the Deployment /scale subresource, and skip the patch
+        when the replica count already matches.
+
+        :param namespace: The namespace of the Deployment.
+        :param deployment_name: The name of the Deployment.
+        :param replicas: The desired number of replicas.
+        :return: V1Scale response or None if nothing was patched.
+        """
+        if self._unchanged(namespace, deployment_name, replicas):
+            return None
+
+        try:
+            with stage('scale'), api_call('patch_namespaced_deployment_scale'):
+                response = self.apps_v1.patch_namespaced_deployment_scale(
+                    name=deployment_name,
+                    namespace=namespace,
+                    body={"spec": {"replicas": replicas}}
+                )
+        except client.exceptions.ApiException as e:
+            self.kube_client.handle_api_exception(e)
+            print(f"Exception occurred: {e}")
+            return None
+
+        self.replica_cache[(namespace, deployment_name)] = response.spec.replicas
+        return response
+
+    def deployment_selector(self, namespace: str,
+                            deployment_name: Optional[str]) -> Optional[dict]:
+        """
+        :param deployment_name: Name of the Deployment, None for all the
+                                Pods of the namespace.
+        :return: spec.selector.matchLabels of the Deployment or None.
+        """
+        if deployment_name is None:
+            return None
+        key = (namespace, deployment_name)
+        match_labels = self.selector_cache.get(key)
+        if match_labels is None:
+            deployment = None
+            if self.deployment_informer and self.deployment_informer.has_synced():
+                deployment = self.deployment_informer.get(namespace, deployment_name)
+            if deployment is None:
+                with api_call('read_namespaced_deployment'):
+                    deployment = self.apps_v1.read_namespaced_deployment(deployment_name,
+                                                                         namespace)
+            match_labels = dict(deployment.spec.selector.match_labels or {})
+            self.selector_cache[key] = match_labels
+        return match_labels
+
+    def pod_count(self, namespace: str, deployment_name: Optional[str] = None) -> int:
         """
         :param namespace: Namespace attached to the Pods.
+        :param deployment_name: Count only the Pods of this Deployment.
         :return: Return the count of pods in the namespace
         """
-        pods = self.core_v1.list_namespaced_pod(namespace=namespace)
+        with stage('pod_count'):
+            match_labels = self.deployment_selector(namespace, deployment_name)
+            if self.pod_informer and self.pod_informer.has_synced():
+                return self.pod_informer.running_count(namespace, match_labels)
 
-        running_pods = [pod for pod in pods.items if pod.status.phase == "Running"]
+            with api_call('list_namespaced_pod'):
+                pods = self.core_v1.list_namespaced_pod(
+                    namespace=namespace, label_selector=label_selector(match_labels))
+
+            running_pods = [pod for pod in pods.items if pod.status.phase == "Running"]
 
         return len(running_pods)
 
-    def pod_cpu_usage(self, namespace):
+    def running_pod_ips(self, namespace: str, deployment_name: Optional[str] = None) -> list:
+        """
+        :param namespace: Namespace attached to the Pods.
+        :param deployment_name: Only the Pods of this Deployment.
+        :return: IPs of the Running pods, from the informer cache if synced.
+        """
+        with stage('running_pod_ips'):
+            match_labels = self.deployment_selector(namespace, deployment_name)
+            if self.pod_informer and self.pod_informer.has_synced():
+                return self.pod_informer.running_pod_ips(namespace, match_labels)
+
+            with api_call('list_namespaced_pod'):
+                pods = self.core_v1.list_namespaced_pod(
+                    namespace=namespace, label_selector=label_selector(match_labels))
+
+            return [pod.status.pod_ip for pod in pods.items
+                    if pod.status.phase == "Running" and pod.status.pod_ip]
+
+    def pending_pod_count(self, namespace: str, deployment_name: Optional[str] = None) -> tuple:
+        """
+        :param namespace: Namespace attached to the Pods.
+        :param deployment_name: Count only the Pods of this Deployment.
+        :return: (Pending pods, of which not bound to a Node yet)
+        """
+        with stage('pending_pod_count'):
+            match_labels = self.deployment_selector(namespace, deployment_name)
+            if self.pod_informer and self.pod_informer.has_synced():
+                return self.pod_informer.pending_count(namespace, match_labels)
+
+            with api_call('list_namespaced_pod'):
+                pods = self.core_v1.list_namespaced_pod(
+                    namespace=namespace, label_selector=label_selector(match_labels))
+
+            pending = [pod for pod in pods.items if pod.status.phase == "Pending"]
+            return len(pending), sum(1 for pod in pending if not pod.spec.node_name)
+
+    def refresh_capacity(self) -> None:
+        """
+        Refill the capacity index from one LIST of the Nodes and of the
+        Pods, when the informers don't keep it current.
+        """
+        if self.node_informer and self.node_informer.has_synced():
+            return
+
+        with stage('refresh_capacity'):
+            with api_call('list_node'):
+                nodes = self.core_v1.list_node()
+            with api_call('list_pod_for_all_namespaces'):
+                pods = self.core_v1.list_pod_for_all_namespaces(
+                    field_selector='status.phase!=Succeeded,status.phase!=Failed')
+
+            self.capacity_index.reset_nodes()
+            self.capacity_index.reset_pods()
+            for node in nodes.items:
+                self.capacity_index.add_node(node)
+            for pod in pods.items:
+                self.capacity_index.add_pod(pod)
+
+    def deployment_pod_requests(self, namespace: str, deployment_name: str) -> tuple:
+        """:return: (CPU millicores, memory bytes) requested by one Pod of the Deployment."""
+        deployment = None
+        if self.deployment_informer and self.deployment_informer.has_synced():
+            deployment = self.deployment_informer.get(namespace, deployment_name)
+        if deployment is None:
+            with api_call('read_namespaced_deployment'):
+                deployment = self.apps_v1.read_namespaced_deployment(deployment_name, namespace)
+        return pod_requests(deployment.spec.template.spec)
+
+    def cap_scale_up(self, namespace: str, deployment_name: str,
+                     running: int, desired: int) -> tuple:
+        """
+        Keep a scale up within what can actually be scheduled: Pending
+        Pods count as replicas in flight, and no more Pods are added
+        than fit in the free resources of the Nodes.
+
+        :param running: Running Pods the desired count was computed from.
+        :param desired: Desired replicas of the scaling policy.
+        :return: (replicas to patch or None to skip the patch,
+                  'in flight', 'capacity' or None when not capped)
+        """
+        if desired <= running:
+            return desired, None
+
+        pending, unscheduled = self.pending_pod_count(namespace, deployment_name)
+        in_flight = running + pending
+        if desired <= in_flight:
+            return None, 'in flight'
+
+        try:
+            self.refresh_capacity()
+            if not self.capacity_index.has_nodes():
+                return desired, None
+            cpu, memory = self.deployment_pod_requests(namespace, deployment_name)
+        except client.exceptions.ApiException as e:
+            # E.g. no permission to list the Nodes, scale without a cap
+            self.kube_client.handle_api_exception(e)
+            return desired, None
+
+        headroom = self.capacity_index.headroom(cpu, memory)
+        if headroom is None:
+            return desired, None
+
+        # The unscheduled Pending Pods take the free resources first
+        limit = in_flight + max(0, headroom - unscheduled)
+        if desired <= limit:
+            return desired, None
+        if limit <= in_flight:
+            return None, 'capacity'
+        return limit, 'capacity'
+
+    def pod_cpu_usage(self, namespace, deployment_name: Optional[str] = None):
         """
         Get the CPU usage for each Pod in a namespace.
 
         Parameters:
             namespace (str): The namespace to fetch Pod CPU usage from (default is "default").
+            deployment_name (str): Only the Pods of this Deployment, None for all.
 
         Returns:
-            dict: A dictionary where the keys are Pod names and values are CPU usage in millicores.
+            float: Avg CPU usage of the Pods in millicores, None when no Pod reports metrics.
         """
-        # Load Kubernetes configuration
-        config.load_kube_config()  # Use config.load_incluster_config() if running inside a cluster.
+        self.refresh()
 
-        # Create Metrics API client
-        api = client.CustomObjectsApi()
+        match_labels = self.deployment_selector(namespace, deployment_name)
 
         # Query metrics.k8s.io API for Pod metrics
-        pod_metrics = api.list_namespaced_custom_object(
-            group="metrics.k8s.io",
-            version="v1beta1",
-            namespace=namespace,
-            plural="pods"
-        )
-
-        pod_cpu_usage = {}
-        for pod in pod_metrics["items"]:
-            pod_name = pod["metadata"]["name"]
-            total_cpu = 0
-
-            # Sum CPU usage of all containers in the Pod
-            for container in pod["containers"]:
-                cpu_usage = container["usage"]["cpu"]
-
-                # Convert CPU usage to millicores
-                if cpu_usage.endswith("n"):
-                    total_cpu += int(cpu_usage[:-1]) / 1_000_000  # Convert nanocores to millicores
-                elif cpu_usage.endswith("u"):
-                    total_cpu += int(cpu_usage[:-1]) / 1_000  # Convert microcores to millicores
-                elif cpu_usage.endswith("m"):
-                    total_cpu += int(cpu_usage[:-1])  # Already in millicores
-                else:
-                    total_cpu += int(cpu_usage) * 1_000  # Convert cores to millicores
-
-            pod_cpu_usage[pod_name] = total_cpu
-
-        cpu_sum = 1
-        for pod, cpu in pod_cpu_usage.items():
-            cpu_sum += cpu
-
-        cpu_avg = cpu_sum // len(pod_cpu_usage)
+        try:
+            with stage('pod_metrics'), api_call('list_pod_metrics'):
+                pod_metrics = self.custom_objects.list_namespaced_custom_object(
+                    group="metrics.k8s.io",
+                    version="v1beta1",
+                    namespace=namespace,
+                    plural="pods",
+                    label_selector=label_selector(match_labels)
+                )
+        except client.exceptions.ApiException as e:
+            self.kube_client.handle_api_exception(e)
+            raise
+
+        # Sum CPU usage of all containers of all Pods in millicores
+        items = pod_metrics["items"]
+        with stage('parse_pod_metrics'):
+            if self.cpu_store.pod_history:
+                usage = parse_pod_metrics(items)
+                self.cpu_store.record(namespace, dict(zip(usage.names, usage.cpu.tolist())),
+                                      deployment_name)
+                cpu_sum = float(usage.cpu.sum())
+            else:
+                cpu_sum = float(container_cpu(items).sum())
+                if items:
+                    self.cpu_store.record_mean(namespace, cpu_sum / len(items), deployment_name)
+
+        if not items:
+            return None
+        cpu_avg = (1 + cpu_sum) // len(items)
 
         return cpu_avg
 
-    def calculate_desired_replicas(self, current_replicas,
+    def windowed_cpu_usage(self, namespace: str, seconds: float = 30.0,
+                           stat: str = 'mean',
+                           deployment_name: Optional[str] = None) -> Optional[float]:
+        """
+        CPU usage of the namespace over a window of recent polls of
+        pod_cpu_usage() instead of a single noisy snapshot.
+
+        :param namespace: Namespace of the pods.
+        :param seconds: Length of the window.
+        :param stat: 'mean', 'max', 'ewma' or 'p<N>' e.g. 'p95'.
+        :param deployment_name: Polls of the Pods of this Deployment.
+        :return: Avg CPU usage per pod in millicores or None if no samples.
+        """
+        series = self.cpu_store.series(namespace, deployment_name)
+        if stat == 'ewma':
+            return series.ewma
+        if stat.startswith('p'):
+            return series.percentile(float(stat[1:]), seconds=seconds)
+        return getattr(series, stat)(seconds=seconds)
+
+    @staticmethod
+    def calculate_desired_replicas(current_replicas,
                                    current_metric_value, desired_metric_value):
         """
         Calculate the desired number of replicas based on current and desired metric values.
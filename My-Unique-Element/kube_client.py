@@ -0,0 +1,100 @@
+"""
+This file will contain the process wide API client shared by every
+cls: K8s_Controller().
+
+The kubeconfig is parsed once and one pooled ApiClient keeps its HTTP
+keep-alive connections open. The kubeconfig is loaded again only when
+the file changes or the API server rejects the credentials (401).
+"""
+
+import os
+import threading
+import time
+from typing import Optional
+
+from kubernetes import client, config
+
+HTTP_STATUS_UNAUTHORIZED = 401
+
+
+class Kube_Client:
+    """This class owns the pooled ApiClient of the process."""
+
+    def __init__(self, config_file: Optional[str] = None,
+                 pool_maxsize: int = 8, check_interval: float = 5.0):
+        """
+        :param config_file: Path of the kubeconfig, default ~/.kube/config
+        :param pool_maxsize: Max keep-alive connections in the pool.
+        :param check_interval: Seconds between kubeconfig mtime checks.
+        """
+        self.config_file = os.path.expanduser(
+            config_file or os.environ.get('KUBECONFIG', '~/.kube/config')
+            .split(os.pathsep)[0])
+        self.pool_maxsize = pool_maxsize
+        self.check_interval = check_interval
+
+        self.load_count = 0
+        self._api_client = None
+        self._mtime = None
+        self._stale = False
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _config_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.config_file).st_mtime
+        except OSError:
+            return None
+
+    def _load(self) -> None:
+        """Parse the kubeconfig and build a new pooled ApiClient."""
+        configuration = client.Configuration()
+        config.load_kube_config(config_file=self.config_file,
+                                client_configuration=configuration)
+        configuration.connection_pool_maxsize = self.pool_maxsize
+
+        # The old ApiClient is left to the garbage collector because
+        # running informers may still be using its connections.
+        self._api_client = client.ApiClient(configuration)
+        self._mtime = self._config_mtime()
+        self._stale = False
+        self.load_count += 1
+
+    def get(self) -> client.ApiClient:
+        """
+        :return: Shared ApiClient, reloaded if the kubeconfig changed.
+        """
+        now = time.monotonic()
+        if self._api_client is not None and now - self._checked_at < self.check_interval:
+            return self._api_client
+
+        with self._lock:
+            self._checked_at = now
+            if (self._api_client is None or self._stale
+                    or self._config_mtime() != self._mtime):
+                self._load()
+            return self._api_client
+
+    def invalidate(self) -> None:
+        """Force a reload of the kubeconfig on the next get()."""
+        with self._lock:
+            self._stale = True
+            self._checked_at = 0.0
+
+    def handle_api_exception(self, e: client.exceptions.ApiException) -> None:
+        """Reload the credentials when the API server rejects them."""
+        if e.status == HTTP_STATUS_UNAUTHORIZED:
+            self.invalidate()
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_client() -> Kube_Client:
+    """:return: The Kube_Client() shared by the whole process."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = Kube_Client()
+        return _shared_client
@@ -0,0 +1,278 @@
+"""
+This file will contain the analytics of a comparison load test: the k6
+request stream (Testing/metrics_logs.json), tagged by URL (7080 =
+Real-Time-HPA, 9080 = HPA), joined on time windows with the Pod count
+series of each scaler (the CSV of comparison_monitor_metrics.py).
+
+Per window and scaler it reports the p50/p95/p99 latency, the failure
+rate, the throughput and the Pod-seconds. Latencies are recorded in
+log-linear (HDR) histograms, so memory only grows with the number of
+windows and the percentiles never need the requests sorted.
+
+Usage:
+    python load_analytics.py ../Testing/metrics_logs.json --monitor K8s_Pod_Metrics_Warm_Start_Test_400vm_4m.csv
+"""
+
+import argparse
+import csv
+import math
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+import pytz
+
+from forecast_replay import ENDPOINTS, iter_k6_metrics
+
+# Pod count column of the comparison monitor CSV for each scaler
+MONITOR_COLUMNS = {
+    'HPA': 'HPA Pod Count',
+    'Real-Time-HPA': 'Real Time HPA Pod Count',
+}
+
+PERCENTILES = (50, 95, 99)
+
+
+class Hdr_Histogram:
+    """
+    Counts of values in log-linear buckets: each power of two range is
+    split in sub buckets fine enough for `significant_digits` digits,
+    e.g. a relative error under 1% with 2 digits.
+    """
+
+    def __init__(self, highest: float = 3_600_000, significant_digits: int = 2,
+                 unit: float = 0.001):
+        """
+        :param highest: Largest value tracked, larger ones are clamped.
+        :param unit: Resolution of the values, 0.001 records ms as µs.
+        """
+        self.unit = unit
+        self.sub_bucket_bits = math.ceil(math.log2(2 * 10 ** significant_digits))
+        self.half_count = 1 << (self.sub_bucket_bits - 1)
+        self.highest = int(highest / unit)
+        self.counts = np.zeros(self._index(self.highest) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, value: int) -> int:
+        shift = max(0, value.bit_length() - self.sub_bucket_bits)
+        return (shift * self.half_count) + (value >> shift)
+
+    def _indexes(self, values: np.ndarray) -> np.ndarray:
+        _, bit_length = np.frexp(values.astype(np.float64))
+        shift = np.maximum(0, bit_length - self.sub_bucket_bits)
+        return shift * self.half_count + (values >> shift)
+
+    def _highest_equivalent(self, index: np.ndarray) -> np.ndarray:
+        shift = np.maximum(0, index // self.half_count - 1)
+        sub_bucket = index - shift * self.half_count
+        return (((sub_bucket + 1) << shift) - 1) * self.unit
+
+    def record(self, value: float, count: int = 1) -> None:
+        scaled = min(max(int(value / self.unit), 0), self.highest)
+        self.counts[self._index(scaled)] += count
+        self.count += count
+        self.total += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def record_many(self, values) -> None:
+        """Vectorized record() of an array of values."""
+        values = np.asarray(values, dtype=np.float64)
+        if not values.size:
+            return
+        scaled = np.clip((values / self.unit).astype(np.int64), 0, self.highest)
+        self.counts += np.bincount(self._indexes(scaled), minlength=len(self.counts))
+        self.count += values.size
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: 'Hdr_Histogram') -> 'Hdr_Histogram':
+        if len(other.counts) != len(self.counts) or other.unit != self.unit:
+            raise ValueError("Histograms of different ranges can't be merged.")
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def value_at_percentile(self, percentile: float) -> float:
+        """:return: Highest value equivalent to the percentile, NaN when empty."""
+        if not self.count:
+            return math.nan
+        rank = max(1, math.ceil(percentile / 100 * self.count))
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return min(float(self._highest_equivalent(index)), self.max)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else math.nan
+
+
+class Window_Stats:
+    """Requests of one scaler in one time window."""
+
+    def __init__(self):
+        self.histogram = Hdr_Histogram()
+        self.failures = 0
+
+    @property
+    def requests(self) -> int:
+        return self.histogram.count
+
+
+def pod_seconds(times: np.ndarray, pods: np.ndarray, start: float, end: float) -> float:
+    """
+    Integral of the Pod count over [start, end), each sample holding
+    until the next one (the first one also before it).
+    """
+    if not len(times):
+        return 0.0
+    edges = np.clip(np.append(times[1:], end), start, end)
+    begins = np.clip(np.insert(times[1:], 0, start), start, end)
+    return float(np.sum(pods * (edges - begins)))
+
+
+class Load_Test_Analyzer:
+    """Joins the k6 requests and the Pod counts of each scaler on windows."""
+
+    def __init__(self, window: float = 10.0):
+        """:param window: Seconds of a window, aligned to the epoch."""
+        self.window = window
+        self.windows = defaultdict(Window_Stats)  # (scaler, window start) -> stats
+        self._pods = defaultdict(list)           # scaler -> [(time, Pod count)]
+
+    def _window_start(self, timestamp: float) -> float:
+        return math.floor(timestamp / self.window) * self.window
+
+    def add_request(self, timestamp: float, scaler: str, duration_ms: float,
+                    failed: bool = False) -> None:
+        stats = self.windows[(scaler, self._window_start(timestamp))]
+        stats.histogram.record(duration_ms)
+        stats.failures += bool(failed)
+
+    def add_requests(self, timestamps, scalers, durations_ms, failed=None) -> None:
+        """Vectorized add_request() of arrays, e.g. read from a Columnar_Store."""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        scalers = np.asarray(scalers)
+        durations_ms = np.asarray(durations_ms, dtype=np.float64)
+        failed = np.zeros(len(timestamps), dtype=bool) if failed is None else np.asarray(failed, dtype=bool)
+        starts = np.floor(timestamps / self.window) * self.window
+        for scaler in np.unique(scalers):
+            of_scaler = scalers == scaler
+            for start in np.unique(starts[of_scaler]):
+                selected = of_scaler & (starts == start)
+                stats = self.windows[(scaler.item(), float(start))]
+                stats.histogram.record_many(durations_ms[selected])
+                stats.failures += int(failed[selected].sum())
+
+    def add_pod_sample(self, timestamp: float, scaler: str, pod_count: int) -> None:
+        self._pods[scaler].append((timestamp, pod_count))
+
+    def _pod_series(self, scaler: str):
+        samples = sorted(self._pods.get(scaler, ()))
+        series = np.array(samples, dtype=np.float64).reshape(-1, 2)
+        return series[:, 0], series[:, 1]
+
+    def report(self) -> list:
+        """:return: One dict per scaler and window, in time order."""
+        series = {scaler: self._pod_series(scaler) for scaler in self._pods}
+        rows = []
+        for (scaler, start), stats in sorted(self.windows.items(), key=lambda item: (item[0][1], item[0][0])):
+            row = {
+                'scaler': scaler,
+                'window_start': start,
+                'requests': stats.requests,
+                'throughput': stats.requests / self.window,
+                'failure_rate': stats.failures / stats.requests if stats.requests else 0.0,
+            }
+            for percentile in PERCENTILES:
+                row[f'p{percentile}'] = stats.histogram.value_at_percentile(percentile)
+            if scaler in series:
+                row['pod_seconds'] = pod_seconds(*series[scaler], start, start + self.window)
+            else:
+                row['pod_seconds'] = math.nan
+            rows.append(row)
+        return rows
+
+    def summary(self) -> dict:
+        """:return: {scaler: totals over the whole run}"""
+        result = {}
+        for scaler in sorted({scaler for scaler, _ in self.windows}):
+            windows = {start: stats for (name, start), stats in self.windows.items() if name == scaler}
+            histogram = Hdr_Histogram()
+            for stats in windows.values():
+                histogram.merge(stats.histogram)
+            start, end = min(windows), max(windows) + self.window
+            failures = sum(stats.failures for stats in windows.values())
+            result[scaler] = {
+                'requests': histogram.count,
+                'throughput': histogram.count / (end - start),
+                'failure_rate': failures / histogram.count if histogram.count else 0.0,
+                'mean': histogram.mean,
+                **{f'p{percentile}': histogram.value_at_percentile(percentile)
+                   for percentile in PERCENTILES},
+                'pod_seconds': (pod_seconds(*self._pod_series(scaler), start, end)
+                                if scaler in self._pods else math.nan),
+            }
+        return result
+
+
+def load_k6_log(analyzer: Load_Test_Analyzer, log_file: str) -> int:
+    """:return: Number of requests added from the k6 log."""
+    count = 0
+    for metrics in iter_k6_metrics(log_file):
+        scaler = ENDPOINTS.get(metrics.get('url'), metrics.get('url'))
+        analyzer.add_request(metrics['timestamp'], scaler, metrics.get('http_req_duration') or 0,
+                             metrics.get('http_req_failed'))
+        count += 1
+    return count
+
+
+def load_monitor_csv(analyzer: Load_Test_Analyzer, csv_file: str,
+                     timezone: str = 'Europe/Dublin') -> int:
+    """
+    :param timezone: Zone of the local time the monitor wrote.
+    :return: Number of rows added from the monitor CSV.
+    """
+    zone = pytz.timezone(timezone)
+    count = 0
+    with open(csv_file, newline='') as file:
+        for row in csv.DictReader(file):
+            moment = zone.localize(datetime.strptime(row['Datetime'], '%Y-%m-%dT%H:%M:%S'))
+            for scaler, column in MONITOR_COLUMNS.items():
+                if row.get(column):
+                    analyzer.add_pod_sample(moment.timestamp(), scaler, int(row[column]))
+            count += 1
+    return count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('log_file', nargs='?', default='../Testing/metrics_logs.json')
+    parser.add_argument('--monitor', help='CSV of comparison_monitor_metrics.py')
+    parser.add_argument('--window', type=float, default=10.0)
+    parser.add_argument('--timezone', default='Europe/Dublin')
+    args = parser.parse_args()
+
+    load_test_analyzer = Load_Test_Analyzer(args.window)
+    load_k6_log(load_test_analyzer, args.log_file)
+    if args.monitor:
+        load_monitor_csv(load_test_analyzer, args.monitor, args.timezone)
+
+    print(f"{'Window':<22}{'Scaler':<15}{'Req/s':>8}{'Fail %':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'Pod-s':>8}")
+    for window_row in load_test_analyzer.report():
+        moment = datetime.fromtimestamp(window_row['window_start']).strftime('%Y-%m-%dT%H:%M:%S')
+        print(f"{moment:<22}{window_row['scaler']:<15}{window_row['throughput']:>8.1f}"
+              f"{window_row['failure_rate'] * 100:>8.1f}{window_row['p50']:>9.0f}"
+              f"{window_row['p95']:>9.0f}{window_row['p99']:>9.0f}{window_row['pod_seconds']:>8.0f}")
+    print()
+    for name, totals in load_test_analyzer.summary().items():
+        print(f"{name}: {totals['requests']} requests, {totals['throughput']:.1f} req/s, "
+              f"{totals['failure_rate'] * 100:.1f}% failed, p50 {totals['p50']:.0f} ms, "
+              f"p95 {totals['p95']:.0f} ms, p99 {totals['p99']:.0f} ms, "
+              f"{totals['pod_seconds']:.0f} Pod-seconds")
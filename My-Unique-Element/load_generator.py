@@ -0,0 +1,398 @@
+"""
+This file will contain the asyncio load generator of the benchmarks.
+
+Requests go through a pool of keep-alive HTTP/1.1 connections written
+directly on asyncio streams, so one process drives hundreds of virtual
+users (VUs) or thousands of requests per second.
+
+Load_Generator           -- Closed loop: the VUs follow k6 like stages,
+                            each one sending a request, waiting for the
+                            response and sleeping `think_time`, like the
+                            k6 scripts in Testing/ with sleep(1).
+Open_Loop_Load_Generator -- Open loop: requests are sent at the times of
+                            an arrival rate profile whether or not the
+                            previous ones were answered, and the latency
+                            is measured from the scheduled send time, so
+                            a slow service can't lower the offered load
+                            and hide its own latency (coordinated omission).
+
+Usage:
+    python load_generator.py http://127.0.0.1:8000/ --profile spiky --rate 20 --peak 200 --duration 60
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import time
+from collections import defaultdict
+from typing import Callable, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+from load_analytics import PERCENTILES, Hdr_Histogram
+
+# Errors of a request counted as a failure
+REQUEST_ERRORS = (OSError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError)
+
+
+class Http_Pool:
+    """Keep-alive HTTP/1.1 GET requests over pooled asyncio connections."""
+
+    def __init__(self, max_idle: int = 64):
+        """:param max_idle: Idle connections kept per host and port."""
+        self.max_idle = max_idle
+        self.connections_opened = 0
+        self._idle = defaultdict(list)  # (host, port) -> [(reader, writer)]
+
+    async def _connect(self, host: str, port: int) -> tuple:
+        self.connections_opened += 1
+        return await asyncio.open_connection(host, port)
+
+    async def get(self, host: str, port: int, path: str = '/') -> tuple:
+        """:return: (status code, body bytes)"""
+        idle = self._idle[(host, port)]
+        reused = bool(idle)
+        reader, writer = idle.pop() if reused else await self._connect(host, port)
+        try:
+            status, body, keep_alive = await self._request(reader, writer, host, port, path)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+            if not reused:
+                raise
+            # The server closed the idle connection, retry on a new one
+            reader, writer = await self._connect(host, port)
+            status, body, keep_alive = await self._request(reader, writer, host, port, path)
+        except BaseException:
+            writer.close()
+            raise
+
+        if keep_alive and len(idle) < self.max_idle:
+            idle.append((reader, writer))
+        else:
+            writer.close()
+        return status, body
+
+    @staticmethod
+    async def _request(reader, writer, host: str, port: int, path: str) -> tuple:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n\r\n'.encode())
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError('Connection closed by the server.')
+        status = int(status_line.split()[1])
+
+        length, chunked, keep_alive = None, False, True
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.partition(b':')
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == b'content-length':
+                length = int(value)
+            elif name == b'transfer-encoding':
+                chunked = value == b'chunked'
+            elif name == b'connection':
+                keep_alive = value != b'close'
+
+        if chunked:
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                chunk = await reader.readexactly(size + 2)  # Data and CRLF
+                if not size:
+                    break
+                chunks.append(chunk[:-2])
+            body = b''.join(chunks)
+        elif length is not None:
+            body = await reader.readexactly(length)
+        else:
+            body, keep_alive = await reader.read(), False
+        return status, body, keep_alive
+
+    def close(self) -> None:
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle.clear()
+
+
+def stage_target(stages: list, elapsed: float, start: float = 0.0) -> float:
+    """
+    :param stages: List of (duration seconds, target) ramped linearly
+                   like the k6 stages.
+    :param start: Target before the first stage.
+    :return: Target `elapsed` seconds into the stages, None after them.
+    """
+    previous = start
+    for duration, target in stages:
+        if elapsed < duration:
+            return previous + (target - previous) * elapsed / duration
+        elapsed -= duration
+        previous = target
+    return None
+
+
+class Request_Record(NamedTuple):
+    """One request, with the fields of the k6 console lines."""
+    timestamp: float  # POSIX seconds at the response
+    url: str
+    vus: int
+    http_req_duration: float  # ms
+    http_req_failed: int
+
+
+class Load_Generator:
+    """Closed loop VUs following k6 like stages."""
+
+    def __init__(self, targets: Callable[[], list], stages: list, url: str = 'local',
+                 think_time: float = 1.0, path: str = '/', timeout: float = 60.0,
+                 seed: Optional[int] = None):
+        """
+        :param targets: Returns the (host, port) of the Ready Pods, one
+                        is picked at random for each request.
+        :param url: Label of the requests, like the url of k6.
+        :param timeout: Seconds after which a request counts as failed.
+        """
+        self.targets = targets
+        self.stages = stages
+        self.url = url
+        self.think_time = think_time
+        self.path = path
+        self.timeout = timeout
+        self.records = []
+        self.active = 0
+        self._random = random.Random(seed)
+        self.pool = Http_Pool()
+
+    async def request(self) -> tuple:
+        """:return: (duration ms, failed) of one request to a random Pod."""
+        targets = self.targets()
+        started = time.perf_counter()
+        if not targets:
+            return 0.0, 1  # No Ready Pod behind the Service
+        host, port = self._random.choice(targets)
+        try:
+            status, _ = await asyncio.wait_for(self.pool.get(host, port, self.path), self.timeout)
+            failed = int(status != 200)
+        except REQUEST_ERRORS:
+            failed = 1
+        return (time.perf_counter() - started) * 1000, failed
+
+    async def _vu(self, number: int) -> None:
+        # A VU past the active count stops after its iteration
+        while number < self.active:
+            duration, failed = await self.request()
+            self.records.append(Request_Record(time.time(), self.url, number + 1, duration, failed))
+            await asyncio.sleep(self.think_time)
+
+    async def run(self, tick: float = 0.1) -> list:
+        """
+        Run the stages to the end.
+
+        :param tick: Seconds between two adjustments of the VU count.
+        :return: Request_Record of every request.
+        """
+        started = time.monotonic()
+        tasks = {}
+        try:
+            while True:
+                target = stage_target(self.stages, time.monotonic() - started)
+                if target is None:
+                    break
+                self.active = int(round(target))
+                for number in range(self.active):
+                    if number not in tasks or tasks[number].done():
+                        tasks[number] = asyncio.ensure_future(self._vu(number))
+                await asyncio.sleep(tick)
+            self.active = 0
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+            self.pool.close()
+        return self.records
+
+
+def constant_rate(rate: float, duration: float) -> tuple:
+    """:return: (stages, start rate) of a constant arrival rate."""
+    return [(duration, rate)], rate
+
+
+def ramp_rate(start: float, end: float, duration: float) -> tuple:
+    """:return: (stages, start rate) of a linear ramp of the arrival rate."""
+    return [(duration, end)], start
+
+
+def spiky_rate(base: float, peak: float, duration: float, period: float = 20.0,
+               spike: float = 2.0) -> tuple:
+    """
+    :param period: Seconds between the starts of two spikes.
+    :param spike: Seconds of a spike at the peak rate.
+    :return: (stages, start rate) of a base rate with square spikes.
+    """
+    stages = []
+    elapsed = 0.0
+    while elapsed < duration:
+        quiet = min(period - spike, duration - elapsed)
+        stages += [(quiet, base), (1e-6, peak)]
+        elapsed += quiet
+        high = min(spike, duration - elapsed)
+        if high > 0:
+            stages += [(high, peak), (1e-6, base)]
+            elapsed += high
+    return stages, base
+
+
+ARRIVAL_PROFILES = {
+    'constant': lambda rate, peak, duration: constant_rate(rate, duration),
+    'ramp': lambda rate, peak, duration: ramp_rate(rate, peak, duration),
+    'spiky': lambda rate, peak, duration: spiky_rate(rate, peak, duration),
+}
+
+
+class Open_Loop_Load_Generator:
+    """Requests at the times of an arrival rate profile."""
+
+    def __init__(self, targets: Callable[[], list], stages: list, start_rate: float = 0.0,
+                 path: str = '/', timeout: float = 60.0, poisson: bool = False,
+                 max_in_flight: int = 10_000, seed: Optional[int] = None):
+        """
+        :param stages: List of (duration seconds, requests per second)
+                       ramped linearly like the k6 stages.
+        :param start_rate: Requests per second before the first stage.
+        :param poisson: Exponential gaps between the requests instead of
+                        evenly spaced ones.
+        :param max_in_flight: Requests in flight above which the next
+                              ones are dropped (counted as failed).
+        """
+        self.targets = targets
+        self.stages = stages
+        self.start_rate = start_rate
+        self.path = path
+        self.timeout = timeout
+        self.poisson = poisson
+        self.max_in_flight = max_in_flight
+        self.histogram = Hdr_Histogram()  # Latency of the successful requests, ms
+        self.sent = 0
+        self.failures = 0
+        self.dropped = 0
+        self.in_flight = 0
+        self.max_lateness = 0.0  # Seconds the generator sent behind schedule
+        self.elapsed = 0.0
+        self.pool = Http_Pool(max_idle=1024)
+        self._random = random.Random(seed)
+
+    def send_times(self):
+        """
+        Yield the scheduled send times, in seconds from the start: the
+        next request is due when the integral of the rate over the gap
+        reaches 1 (or an exponential draw), solved exactly on each
+        linear stage.
+        """
+        budget = self._random.expovariate(1.0) if self.poisson else 1.0
+        moment = stage_start = 0.0
+        previous = self.start_rate
+        for duration, target in self.stages:
+            end = stage_start + duration
+            slope = (target - previous) / duration if duration else 0.0
+            while True:
+                rate = previous + slope * (moment - stage_start)
+                remaining = (rate + target) / 2 * (end - moment)
+                if remaining < budget - 1e-9:  # Float error at the stage end
+                    budget -= remaining
+                    break
+                # rate * step + slope / 2 * step ** 2 = budget
+                moment += 2 * budget / (rate + math.sqrt(max(0.0, rate * rate + 2 * slope * budget)))
+                yield moment
+                budget = self._random.expovariate(1.0) if self.poisson else 1.0
+            moment = stage_start = end
+            previous = target
+
+    async def _send(self, host: str, port: int, scheduled: float, clock) -> None:
+        try:
+            status, _ = await asyncio.wait_for(self.pool.get(host, port, self.path), self.timeout)
+            failed = status != 200
+        except REQUEST_ERRORS:
+            failed = True
+        self.in_flight -= 1
+        if failed:
+            self.failures += 1
+        else:
+            self.histogram.record((clock() - scheduled) * 1000)
+
+    async def run(self) -> dict:
+        """
+        Send the requests of the whole profile and wait for the answers.
+
+        :return: summary()
+        """
+        loop = asyncio.get_running_loop()
+        clock = loop.time
+        start = clock()
+        pending = set()
+        try:
+            for moment in self.send_times():
+                scheduled = start + moment
+                delay = scheduled - clock()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    self.max_lateness = max(self.max_lateness, -delay)
+
+                self.sent += 1
+                targets = self.targets()
+                if not targets or self.in_flight >= self.max_in_flight:
+                    self.dropped += 1
+                    self.failures += 1
+                    continue
+                host, port = self._random.choice(targets)
+                self.in_flight += 1
+                task = loop.create_task(self._send(host, port, scheduled, clock))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            for task in pending:
+                task.cancel()
+            self.pool.close()
+        self.elapsed = clock() - start
+        return self.summary()
+
+    def summary(self) -> dict:
+        return {
+            'sent': self.sent,
+            'completed': self.histogram.count,
+            'failures': self.failures,
+            'dropped': self.dropped,
+            'rate': self.sent / self.elapsed if self.elapsed else 0.0,
+            **{f'p{percentile}': self.histogram.value_at_percentile(percentile)
+               for percentile in PERCENTILES},
+            'max': self.histogram.max if self.histogram.count else None,
+            'max_lateness_ms': self.max_lateness * 1000,
+            'connections': self.pool.connections_opened,
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Open loop load test of the app.')
+    parser.add_argument('url', nargs='?', default='http://127.0.0.1:8000/')
+    parser.add_argument('--profile', choices=sorted(ARRIVAL_PROFILES), default='constant')
+    parser.add_argument('--rate', type=float, default=10.0, help='Requests per second')
+    parser.add_argument('--peak', type=float, default=50.0,
+                        help='Rate at the end of the ramp or of the spikes')
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--poisson', action='store_true')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    parts = urlsplit(args.url)
+    target = (parts.hostname, parts.port or 80)
+    path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    profile_stages, profile_start = ARRIVAL_PROFILES[args.profile](args.rate, args.peak, args.duration)
+    load_generator = Open_Loop_Load_Generator(
+        lambda: [target], profile_stages, profile_start, path=path,
+        timeout=args.timeout, poisson=args.poisson, seed=args.seed)
+    for key, value in asyncio.run(load_generator.run()).items():
+        print(f"{key:<16}{value}")
@@ -4,22 +4,154 @@ metrics data from exposed Metrics Service API of Kubernetes
 cluster.
 """
 
-from bs4 import BeautifulSoup
 import requests
 import json
 import pytz
+import time
+from array import array
 from datetime import datetime
+from typing import Iterator, NamedTuple, Optional
+
+from requests.adapters import HTTPAdapter
 
 from custom_exceptions import AlreadyExistsError
+from json_stream import iter_json_items
+from quantity import cpu_to_millicores, parse_pod_metrics
+
+_session = None
+
+
+def get_session(pool_maxsize: int = 8) -> requests.Session:
+    """
+    :return: requests.Session() shared by all cls: Metrics_Collector()
+             so that the keep-alive connections are reused.
+    """
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        _session.mount('http://', adapter)
+        _session.mount('https://', adapter)
+    return _session
+
+
+class Pod_Metrics(NamedTuple):
+    """Metrics of one pod in a cls: Pod_Metrics_Snapshot()."""
+    name: str
+    namespace: str
+    cpu: float  # millicores
+    memory: int  # bytes
+    creation_timestamp: str
+
+
+class Snapshot_Diff(NamedTuple):
+    """Difference between two cls: Pod_Metrics_Snapshot()."""
+    added: frozenset
+    removed: frozenset
+    cpu_delta: dict  # pod name -> millicores, for pods in both snapshots
+
+
+class Pod_Metrics_Snapshot:
+    """Immutable metrics of all pods of one poll of the Metrics
+    Service. Values are kept in arrays instead of one dict per pod."""
+
+    __slots__ = ('taken_at', '_names', '_namespaces', '_cpu', '_memory',
+                 '_creation', '_index')
+
+    def __init__(self, names, namespaces, cpu, memory, creation,
+                 taken_at: Optional[float] = None):
+        """
+        :param names: Pod names.
+        :param namespaces: Namespace of each pod.
+        :param cpu: CPU usage of each pod in millicores.
+        :param memory: Memory usage of each pod in bytes.
+        :param creation: creationTimestamp of each pod.
+        :param taken_at: time.time() of the poll.
+        """
+        setattr_ = object.__setattr__
+        setattr_(self, 'taken_at', time.time() if taken_at is None else taken_at)
+        setattr_(self, '_names', tuple(names))
+        setattr_(self, '_namespaces', tuple(namespaces))
+        setattr_(self, '_cpu', array('d', cpu))
+        setattr_(self, '_memory', array('q', memory))
+        setattr_(self, '_creation', tuple(creation))
+        setattr_(self, '_index', {name: i for i, name in enumerate(self._names)})
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    @classmethod
+    def from_metrics(cls, metrics: list,
+                     taken_at: Optional[float] = None) -> 'Pod_Metrics_Snapshot':
+        """
+        :param metrics: 'items' of the Metrics Service JSON response.
+        :param taken_at: time.time() of the poll.
+        """
+        usage = parse_pod_metrics(metrics)
+        creation = [pod['metadata'].get('creationTimestamp', '') for pod in metrics]
+        return cls(usage.names, usage.namespaces, usage.cpu, usage.memory,
+                   creation, taken_at)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, pod_name: str) -> bool:
+        return pod_name in self._index
+
+    def __iter__(self):
+        for i in range(len(self._names)):
+            yield self._pod(i)
+
+    def _pod(self, i: int) -> Pod_Metrics:
+        return Pod_Metrics(self._names[i], self._namespaces[i], self._cpu[i],
+                           self._memory[i], self._creation[i])
+
+    def get(self, pod_name: str) -> Pod_Metrics:
+        """Return metrics of the pod else raise KeyError."""
+        if pod_name not in self._index:
+            raise KeyError(f"Pod name '{pod_name}' not found in snapshot.")
+        return self._pod(self._index[pod_name])
+
+    @property
+    def names(self) -> tuple:
+        return self._names
+
+    @property
+    def cpu(self) -> memoryview:
+        """CPU usage of each pod in millicores, same order as names (read-only)."""
+        return memoryview(self._cpu).toreadonly()
+
+    @property
+    def memory(self) -> memoryview:
+        """Memory usage of each pod in bytes, same order as names (read-only)."""
+        return memoryview(self._memory).toreadonly()
+
+    def avg_cpu(self) -> float:
+        """:return: Avg CPU usage of the pods in millicores."""
+        return sum(self._cpu) / len(self._cpu) if len(self._cpu) else 0.0
+
+    def diff(self, previous: 'Pod_Metrics_Snapshot') -> Snapshot_Diff:
+        """
+        :param previous: Snapshot of the previous poll.
+        :return: Added and removed pods and the CPU change of the others.
+        """
+        current, before = self._index.keys(), previous._index.keys()
+        cpu_delta = {name: self._cpu[i] - previous._cpu[previous._index[name]]
+                     for name, i in self._index.items() if name in before}
+        return Snapshot_Diff(frozenset(current - before),
+                             frozenset(before - current), cpu_delta)
 
 
 class Metric_Data:
     """This class will store below information
-    of the Pods."""
-    NAME = set()
-    CPU = {}
-    CPU_LIST = []
-    CREATION_DATETIME = {}
+    of the Pods. Every instance has its own collections so that
+    collectors of different namespaces do not share state."""
+
+    def __init__(self):
+        self.NAME = set()
+        self.CPU = {}
+        self.CPU_LIST = []
+        self.CREATION_DATETIME = {}
 
     def _convert_dub_datetime(self, dt):
         utc_time = datetime.strptime(dt, '%Y-%m-%dT%H:%M:%SZ')
@@ -34,18 +166,43 @@ class Metrics_Collector(Metric_Data):
     """This class collects various information from
     the exposed Metrics Service of Kubernetes cluster."""
 
-    def __init__(self, metrics_url):
+    def __init__(self, metrics_url, session: Optional[requests.Session] = None,
+                 timeout: float = 5.0):
+        """
+        :param metrics_url: Namespace URL of the Metrics Server.
+        :param session: requests.Session(), default is the shared one.
+        :param timeout: Seconds to wait for the Metrics Server.
+        """
         super().__init__()
         self.metrics_url = metrics_url
+        self.session = session or get_session()
+        self.timeout = timeout
 
-    def get_metrics(self) -> json:
-        response = requests.get(self.metrics_url)
-        # Parse the HTML content
-        soup = BeautifulSoup(response.content, 'html.parser')
-        json_response = json.loads(soup.text)
+    def get_metrics(self) -> list:
+        """:return: 'items' of the Metrics Service JSON response."""
+        response = self.session.get(self.metrics_url, timeout=self.timeout)
+        response.raise_for_status()
+        # Decode the JSON bytes directly
+        json_response = json.loads(response.content)
 
         return json_response['items']
 
+    def iter_metrics(self, chunk_size: int = 64 * 1024) -> Iterator[dict]:
+        """
+        Yield the pod metrics one at a time while the response is
+        read, so large namespaces are never held in memory at once.
+
+        :param chunk_size: Bytes read from the socket at a time.
+        """
+        with self.session.get(self.metrics_url, timeout=self.timeout,
+                              stream=True) as response:
+            response.raise_for_status()
+            yield from iter_json_items(response.iter_content(chunk_size))
+
+    def snapshot(self) -> Pod_Metrics_Snapshot:
+        """:return: cls: Pod_Metrics_Snapshot() of the current poll."""
+        return Pod_Metrics_Snapshot.from_metrics(self.get_metrics())
+
 
 class Pod_NAME_Collector(Metric_Data):
     """This method communicates with Metrics Service URL
@@ -143,26 +300,14 @@ class Pod_CPU_Collector(Metric_Data):
             raise KeyError(f"Pod name '{pod_name}' not found in CPU Storage.")
         return self.CPU.get(pod_name)
 
-    def _microcore_to_millicore(self, microcores):
-        return int(microcores) / 1_000
-
-    def _nanocore_to_millicore(self, nanocores):
-        return int(nanocores) / 1_000_000
-
-    def _convert_cpu_to_millicore(self, cpu_value: str) -> int:
+    def _convert_cpu_to_millicore(self, cpu_value: str) -> float:
         """
-        Calculates CPU values fron nanocore, microcore to millicore.
+        Calculates CPU values from any CPU quantity (nanocore,
+        microcore, millicore or cores) to millicore.
         :param cpu_value: Provide single CPU value.
-        :return: Convert and return value in int
+        :return: Convert and return value in millicores
         """
-        if 'u' in cpu_value:
-            micro_cpu_val = cpu_value.split('u')[0]
-            cpu_value = self._microcore_to_millicore(micro_cpu_val)
-        if 'n' in cpu_value:
-            nano_cpu_val = cpu_value.split('n')[0]
-            cpu_value = self._nanocore_to_millicore(nano_cpu_val)
-
-        return cpu_value
+        return cpu_to_millicores(cpu_value)
 
     def avg_cpu_consumed(self) -> int:
         """
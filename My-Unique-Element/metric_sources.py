@@ -0,0 +1,150 @@
+"""
+This file will contain the pluggable sources of the metric the scalers
+act on, one value per Pod (averaged over the Running Pods).
+
+metrics-server -- Avg CPU usage in millicores from metrics.k8s.io, which
+                  metrics.yaml configures with a 15s resolution.
+pod-stats      -- In-flight requests, RPS or queued work read from the
+                  /stats endpoint of every Pod (app/stats.py) at once,
+                  fresh on every read and summed over the uvicorn
+                  workers of the Pod. A Pod that does not answer in
+                  time is likely saturated, it counts as the busiest
+                  Pod that answered.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from controller_metrics import stage
+from k8s_controller import K8s_Controller
+
+
+class Metric_Unavailable(RuntimeError):
+    """Raised when no Pod reported the metric."""
+
+
+class Metric_Source:
+    """Base class of the metric sources."""
+
+    def read(self, namespace: str, deployment_name: Optional[str] = None) -> float:
+        """
+        :param namespace: Namespace of the Pods.
+        :param deployment_name: Only the Pods of this Deployment, None for
+                                all the Pods of the namespace.
+        :return: Value of the metric per Pod.
+        """
+        raise NotImplementedError
+
+
+class Metrics_Server_Source(Metric_Source):
+    """Avg CPU usage of the Pods from metrics.k8s.io."""
+
+    def __init__(self, k8s_controller: K8s_Controller, window: Optional[float] = None):
+        """
+        :param window: Seconds of samples averaged by
+                       windowed_cpu_usage(), None for the last sample.
+        """
+        self.k8s_controller = k8s_controller
+        self.window = window
+
+    def read(self, namespace: str, deployment_name: Optional[str] = None) -> float:
+        cpu_usage = self.k8s_controller.pod_cpu_usage(namespace, deployment_name)
+        if cpu_usage is None:
+            raise Metric_Unavailable(f"No Running Pod in {namespace} reports metrics.")
+        if self.window:
+            return self.k8s_controller.windowed_cpu_usage(namespace, self.window,
+                                                          deployment_name=deployment_name)
+        return cpu_usage
+
+
+class Pod_Stats_Source(Metric_Source):
+    """Scrapes the /stats endpoint of every Running Pod concurrently."""
+
+    def __init__(self, k8s_controller: K8s_Controller, field: str = 'in_flight',
+                 port: int = 80, path: str = '/stats', timeout: float = 0.5,
+                 max_workers: int = 16, max_failed_fraction: float = 0.1):
+        """
+        :param field: Key of the /stats JSON to scale on, e.g. 'in_flight',
+                      'rps' or 'pending'.
+        :param port: Container port of the app.
+        :param timeout: Seconds after which a Pod counts as failed.
+        :param max_workers: Pods scraped at the same time.
+        :param max_failed_fraction: Share of the Pods which may fail before
+                                    the read raises Metric_Unavailable.
+        """
+        self.k8s_controller = k8s_controller
+        self.field = field
+        self.port = port
+        self.path = path
+        self.timeout = timeout
+        self.max_failed_fraction = max_failed_fraction
+        self.error_count = 0
+
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='pod-stats')
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=64, pool_maxsize=2)
+        self._session.mount('http://', adapter)
+
+    def pod_addresses(self, namespace: str, deployment_name: Optional[str] = None) -> list:
+        """:return: 'host:port' of the Running Pods."""
+        return [f'{pod_ip}:{self.port}'
+                for pod_ip in self.k8s_controller.running_pod_ips(namespace, deployment_name)]
+
+    def _scrape_pod(self, address: str) -> Optional[dict]:
+        try:
+            response = self._session.get(f'http://{address}{self.path}',
+                                         timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError):
+            self.error_count += 1
+            return None
+
+    def _scrape_all(self, namespace: str, deployment_name: Optional[str]) -> dict:
+        """:return: {'host:port': /stats JSON or None when the Pod failed}"""
+        addresses = self.pod_addresses(namespace, deployment_name)
+        with stage('pod_stats'):
+            return dict(zip(addresses, self._executor.map(self._scrape_pod, addresses)))
+
+    def scrape(self, namespace: str, deployment_name: Optional[str] = None) -> dict:
+        """:return: {'host:port': /stats JSON} of the Pods that answered."""
+        return {address: stats for address, stats
+                in self._scrape_all(namespace, deployment_name).items() if stats is not None}
+
+    def read(self, namespace: str, deployment_name: Optional[str] = None) -> float:
+        """
+        :raise Metric_Unavailable: When no Pod reported the field, or more
+                                   than max_failed_fraction of the Pods failed.
+        """
+        scraped = self._scrape_all(namespace, deployment_name)
+        failed = sum(1 for stats in scraped.values() if stats is None)
+        if failed > self.max_failed_fraction * len(scraped):
+            raise Metric_Unavailable(f"{failed} of {len(scraped)} Pods in {namespace} "
+                                     f"did not answer {self.path}.")
+        values = [stats[self.field] for stats in scraped.values()
+                  if stats is not None and stats.get(self.field) is not None]
+        if not values:
+            raise Metric_Unavailable(f"No Pod in {namespace} reported '{self.field}'.")
+        # Slow Pods are the saturated ones, leaving them out would read low
+        values += [max(values)] * failed
+        return sum(values) / len(values)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self._session.close()
+
+
+METRIC_SOURCES = {
+    'metrics-server': Metrics_Server_Source,
+    'pod-stats': Pod_Stats_Source,
+}
+
+
+def make_metric_source(name: str, k8s_controller: K8s_Controller, **kwargs) -> Metric_Source:
+    """:param name: 'metrics-server' or 'pod-stats'"""
+    if name not in METRIC_SOURCES:
+        raise ValueError(f"Unknown metric source '{name}', use one of {sorted(METRIC_SOURCES)}.")
+    return METRIC_SOURCES[name](k8s_controller, **kwargs)
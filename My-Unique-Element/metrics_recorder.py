@@ -0,0 +1,163 @@
+"""
+This file will contain the append-only recorder of the monitor scripts.
+
+Rows are appended to a CSV or newline-delimited JSON file through a
+buffered writer. Each run starts a fresh file unless append=True is
+asked for, then the header of the existing file must match the
+columns. The file is flushed and fsync'ed in batches (every
+`flush_rows` rows or `fsync_interval` seconds), so the cost of a tick
+stays constant over multi-hour runs. The Excel workbook is only written
+by export_excel(), at the end of the run or on demand, with openpyxl in
+write-only mode.
+"""
+
+import csv
+import json
+import os
+import time
+from typing import Optional
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment
+
+FORMATS = ('csv', 'ndjson')
+
+
+class Metrics_Recorder:
+    """Appends rows of fixed columns to a CSV or NDJSON file."""
+
+    def __init__(self, path: str, columns: list, file_format: Optional[str] = None,
+                 flush_rows: int = 50, fsync_interval: float = 5.0,
+                 clock=time.monotonic, append: bool = False):
+        """
+        :param path: File written to, truncated unless append is True.
+        :param columns: Column names of the rows.
+        :param file_format: 'csv' or 'ndjson', by default from the suffix.
+        :param flush_rows: Rows buffered before a flush + fsync.
+        :param fsync_interval: Max seconds between two flush + fsync.
+        :param append: Continue an existing file of a previous run,
+                       raises ValueError when its columns differ.
+        """
+        if file_format is None:
+            file_format = 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+        if file_format not in FORMATS:
+            raise ValueError(f"Unknown format '{file_format}', use one of {FORMATS}.")
+
+        self.path = path
+        self.columns = list(columns)
+        self.file_format = file_format
+        self.flush_rows = flush_rows
+        self.fsync_interval = fsync_interval
+        self.clock = clock
+
+        self.row_count = 0
+        self.sync_count = 0
+        self._pending = 0
+        self._last_sync = clock()
+
+        new_file = not append or not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new_file:
+            existing = self._existing_columns()
+            if existing is not None and existing != self.columns:
+                raise ValueError(f"Columns of {path} {existing} differ from {self.columns}.")
+
+        self._file = open(path, 'w' if new_file else 'a', newline='', encoding='utf-8',
+                          buffering=1 << 16)
+        self._writer = csv.writer(self._file) if file_format == 'csv' else None
+        if new_file and self._writer is not None:
+            self._writer.writerow(self.columns)
+
+    def _existing_columns(self) -> Optional[list]:
+        """:return: Header of the CSV file or keys of the first NDJSON record."""
+        with open(self.path, newline='', encoding='utf-8') as file:
+            if self.file_format == 'csv':
+                return next(csv.reader(file), None)
+            for line in file:
+                if line.strip():
+                    return list(json.loads(line))
+        return None
+
+    def append(self, row) -> None:
+        """:param row: Values in column order, or a dict keyed by column."""
+        if isinstance(row, dict):
+            row = [row.get(column) for column in self.columns]
+        if self._writer is not None:
+            self._writer.writerow(row)
+        else:
+            self._file.write(json.dumps(dict(zip(self.columns, row)), default=str) + '\n')
+
+        self.row_count += 1
+        self._pending += 1
+        if (self._pending >= self.flush_rows
+                or self.clock() - self._last_sync >= self.fsync_interval):
+            self.sync()
+
+    def sync(self) -> None:
+        """Write the buffered rows to disk."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.sync_count += 1
+        self._pending = 0
+        self._last_sync = self.clock()
+
+    def rows(self):
+        """Yield the recorded rows as lists in column order."""
+        if not self._file.closed:
+            self._file.flush()
+        with open(self.path, newline='', encoding='utf-8') as file:
+            if self.file_format == 'csv':
+                reader = csv.reader(file)
+                next(reader, None)  # Header
+                yield from reader
+            else:
+                for line in file:
+                    if line.strip():
+                        record = json.loads(line)
+                        yield [record.get(column) for column in self.columns]
+
+    def export_excel(self, excel_path: str, sheet_title: str = 'Metrics') -> int:
+        """
+        Write all recorded rows to an .xlsx file in one pass.
+
+        :return: Number of exported rows.
+        """
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(sheet_title)
+
+        header = []
+        for column in self.columns:
+            cell = WriteOnlyCell(sheet, value=column)
+            cell.alignment = Alignment(horizontal="center")
+            header.append(cell)
+        sheet.append(header)
+
+        count = 0
+        for row in self.rows():
+            sheet.append([_to_number(value) for value in row])
+            count += 1
+        workbook.save(excel_path)
+        return count
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def __enter__(self) -> 'Metrics_Recorder':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def _to_number(value):
+    """CSV values are strings, keep the numbers numeric in Excel."""
+    if not isinstance(value, str):
+        return value
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
@@ -1,51 +1,65 @@
 
 
+import signal
 import time
 import datetime
-from openpyxl import Workbook
-from openpyxl.styles import Alignment
 from k8s_controller import K8s_Controller
+from metrics_recorder import Metrics_Recorder
 
-# Initialize Excel Workbook and Sheet
-workbook = Workbook()
-sheet = workbook.active
-sheet.title = "K8s Pod Metrics 100 VMs"
-
-# Add Header Row
+# Header Row
 headers = ["Count", "Datetime", "Pod Count", "CPU Usage (%)", "Revised Replica Count"]
-sheet.append(headers)
-
-# Center align headers
-for cell in sheet[1]:
-    cell.alignment = Alignment(horizontal="center")
+sheet_title = "K8s Pod Metrics 100 VMs"
 
-# File to save results
+# Each run rewrites the CSV file, the Excel file is written at the end
+csv_file_name = "k8s_Pod_metrics_100Vms.csv"
 excel_file_name = "k8s_Pod_metrics_100Vms.xlsx"
 
+# Set by kill -USR1 <pid>, the main loop then exports the Excel file
+export_requested = False
+
+
+def request_export(signum, frame):
+    global export_requested
+    export_requested = True
+
 
 if __name__ == '__main__':
     count = 1
     namespace = ['fast-api-hpa-namespace', 'my-app-namespace']
     use_namespace = namespace[1]
     print("Count  |         Datetime             |  Current Pod Count  |  Curr. Pod Usage  |  Revised Replica Count")
-    while True:
-        current_time = datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-        # Collect Pod Details
-        # print("Initiated cls: K8s_Controller()")
-        k8s_controller = K8s_Controller()
+    # One controller (and API client) for the whole run
+    k8s_controller = K8s_Controller()
+    recorder = Metrics_Recorder(csv_file_name, headers)
+
+    # kill -USR1 <pid> exports the Excel file while running
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, request_export)
 
-        pod_count = k8s_controller.pod_count(use_namespace)
-        cpu_usage = k8s_controller.pod_cpu_usage(use_namespace)
+    try:
+        while True:
+            current_time = datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+            # Collect Pod Details
+            pod_count = k8s_controller.pod_count(use_namespace)
+            cpu_usage = k8s_controller.pod_cpu_usage(use_namespace) or 0  # None without Pods
 
-        desired_replica_count = k8s_controller.calculate_desired_replicas(pod_count, cpu_usage, 50)
+            desired_replica_count = k8s_controller.calculate_desired_replicas(pod_count, cpu_usage, 50)
 
-        # Log data to Excel
-        sheet.append([count, current_time, pod_count, cpu_usage, desired_replica_count])
+            # Append the row, the file is synced to disk in batches
+            recorder.append([count, current_time, pod_count, cpu_usage, desired_replica_count])
 
-        print(f"  {count}           {current_time}             {pod_count}                    {cpu_usage}                  {desired_replica_count}")
+            # Exported here, not in the handler which may interrupt a write of the recorder
+            if export_requested:
+                export_requested = False
+                recorder.export_excel(excel_file_name, sheet_title)
 
-        time.sleep(0.5)
-        count += 1
+            print(f"  {count}           {current_time}             {pod_count}                    {cpu_usage}                  {desired_replica_count}")
 
-        # Save the Excel file after each iteration to ensure data is not lost
-        workbook.save(excel_file_name)
+            time.sleep(0.5)
+            count += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Save the Excel file once, from the recorded rows
+        recorder.close()
+        recorder.export_excel(excel_file_name, sheet_title)
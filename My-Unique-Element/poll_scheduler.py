@@ -0,0 +1,152 @@
+"""
+This file will contain the tick scheduler of the scaler loops.
+
+Ticks are scheduled on the monotonic clock, one interval after the
+previous deadline, so the time spent in the cycle itself is subtracted
+and the ticks do not drift. The interval adapts to the observed metric:
+it tightens when the value changes fast and relaxes while it is steady.
+API errors back off exponentially instead of hammering the API server.
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+import urllib3
+from kubernetes import client
+
+# The callers add the errors of their metric source, e.g. Metric_Unavailable
+RETRY_EXCEPTIONS = (client.exceptions.ApiException, urllib3.exceptions.HTTPError)
+
+
+class Poll_Scheduler:
+    """Runs a tick function on an adaptive, drift free schedule."""
+
+    def __init__(self, min_interval: float = 1.0, max_interval: float = 10.0,
+                 fast_change: float = 0.2, steady_change: float = 0.05,
+                 relax_factor: float = 1.5, backoff_base: float = 1.0,
+                 backoff_factor: float = 2.0, max_backoff: float = 60.0,
+                 retry_exceptions: tuple = RETRY_EXCEPTIONS,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Optional[Callable[[float], None]] = None):
+        """
+        :param min_interval: Seconds between ticks while the load changes fast.
+        :param max_interval: Seconds between ticks while the load is steady.
+        :param fast_change: Relative change of the metric between two
+                            ticks that resets the interval to min_interval.
+        :param steady_change: Relative change below which the interval
+                              grows by relax_factor.
+        :param backoff_base: Seconds waited after the first failed tick.
+        :param backoff_factor: Growth of the wait per consecutive failure.
+        :param max_backoff: Longest wait after failed ticks.
+        :param retry_exceptions: Exceptions of the tick function that are
+                                 backed off, anything else is raised.
+        :param clock: Monotonic clock, replaceable in tests.
+        :param sleep: Sleep function, by default a wait stop() can interrupt.
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.fast_change = fast_change
+        self.steady_change = steady_change
+        self.relax_factor = relax_factor
+        self.backoff_base = backoff_base
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_exceptions = retry_exceptions
+        self.clock = clock
+        self._stopped = threading.Event()
+        self._sleep = sleep or self._stopped.wait
+
+        self.interval = min_interval
+        self.last_value = None
+        self.consecutive_errors = 0
+
+        # Metrics
+        self.tick_count = 0
+        self.error_count = 0
+        self.missed_deadlines = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.last_work_time = 0.0
+        self.total_work_time = 0.0
+
+    def adapt(self, value: Optional[float]) -> float:
+        """
+        :param value: Metric observed by the last tick, None keeps the interval.
+        :return: Seconds until the next tick.
+        """
+        if value is not None and self.last_value is not None:
+            change = abs(value - self.last_value) / max(abs(self.last_value), 1e-9)
+            if change >= self.fast_change:
+                self.interval = self.min_interval
+            elif change < self.steady_change:
+                self.interval = min(self.max_interval, self.interval * self.relax_factor)
+        if value is not None:
+            self.last_value = value
+        return self.interval
+
+    def backoff(self) -> float:
+        """:return: Seconds to wait after a failed tick."""
+        return min(self.max_backoff,
+                   self.backoff_base * self.backoff_factor ** (self.consecutive_errors - 1))
+
+    def metrics(self) -> dict:
+        ticks = max(self.tick_count, 1)
+        return {
+            'ticks': self.tick_count,
+            'errors': self.error_count,
+            'missed_deadlines': self.missed_deadlines,
+            'interval': self.interval,
+            'last_lag': self.last_lag,
+            'max_lag': self.max_lag,
+            'mean_lag': self.total_lag / ticks,
+            'last_work_time': self.last_work_time,
+            'mean_work_time': self.total_work_time / ticks,
+        }
+
+    def run(self, tick: Callable[[], Optional[float]],
+            max_ticks: Optional[int] = None) -> None:
+        """
+        Call tick() until stop() is called.
+
+        :param tick: Work of one cycle, returns the metric the interval
+                     adapts to (or None).
+        :param max_ticks: Optional number of ticks after which run() returns.
+        """
+        self._stopped.clear()
+        deadline = self.clock()
+        while not self._stopped.is_set():
+            started = self.clock()
+            self.last_lag = started - deadline
+            self.max_lag = max(self.max_lag, self.last_lag)
+            self.total_lag += self.last_lag
+            self.tick_count += 1
+
+            try:
+                value = tick()
+            except self.retry_exceptions as e:
+                self.error_count += 1
+                self.consecutive_errors += 1
+                interval = self.backoff()
+                print(f"Tick {self.tick_count} failed, retrying in {interval:.1f}s: {e}")
+            else:
+                self.consecutive_errors = 0
+                interval = self.adapt(value)
+
+            now = self.clock()
+            self.last_work_time = now - started
+            self.total_work_time += self.last_work_time
+            if max_ticks is not None and self.tick_count >= max_ticks:
+                break
+
+            # Next deadline counts from the previous one, not from now
+            deadline += interval
+            if now > deadline:
+                self.missed_deadlines += 1
+                deadline = now
+            else:
+                self._sleep(deadline - now)
+
+    def stop(self) -> None:
+        self._stopped.set()
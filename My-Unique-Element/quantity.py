@@ -0,0 +1,196 @@
+"""
+This file will contain the parser of Kubernetes resource quantities
+("250m", "30000000n", "25Mi", "1.5Gi", "1e3" ...) shared by
+cls: K8s_Controller() and the Metric_Data collectors.
+
+Grammar (k8s.io/apimachinery resource.Quantity):
+    quantity   ::= <signedNumber><suffix>
+    suffix     ::= <binarySI> | <decimalExponent> | <decimalSI>
+    binarySI   ::= Ki | Mi | Gi | Ti | Pi | Ei
+    decimalSI  ::= n | u | m | "" | k | M | G | T | P | E
+    decimalExponent ::= "e" <signedNumber> | "E" <signedNumber>
+"""
+
+import re
+from typing import NamedTuple
+
+import numpy as np
+
+_QUANTITY = re.compile(
+    r'^([+-]?(?:\d+\.?\d*|\.\d+))'
+    r'(?:[eE]([+-]?\d+)|(Ki|Mi|Gi|Ti|Pi|Ei|[numkMGTPE]))?$')
+
+_SUFFIX_SCALE = {
+    None: 1.0,
+    'n': 1e-9, 'u': 1e-6, 'm': 1e-3,
+    'k': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12, 'P': 1e15, 'E': 1e18,
+    'Ki': 2.0 ** 10, 'Mi': 2.0 ** 20, 'Gi': 2.0 ** 30,
+    'Ti': 2.0 ** 40, 'Pi': 2.0 ** 50, 'Ei': 2.0 ** 60,
+}
+
+
+_BINARY_SCALE = {suffix: scale for suffix, scale in _SUFFIX_SCALE.items()
+                 if suffix and len(suffix) == 2}
+_DECIMAL_SCALE = {suffix: scale for suffix, scale in _SUFFIX_SCALE.items()
+                  if suffix and len(suffix) == 1}
+_TEXT_SCALE = {suffix or '': scale for suffix, scale in _SUFFIX_SCALE.items()}
+
+# Batch fast path: space separated '<digits><suffix>' values, the form
+# the metrics-server returns, parsed in C by re and np.fromstring()
+_PLAIN_SUFFIX = r'(?:Ki|Mi|Gi|Ti|Pi|Ei|[numkMGTPE])?'
+_PLAIN_LIST = re.compile(rf'(?:\d+{_PLAIN_SUFFIX} )*\d+{_PLAIN_SUFFIX}')
+_PLAIN_SUFFIXES = re.compile(r'\d+([A-Za-z]*)')
+_LETTERS = re.compile(r'[A-Za-z]+')
+_UNIFORM_LISTS = {}  # suffix -> compiled pattern of a list with only that suffix
+
+
+def _uniform_list(suffix: str):
+    pattern = _UNIFORM_LISTS.get(suffix)
+    if pattern is None:
+        pattern = _UNIFORM_LISTS[suffix] = re.compile(rf'(?:\d+{suffix} )*\d+{suffix}')
+    return pattern
+
+
+def _split(quantity: str) -> tuple:
+    """:return: (number string, scale) of the quantity else raise ValueError."""
+    # Fast path for the '<digits><suffix>' form the metrics-server returns
+    scale = _BINARY_SCALE.get(quantity[-2:])
+    if scale is not None:
+        if quantity[:-2].isdigit():
+            return quantity[:-2], scale
+    else:
+        scale = _DECIMAL_SCALE.get(quantity[-1:])
+        if scale is not None:
+            if quantity[:-1].isdigit():
+                return quantity[:-1], scale
+        elif quantity.isdigit():
+            return quantity, 1.0
+
+    match = _QUANTITY.match(quantity.strip())
+    if match is None:
+        raise ValueError(f"Invalid quantity: '{quantity}'")
+    number, exponent, suffix = match.groups()
+    if exponent is not None:
+        # float() rounds '12e-1' exactly, 12 * 10.0 ** -1 does not
+        return f'{number}e{exponent}', 1.0
+    return number, _SUFFIX_SCALE[suffix]
+
+
+def parse_quantity(quantity) -> float:
+    """
+    :param quantity: Quantity string, int or float.
+    :return: Value of the quantity in base units (cores, bytes).
+    """
+    if isinstance(quantity, (int, float)):
+        return float(quantity)
+    number, scale = _split(quantity)
+    return float(number) * scale
+
+
+def cpu_to_millicores(quantity) -> float:
+    """:return: CPU quantity in millicores, e.g. '30000000n' -> 30.0"""
+    number, scale = _split(quantity) if isinstance(quantity, str) else (quantity, 1.0)
+    # Scale in millicores first so that '250m' stays an exact 250.0
+    return float(number) * (scale * 1_000)
+
+
+def memory_to_bytes(quantity) -> int:
+    """:return: Memory quantity in bytes, e.g. '25Mi' -> 26214400"""
+    return int(round(parse_quantity(quantity)))
+
+
+def parse_quantities(quantities: list, multiplier: float = 1.0) -> np.ndarray:
+    """
+    Batch version of parse_quantity(). Lists of '<digits><suffix>'
+    values are parsed without a Python loop over the values.
+
+    :param quantities: List of quantity strings.
+    :param multiplier: Factor from base units to the wanted unit,
+                       e.g. 1000 for millicores.
+    :return: float64 array of the values.
+    """
+    if not quantities:
+        return np.zeros(0, dtype=np.float64)
+
+    try:
+        joined = ' '.join(quantities)
+    except TypeError:
+        joined = None  # Numbers in the list, take the slow path
+
+    if joined is not None:
+        # All values with the suffix of the first one, e.g. all 'n' or all 'Ki'
+        suffix = quantities[0].lstrip('0123456789')
+        # A value with a space inside would add a number, hence the size check
+        if suffix in _TEXT_SCALE and _uniform_list(suffix).fullmatch(joined):
+            numbers = np.fromstring(joined.replace(suffix, '') if suffix else joined, sep=' ')
+            if len(numbers) == len(quantities):
+                return numbers * (_TEXT_SCALE[suffix] * multiplier)
+        elif _PLAIN_LIST.fullmatch(joined):
+            numbers = np.fromstring(_LETTERS.sub('', joined), sep=' ')
+            if len(numbers) == len(quantities):
+                scales = np.array([_TEXT_SCALE[suffix]
+                                   for suffix in _PLAIN_SUFFIXES.findall(joined)])
+                return numbers * (scales * multiplier)
+
+    # Decimals, signs and exponents
+    numbers = []
+    scales = []
+    for quantity in quantities:
+        number, scale = _split(quantity) if isinstance(quantity, str) else (quantity, 1.0)
+        numbers.append(number)
+        scales.append(scale)
+    scales = np.array(scales, dtype=np.float64) * multiplier
+    return np.array(numbers, dtype=np.float64) * scales
+
+
+def container_cpu(items: list) -> np.ndarray:
+    """
+    CPU column only of a metrics.k8s.io PodMetricsList, for the callers
+    which need the total and not the usage of each pod.
+
+    :param items: 'items' of the Metrics Service JSON response.
+    :return: float64 array of the usage of every container in millicores.
+    """
+    return parse_quantities([container['usage'].get('cpu', '0')
+                             for pod in items for container in pod['containers']], 1_000)
+
+
+class Pod_Usage(NamedTuple):
+    """Usage of every pod of a metrics.k8s.io response."""
+    names: list
+    namespaces: list
+    cpu: np.ndarray  # millicores per pod
+    memory: np.ndarray  # bytes per pod
+
+
+def parse_pod_metrics(items: list) -> Pod_Usage:
+    """
+    Convert the 'items' of a metrics.k8s.io PodMetricsList into
+    arrays in one pass. Usage of all containers of a pod is summed.
+
+    :param items: 'items' of the Metrics Service JSON response.
+    :return: cls: Pod_Usage()
+    """
+    names, namespaces = [], []
+    pod_index, cpu, memory = [], [], []
+
+    for i, pod in enumerate(items):
+        metadata = pod['metadata']
+        names.append(metadata['name'])
+        namespaces.append(metadata.get('namespace', ''))
+        for container in pod['containers']:
+            usage = container['usage']
+            pod_index.append(i)
+            cpu.append(usage.get('cpu', '0'))
+            memory.append(usage.get('memory', '0'))
+
+    n = len(names)
+    cpu = parse_quantities(cpu, 1_000)
+    memory = parse_quantities(memory)
+    if len(pod_index) != n:
+        # Sum the containers of each pod
+        pod_index = np.array(pod_index, dtype=np.intp)
+        cpu = np.bincount(pod_index, weights=cpu, minlength=n)
+        memory = np.bincount(pod_index, weights=memory, minlength=n)
+
+    return Pod_Usage(names, namespaces, cpu, np.rint(memory).astype(np.int64))
@@ -1,34 +1,65 @@
 """
 This is the main python file where Kubernetes cluster will be controlled.
 """
-import time
+import os
+from controller_metrics import Metrics_Server
+from forecasting import Holt_Forecaster
 from k8s_controller import K8s_Controller
+from metric_sources import Metric_Unavailable, Metrics_Server_Source, make_metric_source
+from poll_scheduler import RETRY_EXCEPTIONS, Poll_Scheduler
+from scaling_loop import Scaling_Loop
+from scaling_policy import Policy_Engine, Scaling_Policy
 
 if __name__ == "__main__":
-    count = 1
+    min_interval = 1  # Seconds between ticks while the metric changes fast
+    max_interval = 10  # Seconds between ticks while the metric is steady
+    cpu_window = 5  # Seconds of CPU samples behind each scaling decision
+    pod_startup_time = 10  # Seconds a new pod needs before it serves traffic
+    forecaster = Holt_Forecaster()  # None for purely reactive scaling
 
-    base_time = 10  # Minimum sleep time in seconds
-    adjustment_factor = 0.2  # How much the sleep time adjusts based on CPU usage
+    # Pods, Deployments and Nodes are served from the informer cache,
+    # the Nodes cap the scale ups to the Pods the cluster can schedule
+    k8s_controller = K8s_Controller()
+    k8s_controller.start_informers(nodes=True)
 
-    print('Running at...')
-    while True:
+    # METRIC_SOURCE=pod-stats scales on the in-flight requests per Pod
+    # read from the Pods themselves instead of the 15s old CPU usage
+    if os.environ.get('METRIC_SOURCE', 'metrics-server') == 'metrics-server':
+        metric_source = Metrics_Server_Source(k8s_controller, window=cpu_window)
+        target_value = float(os.environ.get('TARGET_VALUE', 50))  # Millicores
+    else:
+        metric_source = make_metric_source(os.environ['METRIC_SOURCE'], k8s_controller,
+                                           field=os.environ.get('POD_STATS_FIELD', 'in_flight'))
+        target_value = float(os.environ.get('TARGET_VALUE', 2))
+        min_interval = 0.5
+
+    # Tolerance band, stabilization windows and scale rate limits
+    policy_engine = Policy_Engine(Scaling_Policy(target_cpu=target_value, min_replicas=1,
+                                                 scale_down_stabilization=60))
 
-        # Collect Pod Details
-        k8s_controller = K8s_Controller()
-        pod_count = k8s_controller.pod_count('my-app-namespace')
-        cpu_usage = k8s_controller.pod_cpu_usage('my-app-namespace')
+    # Prometheus metrics on http://<host>:9100/metrics
+    Metrics_Server(port=int(os.environ.get('METRICS_PORT', 9100))).start()
 
-        # Calculate desired replicas
-        desired_replica_count = k8s_controller.calculate_desired_replicas(pod_count, cpu_usage, 50)
-        desired_replica_count = 1 if desired_replica_count < 1 else desired_replica_count
+    # Monotonic ticks, adaptive interval and backoff on API errors
+    scheduler = Poll_Scheduler(min_interval, max_interval,
+                               retry_exceptions=RETRY_EXCEPTIONS + (Metric_Unavailable,))
 
-        # Deployment Initiation
-        if desired_replica_count != pod_count:
-            deployment_name = k8s_controller.get_deployment_name('my-app-namespace')
-            response = k8s_controller.scale_deployment('my-app-namespace', deployment_name, desired_replica_count)
+    # The tick is shared with benchmark_runner.py
+    scaling_loop = Scaling_Loop(k8s_controller, metric_source, policy_engine, 'my-app-namespace',
+                                forecaster=forecaster, pod_startup_time=pod_startup_time)
 
-            count += 1
+    def scale_tick():
+        metric_value = scaling_loop.tick()
 
-            sleep_time = max(1, base_time - adjustment_factor * (cpu_usage / 10))  # Ensure sleep_time >= 1 second
+        if scheduler.tick_count % 100 == 0:
+            print(f"Scheduler: {scheduler.metrics()}")
 
-            time.sleep(sleep_time)
+        # The next tick comes sooner when the metric moves fast
+        return metric_value
+
+    print('Running at...')
+    try:
+        scheduler.run(scale_tick)
+    except KeyboardInterrupt:
+        k8s_controller.stop_informers()
+        print(f"Scheduler: {scheduler.metrics()}")
@@ -0,0 +1,119 @@
+"""
+This file will contain the scaling tick of the Real-Time-HPA, shared by
+real_time_dynamic_pod_scaler_controller.py, async_scaler.py,
+benchmark_runner.py and scaling_simulator.py so that the benchmark and
+the simulator measure the loop that is deployed.
+
+One tick reads the Pods and the metric, feeds the forecaster, asks the
+cls: Policy_Engine() for the replicas, caps a scale up to what the
+cluster can schedule, patches the Deployment and commits the patch to
+the engine.
+"""
+
+import time
+from typing import Callable, NamedTuple, Optional
+
+from controller_metrics import record_decision, stage
+from forecasting import Forecaster, predicted_metric_value
+from k8s_controller import K8s_Controller
+from metric_sources import Metric_Source
+from scaling_policy import Policy_Engine
+
+
+class Decision(NamedTuple):
+    timestamp: float          # POSIX time of the tick
+    current: int              # Running Pods
+    desired: int              # Replicas of the policy
+    metric_value: float       # Metric read, before the forecast
+    reason: Optional[str]
+    patched: Optional[int]    # Replicas patched on the Deployment, None if no patch
+
+
+class Scaling_Loop:
+    """The scaling tick of one Deployment."""
+
+    def __init__(self, k8s_controller: K8s_Controller, metric_source: Metric_Source,
+                 policy_engine: Policy_Engine, namespace: str,
+                 deployment_name: Optional[str] = None,
+                 forecaster: Optional[Forecaster] = None,
+                 pod_startup_time: float = 10.0, keep_decisions: bool = False,
+                 clock: Callable[[], float] = time.monotonic,
+                 wall_clock: Callable[[], float] = time.time):
+        """
+        :param deployment_name: Name of the Deployment, only its Pods are
+                                counted and measured. When None the
+                                Deployment is looked up and all the Pods
+                                of the namespace are counted.
+        :param forecaster: cls: Forecaster() for predictive scaling,
+                           None to scale on the current metric only.
+        :param pod_startup_time: Seconds a new pod needs, the forecast horizon.
+        :param keep_decisions: Keep a cls: Decision() of every tick.
+        :param clock: Monotonic seconds of the policy decisions.
+        :param wall_clock: POSIX time of the forecast samples and of the
+                           decisions, a simulated clock replaces both.
+        """
+        self.k8s_controller = k8s_controller
+        self.metric_source = metric_source
+        self.policy_engine = policy_engine
+        self.namespace = namespace
+        self.deployment_name = deployment_name
+        self.forecaster = forecaster
+        self.pod_startup_time = pod_startup_time
+        self.clock = clock
+        self.wall_clock = wall_clock
+        # Deployment whose Pods are counted, None for the whole namespace
+        self.selected_deployment = deployment_name
+        self.decisions = [] if keep_decisions else None
+        self.last_decision = None
+        self.scale_count = 0
+
+    def tick(self) -> float:
+        """
+        :return: The metric value, for the adaptive interval of the
+                 cls: Poll_Scheduler().
+        """
+        controller = self.k8s_controller
+        # Rebuild the API clients after a kubeconfig rotation or a 401,
+        # whatever the metric source
+        controller.refresh()
+
+        # Collect Pod Details
+        pod_count = controller.pod_count(self.namespace, self.selected_deployment)
+        metric_value = self.metric_source.read(self.namespace, self.selected_deployment)
+
+        with stage('decide'):
+            # Scale for the load expected once new pods have started
+            scaling_value = predicted_metric_value(self.forecaster, self.wall_clock(),
+                                                   metric_value, self.pod_startup_time)
+
+            # Calculate desired replicas
+            now = self.clock()
+            desired = self.policy_engine.decide(now, pod_count, scaling_value)
+        reason = self.policy_engine.last_reason
+
+        # Deployment Initiation
+        recorded, patched = desired, None
+        if desired != pod_count:
+            if self.deployment_name is None:
+                self.deployment_name = controller.get_deployment_name(self.namespace)
+
+            # Pending Pods are in flight, and no more Pods than fit on the Nodes
+            replicas, capacity_reason = controller.cap_scale_up(
+                self.namespace, self.deployment_name, pod_count, desired)
+            recorded = pod_count if replicas is None else replicas
+            reason = capacity_reason or reason
+
+            if replicas is not None:
+                response = controller.scale_replicas(self.namespace, self.deployment_name,
+                                                     replicas)
+                if response is not None:
+                    self.policy_engine.commit(now, replicas)
+                    self.scale_count += 1
+                    patched = replicas
+        record_decision(self.namespace, pod_count, recorded, reason)
+
+        self.last_decision = Decision(self.wall_clock(), pod_count, desired, metric_value,
+                                      reason, patched)
+        if self.decisions is not None:
+            self.decisions.append(self.last_decision)
+        return metric_value
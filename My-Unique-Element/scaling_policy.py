@@ -0,0 +1,198 @@
+"""
+This file will contain the scaling policy engine wrapped around
+K8s_Controller.calculate_desired_replicas().
+
+The raw recommendation is filtered the way the Kubernetes HPA does it:
+a tolerance band around the target, separate scale up and scale down
+stabilization windows, a max number / percent of pods changed per
+period and min/max replica bounds. Time is always passed in, so the
+engine is deterministic and can be driven by synthetic metric streams.
+
+The rate limits count the scale events passed to commit() once the
+replicas were actually patched, so a decision repeated while the new
+pods are still starting is not counted twice.
+"""
+
+import json
+import math
+from collections import deque
+from typing import Optional
+
+from k8s_controller import K8s_Controller
+
+
+class Scaling_Policy:
+    """Scaling configuration of one Deployment."""
+
+    def __init__(self, target_cpu: float = 50, tolerance: float = 0.1,
+                 min_replicas: int = 1, max_replicas: Optional[int] = None,
+                 scale_up_stabilization: float = 0.0,
+                 scale_down_stabilization: float = 300.0,
+                 scale_up_max_pods: int = 4, scale_up_max_percent: float = 100.0,
+                 scale_up_period: float = 15.0,
+                 scale_down_max_pods: Optional[int] = None,
+                 scale_down_max_percent: float = 100.0,
+                 scale_down_period: float = 15.0):
+        """
+        :param target_cpu: Desired avg CPU usage of the pods in millicores.
+        :param tolerance: No scaling while |usage / target - 1| <= tolerance.
+        :param min_replicas: Lowest replica count.
+        :param max_replicas: Highest replica count, None for no limit.
+        :param scale_up_stabilization: Seconds a higher recommendation
+                                       must last before scaling up.
+        :param scale_down_stabilization: Seconds a lower recommendation
+                                         must last before scaling down.
+        :param scale_up_max_pods: Max pods added per scale_up_period.
+        :param scale_up_max_percent: Max percent of pods added per period,
+                                     the larger of both limits applies.
+        :param scale_down_max_pods: Max pods removed per scale_down_period,
+                                    None to use the percent limit only.
+        :param scale_down_max_percent: Max percent of pods removed per period.
+        """
+        if target_cpu <= 0:
+            raise ValueError("target_cpu must be greater than zero.")
+        if max_replicas is not None and max_replicas < min_replicas:
+            raise ValueError("max_replicas cannot be lower than min_replicas.")
+
+        self.target_cpu = target_cpu
+        self.tolerance = tolerance
+        self.min_replicas = min_replicas
+        self.max_replicas = max_replicas
+        self.scale_up_stabilization = scale_up_stabilization
+        self.scale_down_stabilization = scale_down_stabilization
+        self.scale_up_max_pods = scale_up_max_pods
+        self.scale_up_max_percent = scale_up_max_percent
+        self.scale_up_period = scale_up_period
+        self.scale_down_max_pods = scale_down_max_pods
+        self.scale_down_max_percent = scale_down_max_percent
+        self.scale_down_period = scale_down_period
+
+    @classmethod
+    def from_dict(cls, values: dict) -> 'Scaling_Policy':
+        return cls(**values)
+
+
+def load_policies(path: str) -> dict:
+    """
+    Read per Deployment policies from a JSON file like
+    {"my-app-namespace/my-app-deployment": {"target_cpu": 50, ...}}
+
+    :return: {'namespace/deployment': cls: Scaling_Policy()}
+    """
+    with open(path) as file:
+        return {key: Scaling_Policy.from_dict(values)
+                for key, values in json.load(file).items()}
+
+
+class Policy_Engine:
+    """Applies one cls: Scaling_Policy() to a stream of metric values."""
+
+    def __init__(self, policy: Optional[Scaling_Policy] = None):
+        self.policy = policy or Scaling_Policy()
+        self._recommendations = deque()  # (timestamp, replicas)
+        self._events = deque()  # (timestamp, from_replicas, to_replicas)
+        self.applied_replicas = None  # spec.replicas of the last commit()
+        self._current_replicas = None
+        self.last_reason = None
+
+    def _stabilized(self, now: float, current_replicas: int,
+                    recommendation: int) -> int:
+        """HPA stabilization: scale up to the lowest recommendation of
+        the up window, down to the highest of the down window."""
+        policy = self.policy
+        self._recommendations.append((now, recommendation))
+        horizon = max(policy.scale_up_stabilization, policy.scale_down_stabilization)
+        while self._recommendations[0][0] < now - horizon:
+            self._recommendations.popleft()
+
+        up_floor = min(r for t, r in self._recommendations
+                       if t >= now - policy.scale_up_stabilization)
+        down_ceiling = max(r for t, r in self._recommendations
+                           if t >= now - policy.scale_down_stabilization)
+
+        if recommendation > current_replicas:
+            return max(current_replicas, up_floor)
+        if recommendation < current_replicas:
+            return min(current_replicas, down_ceiling)
+        return current_replicas
+
+    def _rate_limited(self, now: float, current_replicas: int, desired: int) -> int:
+        """Limit the pods changed per period, counted from the replicas
+        at the start of the period."""
+        policy = self.policy
+        period = max(policy.scale_up_period, policy.scale_down_period)
+        while self._events and self._events[0][0] < now - period:
+            self._events.popleft()
+
+        # The running pods lag behind the last patch of spec.replicas
+        applied = self.applied_replicas if self.applied_replicas is not None else current_replicas
+
+        if desired > current_replicas:
+            added = sum(to - frm for t, frm, to in self._events
+                        if to > frm and t >= now - policy.scale_up_period)
+            base = applied - added
+            limit = base + max(policy.scale_up_max_pods,
+                               math.ceil(base * policy.scale_up_max_percent / 100))
+            return min(desired, max(current_replicas, limit))
+
+        if desired < current_replicas:
+            removed = sum(frm - to for t, frm, to in self._events
+                          if to < frm and t >= now - policy.scale_down_period)
+            base = applied + removed
+            max_removed = math.floor(base * policy.scale_down_max_percent / 100)
+            if policy.scale_down_max_pods is not None:
+                max_removed = max(max_removed, policy.scale_down_max_pods)
+            return max(desired, min(current_replicas, base - max_removed))
+
+        return desired
+
+    def decide(self, now: float, current_replicas: int,
+               current_metric_value: float) -> int:
+        """
+        :param now: Timestamp of the decision in seconds.
+        :param current_replicas: Current number of replicas.
+        :param current_metric_value: Avg CPU usage of the pods in millicores.
+        :return: Replica count to scale to.
+        """
+        policy = self.policy
+
+        ratio = current_metric_value / policy.target_cpu
+        if current_replicas > 0 and abs(ratio - 1.0) <= policy.tolerance:
+            recommendation = current_replicas
+            self.last_reason = 'within tolerance'
+        else:
+            recommendation = K8s_Controller.calculate_desired_replicas(
+                current_replicas, current_metric_value, policy.target_cpu)
+            self.last_reason = 'metric'
+
+        desired = self._stabilized(now, current_replicas, recommendation)
+        if desired != recommendation:
+            self.last_reason = 'stabilization'
+
+        limited = self._rate_limited(now, current_replicas, desired)
+        if limited != desired:
+            self.last_reason = 'rate limit'
+
+        bounded = max(policy.min_replicas, limited)
+        if policy.max_replicas is not None:
+            bounded = min(policy.max_replicas, bounded)
+        if bounded != limited:
+            self.last_reason = 'bounds'
+
+        self._current_replicas = current_replicas
+        return bounded
+
+    def commit(self, now: float, replicas: int) -> None:
+        """
+        Record a scale event once spec.replicas was actually patched.
+
+        :param now: Timestamp of the patch in seconds.
+        :param replicas: Replica count patched, possibly lower than the
+                         decision when the scale up was capped.
+        """
+        previous = self.applied_replicas
+        if previous is None:
+            previous = self._current_replicas
+        if previous is not None and replicas != previous:
+            self._events.append((now, previous, replicas))
+        self.applied_replicas = replicas
@@ -0,0 +1,311 @@
+"""
+This file will contain an offline discrete-event simulator of a
+Deployment scaled by cls: K8s_Controller().
+
+The Pods of the simulated Deployment have a start-up delay, a CPU limit
+(100m as in my-app-deployment.yaml) and serve one request at a time
+for a service time measured at that limit (the counting loop of
+app/main.py). The real controller code reads the Pods and their CPU
+usage from cls: Fake_Api_Server() and patches the replicas there
+through the cls: Scaling_Loop() tick of the controller, while the
+simulated clock runs as fast as the events can be processed.
+
+Requests are replayed open loop from a k6 log (arrival = end timestamp
+minus http_req_duration) or generated from k6 like stages, so runs are
+reproducible and different scaling policies can be compared in CI.
+
+Usage:
+    python scaling_simulator.py ../Testing/metrics_logs.json --url http://127.0.0.1:7080/
+"""
+
+import argparse
+import heapq
+import os
+import random
+import tempfile
+from collections import deque
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from fake_api_server import Fake_Api_Server, Fake_Cluster
+from forecast_replay import iter_k6_metrics
+from forecasting import Forecaster, make_forecaster
+from k8s_controller import K8s_Controller
+from kube_client import Kube_Client
+from metric_sources import Metrics_Server_Source
+from scaling_loop import Scaling_Loop
+from scaling_policy import Policy_Engine, Scaling_Policy
+
+# Event kinds, ticks are handled before arrivals of the same instant
+TICK = 0
+ARRIVAL = 1
+
+
+def load_arrivals(log_file: str, url: Optional[str] = None) -> np.ndarray:
+    """
+    :param url: Only replay the requests sent to this URL.
+    :return: Sorted request arrival times in seconds since the first one.
+    """
+    arrivals = [metrics['timestamp'] - (metrics.get('http_req_duration') or 0) / 1000
+                for metrics in iter_k6_metrics(log_file)
+                if url is None or metrics.get('url') == url]
+    if not arrivals:
+        return np.empty(0)
+    arrivals = np.sort(np.array(arrivals, dtype=np.float64))
+    return arrivals - arrivals[0]
+
+
+def stage_arrivals(stages: list, start_rate: float = 0.0, seed: int = 0) -> np.ndarray:
+    """
+    Poisson arrivals whose rate ramps linearly like k6 stages.
+
+    :param stages: List of (duration seconds, target requests per second).
+    :return: Sorted request arrival times in seconds.
+    """
+    rng = np.random.default_rng(seed)
+    arrivals = []
+    offset, rate = 0.0, start_rate
+    for duration, target in stages:
+        peak = max(rate, target)
+        if peak > 0:
+            # Thinning of a homogeneous process at the peak rate
+            times = np.cumsum(rng.exponential(1.0 / peak, int(peak * duration * 1.5) + 10))
+            times = times[times < duration]
+            keep = rng.random(len(times)) * peak < rate + (target - rate) * times / duration
+            arrivals.append(offset + times[keep])
+        offset += duration
+        rate = target
+    return np.concatenate(arrivals) if arrivals else np.empty(0)
+
+
+class Sim_Pod:
+    """One simulated Pod serving requests first in, first out."""
+
+    __slots__ = ('created', 'ready_at', 'deleted', 'free_at', 'busy')
+
+    def __init__(self, created: float, ready_at: float):
+        self.created = created
+        self.ready_at = ready_at
+        self.deleted = None
+        self.free_at = ready_at
+        self.busy = deque()  # (start, end) of the requests served
+
+    def busy_time(self, start: float, end: float) -> float:
+        """Seconds the Pod spent serving requests between start and end."""
+        while self.busy and self.busy[0][1] <= start:
+            self.busy.popleft()
+        return sum(max(0.0, min(e, end) - max(s, start)) for s, e in self.busy)
+
+
+class Simulation_Result(NamedTuple):
+    latencies: np.ndarray  # Seconds, of the requests that were served
+    failed: int  # Requests without a ready Pod or above the timeout
+    requests: int
+    pod_seconds: float
+    scale_events: int
+    timeline: list  # (time, ready Pods, desired replicas) per tick
+
+    def summary(self) -> dict:
+        p50, p95, p99 = (np.percentile(self.latencies, [50, 95, 99]) * 1000
+                         if len(self.latencies) else (np.nan,) * 3)
+        return {
+            'requests': self.requests,
+            'failure_rate': self.failed / self.requests if self.requests else 0.0,
+            'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99),
+            'pod_seconds': self.pod_seconds,
+            'scale_events': self.scale_events,
+            'max_replicas': max((desired for _, _, desired in self.timeline), default=0),
+        }
+
+
+class Scaling_Simulator:
+    """Replays request arrivals against a simulated Deployment."""
+
+    def __init__(self, k8s_controller: K8s_Controller, cluster: Fake_Cluster,
+                 arrivals: np.ndarray, policy: Optional[Scaling_Policy] = None,
+                 forecaster: Optional[Forecaster] = None,
+                 namespace: str = 'my-app-namespace',
+                 deployment_name: str = 'my-app-deployment',
+                 pod_cpu_limit: float = 100, service_time: tuple = (0.5, 1.0),
+                 startup_time: float = 10.0, interval: float = 1.0,
+                 metrics_window: float = 15.0, idle_cpu: float = 1.0,
+                 timeout: float = 60.0, initial_replicas: int = 1,
+                 cooldown: float = 0.0, seed: int = 0):
+        """
+        :param k8s_controller: Controller connected to the fake API server
+                               serving `cluster`.
+        :param arrivals: Sorted request arrival times in seconds.
+        :param policy: cls: Scaling_Policy() deciding the replicas.
+        :param forecaster: cls: Forecaster() for predictive scaling.
+        :param pod_cpu_limit: CPU limit of a Pod in millicores.
+        :param service_time: (min, max) seconds a request needs when the
+                             Pod runs at its CPU limit.
+        :param startup_time: Seconds between creating a Pod and it being ready.
+        :param interval: Seconds between two scaling decisions.
+        :param metrics_window: Seconds the reported CPU usage is averaged over.
+        :param idle_cpu: CPU usage of an idle Pod in millicores.
+        :param timeout: Requests slower than this count as failed.
+        :param cooldown: Seconds simulated after the last arrival.
+        """
+        self.k8s_controller = k8s_controller
+        self.cluster = cluster
+        self.arrivals = arrivals
+        self.policy_engine = Policy_Engine(policy)
+        self.forecaster = forecaster
+        self.namespace = namespace
+        self.deployment_name = deployment_name
+        self.pod_cpu_limit = pod_cpu_limit
+        self.service_time = service_time
+        self.startup_time = startup_time
+        self.interval = interval
+        self.metrics_window = metrics_window
+        self.idle_cpu = idle_cpu
+        self.timeout = timeout
+        self.initial_replicas = initial_replicas
+        self.cooldown = cooldown
+        self.random = random.Random(seed)
+
+        self.pods = []  # Live Pods, oldest first
+        self.deleted_pods = []
+
+        # The tick of the controller on the simulated clock
+        self.now = 0.0
+        self.scaling_loop = Scaling_Loop(
+            k8s_controller, Metrics_Server_Source(k8s_controller), self.policy_engine,
+            namespace, deployment_name, forecaster, startup_time,
+            clock=self._clock, wall_clock=self._clock)
+
+    def _clock(self) -> float:
+        return self.now
+
+    def _ready_pods(self, now: float) -> list:
+        return [pod for pod in self.pods if pod.ready_at <= now]
+
+    def _serve(self, now: float) -> Optional[float]:
+        """Route one request to a random ready Pod, like kube-proxy does.
+
+        :return: Latency in seconds or None when no Pod is ready."""
+        ready = self._ready_pods(now)
+        if not ready:
+            return None
+        pod = self.random.choice(ready)
+        start = max(now, pod.free_at)
+        pod.free_at = start + self.random.uniform(*self.service_time)
+        pod.busy.append((start, pod.free_at))
+        return pod.free_at - now
+
+    def _publish(self, now: float) -> None:
+        """Expose the simulated Pods through the fake API server."""
+        ready = self._ready_pods(now)
+        pod_cpu = []
+        for pod in ready:
+            window = min(self.metrics_window, now - pod.ready_at) or self.interval
+            usage = self.idle_cpu + self.pod_cpu_limit * pod.busy_time(now - window, now) / window
+            pod_cpu.append(f'{int(usage * 1_000_000)}n')
+        self.cluster.set_pods(self.namespace, self.deployment_name, len(ready), pod_cpu)
+
+    def _decide(self, now: float) -> None:
+        """The tick of real_time_dynamic_pod_scaler_controller.py on the
+        simulated clock."""
+        self.now = now
+        self.scaling_loop.tick()
+
+    def _reconcile_pods(self, now: float) -> bool:
+        """Create or delete Pods to match the replicas set through the API.
+
+        :return: True if the Pod count changed."""
+        replicas = self.cluster.replicas(self.namespace, self.deployment_name)
+        if replicas == len(self.pods):
+            return False
+
+        while len(self.pods) < replicas:
+            self.pods.append(Sim_Pod(now, now + self.startup_time))
+        # Pending Pods are deleted first, then the youngest ready ones
+        while len(self.pods) > replicas:
+            pod = max(self.pods, key=lambda p: (p.ready_at > now, p.created))
+            self.pods.remove(pod)
+            pod.deleted = now
+            self.deleted_pods.append(pod)
+        return True
+
+    def run(self) -> Simulation_Result:
+        self.cluster.add_deployment(self.namespace, self.deployment_name,
+                                    self.initial_replicas)
+        self.pods = [Sim_Pod(0.0, 0.0) for _ in range(self.initial_replicas)]
+        end = (self.arrivals[-1] if len(self.arrivals) else 0.0) + self.cooldown
+
+        ticks = ((i * self.interval, TICK) for i in range(int(end // self.interval) + 1))
+        arrivals = ((float(t), ARRIVAL) for t in self.arrivals)
+
+        latencies, failed, scale_events, timeline = [], 0, 0, []
+        for now, kind in heapq.merge(ticks, arrivals):
+            if kind == ARRIVAL:
+                latency = self._serve(now)
+                if latency is None or latency > self.timeout:
+                    failed += 1
+                else:
+                    latencies.append(latency)
+                continue
+
+            self._publish(now)
+            self._decide(now)
+            if self._reconcile_pods(now):
+                scale_events += 1
+            timeline.append((now, len(self._ready_pods(now)), len(self.pods)))
+
+        pod_seconds = sum(end - pod.created for pod in self.pods)
+        pod_seconds += sum(max(pod.deleted, pod.free_at) - pod.created
+                           for pod in self.deleted_pods)
+
+        return Simulation_Result(np.array(latencies), failed, len(self.arrivals),
+                                 float(pod_seconds), scale_events, timeline)
+
+
+def simulate(arrivals: np.ndarray, **kwargs) -> Simulation_Result:
+    """
+    Run one simulation against its own cls: Fake_Api_Server().
+
+    :param kwargs: Options of cls: Scaling_Simulator().
+    """
+    server = Fake_Api_Server().start()
+    fd, config_file = tempfile.mkstemp(suffix='.kubeconfig')
+    os.close(fd)
+    try:
+        server.write_kubeconfig(config_file)
+        k8s_controller = K8s_Controller(Kube_Client(config_file))
+        return Scaling_Simulator(k8s_controller, server.cluster, arrivals, **kwargs).run()
+    finally:
+        server.stop()
+        os.remove(config_file)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('log_file', nargs='?', default='../Testing/metrics_logs.json')
+    parser.add_argument('--url', default='http://127.0.0.1:7080/',
+                        help='Replay the requests of this endpoint only')
+    parser.add_argument('--startup-time', type=float, default=10.0)
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    trace = load_arrivals(args.log_file, args.url)
+    scenarios = {
+        'reactive': {},
+        'stabilized': {'policy': Scaling_Policy(scale_down_stabilization=60)},
+        'holt': {'forecaster': make_forecaster('holt')},
+        'linear': {'forecaster': make_forecaster('linear')},
+    }
+
+    print(f"{len(trace)} requests over {trace[-1]:.0f}s from {args.url}")
+    print(f"{'Scenario':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'Failed %':>10}{'Pod s':>10}{'Scales':>8}{'Max':>6}")
+    for name, options in scenarios.items():
+        options.setdefault('policy', Scaling_Policy(scale_down_stabilization=0))
+        result = simulate(trace, startup_time=args.startup_time, interval=args.interval,
+                          seed=args.seed, **options).summary()
+        print(f"{name:<12}{result['p50_ms']:>10.0f}{result['p95_ms']:>10.0f}"
+              f"{result['p99_ms']:>10.0f}{result['failure_rate'] * 100:>10.1f}"
+              f"{result['pod_seconds']:>10.0f}{result['scale_events']:>8}"
+              f"{result['max_replicas']:>6}")
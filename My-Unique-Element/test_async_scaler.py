@@ -0,0 +1,105 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from urllib3.exceptions import MaxRetryError
+
+from async_scaler import Async_Scaling_Engine, Scale_Target
+from controller_metrics import RECONCILE_ERRORS
+from fake_api_server import Fake_Api_Server
+from k8s_controller import K8s_Controller
+from kube_client import Kube_Client
+
+
+class Test_Async_Scaling_Engine(unittest.TestCase):
+    """Tests cls: Async_Scaling_Engine() against cls: Fake_Api_Server()"""
+
+    def setUp(self):
+        self.server = Fake_Api_Server().start()
+        cluster = self.server.cluster
+        for i in range(4):
+            cluster.add_deployment(f'ns-{i}', 'my-app-deployment', 1, '100m')
+        cluster.add_deployment('slow-ns', 'my-app-deployment', 1, '100m')
+        cluster.delays['slow-ns'] = 1.0
+
+        fd, self.config_file = tempfile.mkstemp()
+        os.close(fd)
+        self.server.write_kubeconfig(self.config_file)
+        self.k8s_controller = K8s_Controller(Kube_Client(self.config_file))
+
+    def tearDown(self):
+        self.server.stop()
+        os.remove(self.config_file)
+
+    def test_parse_target(self):
+        target = Scale_Target.parse('my-app-namespace/my-app-deployment')
+
+        # Assertions
+        self.assertEqual(target.namespace, 'my-app-namespace')
+        self.assertEqual(target.deployment_name, 'my-app-deployment')
+        self.assertIsNone(Scale_Target.parse('my-app-namespace').deployment_name)
+
+    def test_concurrent_reconcile(self):
+        # Initiation
+        targets = [Scale_Target(f'ns-{i}', interval=0.05) for i in range(4)]
+        slow_target = Scale_Target('slow-ns', interval=0.05)
+        engine = Async_Scaling_Engine(self.k8s_controller,
+                                      targets + [slow_target],
+                                      max_concurrency=3)
+
+        # Test
+        asyncio.run(engine.run(duration=0.8))
+
+        # Assertions
+        cluster = self.server.cluster
+        for target in targets:
+            self.assertEqual(target.error_count, 0)
+            self.assertGreater(target.reconcile_count, 1)
+            self.assertEqual(target.deployment_name, 'my-app-deployment')
+            self.assertGreater(cluster.replicas(target.namespace, 'my-app-deployment'), 1)
+        # The slow target did not block the others
+        self.assertLessEqual(slow_target.reconcile_count, 1)
+        self.assertLessEqual(cluster.max_in_flight, 3)
+
+    def test_deployments_of_one_namespace(self):
+        # Initiation: a busy and an idle Deployment share the namespace
+        cluster = self.server.cluster
+        cluster.add_deployment('shared-ns', 'busy', 2, '100m')
+        cluster.add_deployment('shared-ns', 'idle', 2, '10m')
+        busy = Scale_Target.parse('shared-ns/busy', interval=0.05)
+        idle = Scale_Target.parse('shared-ns/idle', interval=0.05)
+        engine = Async_Scaling_Engine(self.k8s_controller, [busy, idle])
+
+        # Test
+        asyncio.run(engine.run(duration=0.5))
+
+        # Assertions: each target scaled on its own Pods only
+        self.assertEqual((busy.error_count, idle.error_count), (0, 0))
+        self.assertGreater(cluster.replicas('shared-ns', 'busy'), 2)
+        self.assertEqual(cluster.replicas('shared-ns', 'idle'), 1)
+        self.assertEqual(self.k8s_controller.pod_count('shared-ns', 'idle'), 1)
+        self.assertEqual(self.k8s_controller.cpu_store.series('shared-ns', 'idle').last, 10)
+
+    def test_transport_error_isolated(self):
+        # Initiation: the metrics of one target are unreachable
+        broken_source = mock.Mock()
+        broken_source.read.side_effect = MaxRetryError(None, '/stats', 'Connection refused')
+        broken = Scale_Target('ns-0', interval=0.05, metric_source=broken_source)
+        healthy = Scale_Target('ns-1', interval=0.05)
+        engine = Async_Scaling_Engine(self.k8s_controller, [broken, healthy])
+
+        # Test
+        asyncio.run(engine.run(duration=0.5))
+
+        # Assertions
+        self.assertGreater(broken.error_count, 1)
+        self.assertEqual(broken.reconcile_count, 0)
+        self.assertGreater(RECONCILE_ERRORS.labels('ns-0', 'MaxRetryError').value, 1)
+        self.assertEqual(healthy.error_count, 0)
+        self.assertGreater(healthy.reconcile_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import benchmark_runner
+from benchmark_runner import (Benchmark_Config, compare_bundles, process_cpu_seconds,
+                              run_benchmark, scale_up_latencies)
+from scaling_loop import Decision
+
+
+class Test_Benchmark_Runner(unittest.TestCase):
+    """Tests the orchestrated benchmark on local uvicorn Pods"""
+
+    def setUp(self):
+        self.results_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.results_dir)
+
+    def test_scale_up_latencies(self):
+        # Initiation
+        decisions = [Decision(1.0, 1, 3, 100, 'metric', 3),
+                     Decision(1.5, 1, 3, 100, 'metric', None),  # Pods still starting
+                     Decision(2.0, 3, 3, 50, 'within tolerance', None),
+                     Decision(4.0, 3, 5, 80, 'metric', 5),
+                     Decision(9.0, 5, 2, 10, 'metric', 2)]
+        timeline = [(0.5, 1, 1), (1.5, 3, 1), (2.5, 3, 3), (4.5, 5, 4), (6.0, 5, 5)]
+
+        # Assertions: only the patches scaling up are counted
+        self.assertEqual(scale_up_latencies(decisions, timeline), [1.5, 2.0])
+        self.assertEqual(scale_up_latencies([Decision(7.0, 5, 6, 60, 'metric', 6)], timeline), [])
+
+    def write_summary(self, name, p95, scale_up_latency):
+        directory = os.path.join(self.results_dir, name)
+        os.makedirs(directory)
+        with open(os.path.join(directory, 'summary.json'), 'w') as file:
+            json.dump({'latency': {'p50': 100, 'p95': p95, 'p99': 900, 'failure_rate': 0.0},
+                       'scaling': {'reaction_time': 1.0, 'scale_up_latency': scale_up_latency}}, file)
+        return directory
+
+    def test_compare_bundles(self):
+        # Initiation
+        old = self.write_summary('old', 500, 4.0)
+        same = self.write_summary('same', 520, 3.0)
+        slower = self.write_summary('slower', 500, 6.0)
+
+        # Test
+        regressions = {name: [metric for metric, *_, regressed in compare_bundles(old, new) if regressed]
+                       for name, new in (('same', same), ('slower', slower))}
+
+        # Assertions
+        self.assertEqual(regressions, {'same': [], 'slower': ['scaling.scale_up_latency']})
+
+    def test_run_benchmark(self):
+        # Initiation: every request is over the 1 millicore target
+        config = Benchmark_Config(profile='real-time-hpa', stages=[(1, 4), (3, 4)],
+                                  think_time=0.1, target_value=1, max_replicas=2,
+                                  min_interval=0.5, max_interval=1, window=1,
+                                  results_dir=self.results_dir)
+
+        # Test
+        bundle = run_benchmark(config)
+
+        # Assertions
+        self.assertEqual(sorted(os.listdir(bundle)), ['requests.csv', 'summary.json', 'timeline.csv'])
+        with open(os.path.join(bundle, 'summary.json')) as file:
+            summary = json.load(file)
+        self.assertGreater(summary['latency']['requests'], 10)
+        self.assertEqual(summary['scaling']['max_replicas'], 2)
+        self.assertIsNotNone(summary['scaling']['reaction_time'])
+        self.assertEqual(summary['config']['stages'], [[1, 4], [3, 4]])
+        self.assertEqual(len(summary['environment']['commit']), 40)
+
+    def test_pod_stats_benchmark(self):
+        # Initiation: every Pod on its own port of 127.0.0.1
+        config = Benchmark_Config(profile='real-time-hpa', stages=[(1, 4), (2, 4)],
+                                  think_time=0.1, metric_source='pod-stats', target_value=0.1,
+                                  max_replicas=2, min_interval=0.5, max_interval=1,
+                                  window=1, forecaster='none', results_dir=self.results_dir)
+
+        # Test
+        bundle = run_benchmark(config)
+
+        # Assertions
+        with open(os.path.join(bundle, 'summary.json')) as file:
+            summary = json.load(file)
+        self.assertEqual(summary['latency']['failure_rate'], 0.0)
+        self.assertEqual(summary['scaling']['max_replicas'], 2)
+
+    def test_cpu_not_measurable(self):
+        # Initiation
+        self.assertIsNotNone(process_cpu_seconds(os.getpid()))
+
+        # Assertions: no /proc and no psutil fails loudly
+        with mock.patch.object(benchmark_runner, 'process_cpu_seconds', return_value=None):
+            with self.assertRaises(RuntimeError):
+                run_benchmark(Benchmark_Config(results_dir=self.results_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
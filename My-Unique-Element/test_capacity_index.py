@@ -0,0 +1,150 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from kubernetes import client
+
+from capacity_index import Capacity_Index, pod_requests
+from fake_api_server import Fake_Api_Server
+from informer_cache import Node_Informer, Pod_Informer, Fake_List_Response, Fake_Watch
+from k8s_controller import K8s_Controller
+from kube_client import Kube_Client
+
+
+def make_node(name, cpu='2', memory='4Gi', pods='110', ready='True', rv='1'):
+    return client.V1Node(
+        metadata=client.V1ObjectMeta(name=name, resource_version=rv),
+        spec=client.V1NodeSpec(),
+        status=client.V1NodeStatus(
+            allocatable={'cpu': cpu, 'memory': memory, 'pods': pods},
+            conditions=[client.V1NodeCondition(type='Ready', status=ready)]))
+
+
+def make_pod(name, node=None, phase='Running', cpu='500m', memory='1Gi', rv='1',
+             namespace='my-app-namespace'):
+    return client.V1Pod(
+        metadata=client.V1ObjectMeta(name=name, namespace=namespace, resource_version=rv),
+        spec=client.V1PodSpec(node_name=node, containers=[client.V1Container(
+            name='my-app', resources=client.V1ResourceRequirements(
+                requests={'cpu': cpu, 'memory': memory}))]),
+        status=client.V1PodStatus(phase=phase))
+
+
+class Test_Capacity_Index(unittest.TestCase):
+    """Tests cls: Capacity_Index() with kubernetes model objects"""
+
+    def test_pod_requests(self):
+        # Initiation
+        spec = make_pod('pod-1').spec
+        spec.containers.append(client.V1Container(name='sidecar', resources=client.V1ResourceRequirements(
+            requests={'cpu': '100m'})))
+        spec.init_containers = [client.V1Container(name='init', resources=client.V1ResourceRequirements(
+            requests={'cpu': '1', 'memory': '64Mi'}))]
+
+        # Assertions: the init container needs more CPU than the others together
+        self.assertEqual(pod_requests(spec), (1000, 1024 ** 3))
+        self.assertEqual(pod_requests(client.V1PodSpec(containers=[client.V1Container(name='app')])),
+                         (0, 0))
+
+    def test_headroom(self):
+        # Initiation
+        index = Capacity_Index()
+        index.add_node(make_node('node-1'))
+        index.add_node(make_node('node-2', cpu='1', pods='3'))
+        index.add_node(make_node('node-3', ready='False'))
+
+        # Test
+        for i in range(3):
+            index.add_pod(make_pod(f'pod-{i}', 'node-1'))
+        index.add_pod(make_pod('pod-pending'))
+        index.add_pod(make_pod('pod-done', 'node-2', phase='Succeeded'))
+
+        # Assertions: node-1 has 500m left, node-2 fits 2 Pods of 500m
+        self.assertEqual(index.headroom(500, 1024 ** 3), 3)
+        self.assertEqual(index.headroom(0, 0), 107 + 3)
+        index.remove_pod(make_pod('pod-0', 'node-1'))
+        self.assertEqual(index.headroom(500, 1024 ** 3), 4)
+        self.assertIsNone(Capacity_Index().headroom(500, 0))
+
+    def test_informers(self):
+        # Initiation
+        index = Capacity_Index()
+        nodes = Node_Informer(mock.Mock(return_value=Fake_List_Response([make_node('node-1')], '10')),
+                              Fake_Watch([[('ADDED', make_node('node-2', cpu='1', rv='11'))]]),
+                              capacity_index=index)
+        pods = Pod_Informer(mock.Mock(return_value=Fake_List_Response(
+            [make_pod('pod-1', 'node-1'), make_pod('pod-2', phase='Pending')], '10')),
+            Fake_Watch([[('MODIFIED', make_pod('pod-2', 'node-2', rv='12')),
+                         ('DELETED', make_pod('pod-1', 'node-1', rv='13'))]]),
+            capacity_index=index)
+
+        # Test
+        nodes.relist()
+        pods.relist()
+        before = (index.headroom(500, 0), pods.pending_count('my-app-namespace'))
+        nodes.watch_once()
+        pods.watch_once()
+
+        # Assertions
+        self.assertEqual(before, (3, (1, 1)))
+        self.assertEqual(index.headroom(500, 0), 4 + 1)
+        self.assertEqual(pods.pending_count('my-app-namespace'), (0, 0))
+
+
+class Test_Cap_Scale_Up(unittest.TestCase):
+    """Tests cls: K8s_Controller().cap_scale_up() against cls: Fake_Api_Server()"""
+
+    def setUp(self):
+        self.server = Fake_Api_Server().start()
+        self.cluster = self.server.cluster
+        self.cluster.add_deployment('my-app-namespace', 'my-app-deployment', 2,
+                                    requests={'cpu': '500m', 'memory': '256Mi'})
+
+        fd, self.config_file = tempfile.mkstemp()
+        os.close(fd)
+        self.server.write_kubeconfig(self.config_file)
+        self.k8s_controller = K8s_Controller(Kube_Client(self.config_file))
+
+    def tearDown(self):
+        self.server.stop()
+        os.remove(self.config_file)
+
+    def cap(self, running, desired):
+        return self.k8s_controller.cap_scale_up('my-app-namespace', 'my-app-deployment',
+                                                running, desired)
+
+    def test_no_nodes(self):
+        # Assertions: without Nodes the scale up is not capped
+        self.assertEqual(self.cap(2, 10), (10, None))
+        self.assertEqual(self.cap(2, 1), (1, None))
+
+    def test_saturated_nodes(self):
+        # Initiation: 2 Pods of 500m fit next to the 2 running ones
+        self.cluster.add_node('node-1', cpu='2')
+
+        # Assertions
+        self.assertEqual(self.cap(2, 3), (3, None))
+        self.assertEqual(self.cap(2, 10), (4, 'capacity'))
+        self.cluster.set_replicas('my-app-namespace', 'my-app-deployment', 4)
+        self.assertEqual(self.cap(4, 6), (None, 'capacity'))
+
+    def test_pending_in_flight(self):
+        # Initiation: 2 Pods starting and 2 more that fit nowhere
+        self.cluster.add_node('node-1', cpu='2')
+        self.cluster.set_replicas('my-app-namespace', 'my-app-deployment', 6)
+        self.cluster.set_pods('my-app-namespace', 'my-app-deployment', 2)
+
+        # Assertions
+        self.assertEqual(self.k8s_controller.pending_pod_count('my-app-namespace'), (4, 2))
+        self.assertEqual(self.cap(2, 5), (None, 'in flight'))
+        self.assertEqual(self.cap(2, 10), (None, 'capacity'))
+
+        # node-2 fits 3 Pods, 2 of them for the unscheduled ones
+        self.cluster.add_node('node-2', cpu='1500m')
+        self.assertEqual(self.cap(2, 10), (7, 'capacity'))
+        self.assertEqual(self.k8s_controller.pending_pod_count('my-app-namespace'), (4, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
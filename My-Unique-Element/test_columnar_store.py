@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from columnar_store import (K6_SCHEMA, MONITOR_SCHEMA, Columnar_Store,
+                            bucket_percentiles, ingest_k6_log, ingest_monitor_csv, pq)
+
+LOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        '..', 'Testing', 'metrics_logs.json')
+
+
+class Test_Columnar_Store(unittest.TestCase):
+    """Tests the time-partitioned column files"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.schema = {'timestamp': 'float64', 'url': 'category', 'latency': 'float64'}
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def check_backend(self, backend):
+        # Initiation
+        store = Columnar_Store(self.directory.name, self.schema, partition_seconds=60,
+                               backend=backend)
+
+        # Test: rows over 3 partitions, in 2 batches
+        store.write({'timestamp': [0.5, 30, 61, 150], 'url': ['HPA', 'RT', 'HPA', 'RT'],
+                     'latency': [10, 20, 30, 40]})
+        store.write({'timestamp': [59], 'url': ['RT'], 'latency': [50]})
+
+        # Assertions
+        self.assertEqual([(start, len(files)) for start, files in store.partitions()],
+                         [(0, 2), (60, 1), (120, 1)])
+        data = store.read()
+        self.assertEqual(data['latency'].dtype, np.float64)
+        self.assertEqual(sorted(data['latency']), [10, 20, 30, 40, 50])
+        window = store.read(['latency'], start=30, end=61)
+        self.assertEqual(sorted(window['latency']), [20, 50])
+        self.assertEqual(list(window), ['latency'])
+
+        # The dictionary of the codes outlives the store
+        reopened = Columnar_Store(self.directory.name, self.schema, partition_seconds=60,
+                                  backend=backend)
+        self.assertEqual(reopened.categories['url'], ['HPA', 'RT'])
+        reopened.write({'timestamp': [200], 'url': ['New'], 'latency': [1]})
+        codes = reopened.read(['url'], start=180)['url']
+        self.assertEqual([reopened.categories['url'][code] for code in codes], ['New'])
+
+    def test_npz_backend(self):
+        self.check_backend('npz')
+
+    @unittest.skipIf(pq is None, 'pyarrow is not installed')
+    def test_parquet_backend(self):
+        self.check_backend('parquet')
+
+    def test_invalid_store(self):
+        # Assertions
+        with self.assertRaises(ValueError):
+            Columnar_Store(self.directory.name, self.schema, backend='xlsx')
+        with self.assertRaises(ValueError):
+            Columnar_Store(self.directory.name, {'latency': 'float64'})
+        store = Columnar_Store(self.directory.name, self.schema, backend='npz')
+        with self.assertRaises(ValueError):
+            store.write({'timestamp': [1]})
+        self.assertEqual(store.read()['latency'].size, 0)
+
+    def test_bucket_percentiles(self):
+        # Initiation
+        rng = np.random.default_rng(7)
+        times = rng.uniform(0, 60, 5000)
+        keys = rng.integers(0, 3, 5000)
+        values = rng.exponential(100, 5000)
+
+        # Test
+        table = bucket_percentiles(times, keys, values, bucket=10, q=(50, 95))
+
+        # Assertions: same as np.percentile on every group
+        self.assertEqual(len(table['key']), 18)
+        self.assertEqual(table['count'].sum(), 5000)
+        for key, start, p50, p95 in zip(table['key'], table['bucket_start'],
+                                        table['p50'], table['p95']):
+            group = values[(keys == key) & (times >= start) & (times < start + 10)]
+            self.assertAlmostEqual(p50, np.percentile(group, 50))
+            self.assertAlmostEqual(p95, np.percentile(group, 95))
+
+    def test_ingest_k6_log(self):
+        # Initiation
+        store = Columnar_Store(self.directory.name, K6_SCHEMA, backend='npz')
+
+        # Test
+        count = ingest_k6_log(LOG_FILE, store, batch_rows=500)
+
+        # Assertions
+        data = store.read()
+        self.assertEqual(len(data['timestamp']), count)
+        self.assertEqual(sorted(store.categories['url']), ['HPA', 'Real-Time-HPA'])
+        self.assertTrue(np.isnan(data['iteration_duration']).all())
+        self.assertEqual(data['vus'].dtype, np.int32)
+
+    def test_ingest_monitor_csv(self):
+        # Initiation
+        csv_file = os.path.join(self.directory.name, 'monitor.csv')
+        with open(csv_file, 'w') as file:
+            file.write("Count,Datetime,HPA Pod Count,Real Time HPA Pod Count,"
+                       "HPA CPU Usage (%),Real Time HPA CPU Usage (%),Revised Replica Count\n"
+                       "1,2024-12-30T19:59:01,1,2,80.5,40,2\n"
+                       "2,2024-12-30T19:59:02,2,3,60,35.5,3\n")
+        store = Columnar_Store(os.path.join(self.directory.name, 'store'), MONITOR_SCHEMA,
+                               backend='npz')
+
+        # Test
+        count = ingest_monitor_csv(csv_file, store, {
+            'fast-api-hpa-namespace': ('HPA Pod Count', 'HPA CPU Usage (%)'),
+            'my-app-namespace': ('Real Time HPA Pod Count', 'Real Time HPA CPU Usage (%)'),
+        })
+
+        # Assertions
+        data = store.read()
+        self.assertEqual(count, 4)
+        self.assertEqual(sorted(data['pod_count']), [1, 2, 2, 3])
+        self.assertEqual(sorted(data['cpu_usage']), [35.5, 40, 60, 80.5])
+
+
+if __name__ == '__main__':
+    unittest.main()
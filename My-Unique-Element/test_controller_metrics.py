@@ -0,0 +1,162 @@
+import os
+import tempfile
+import threading
+import unittest
+import urllib.request
+
+from kubernetes import client
+
+from controller_metrics import (API_CALLS, API_ERRORS, DECISIONS, STAGE_SECONDS,
+                                Counter, Gauge, Histogram, Metrics_Server,
+                                Registry, api_call, record_decision, stage)
+from fake_api_server import Fake_Api_Server
+from k8s_controller import K8s_Controller
+from kube_client import Kube_Client
+
+
+class Test_Registry(unittest.TestCase):
+    """Tests the Prometheus text format of cls: Registry()"""
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_and_gauge(self):
+        # Initiation
+        counter = Counter('calls_total', 'Calls.', ('call',), self.registry)
+        gauge = Gauge('replicas', 'Replicas.', (), self.registry)
+
+        # Test
+        counter.labels('list').inc()
+        counter.labels('list').inc(2)
+        counter.labels('a "quoted"\nname').inc()
+        gauge.labels().set(4)
+        text = self.registry.render()
+
+        # Assertions
+        self.assertIn('# TYPE calls_total counter\n', text)
+        self.assertIn('calls_total{call="list"} 3.0\n', text)
+        self.assertIn(r'calls_total{call="a \"quoted\"\nname"} 1.0', text)
+        self.assertIn('# TYPE replicas gauge\nreplicas 4.0\n', text)
+        with self.assertRaises(ValueError):
+            counter.labels()
+        with self.assertRaises(ValueError):
+            Counter('calls_total', 'Again.', (), self.registry)
+
+    def test_histogram(self):
+        # Initiation
+        histogram = Histogram('latency_seconds', 'Latency.', ('stage',), self.registry,
+                              buckets=(0.1, 1.0))
+
+        # Test
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.labels('scale').observe(value)
+        text = self.registry.render()
+
+        # Assertions: cumulative buckets, upper bound inclusive
+        self.assertIn('latency_seconds_bucket{stage="scale",le="0.1"} 2\n', text)
+        self.assertIn('latency_seconds_bucket{stage="scale",le="1.0"} 3\n', text)
+        self.assertIn('latency_seconds_bucket{stage="scale",le="+Inf"} 4\n', text)
+        self.assertIn('latency_seconds_sum{stage="scale"} 3.65\n', text)
+        self.assertIn('latency_seconds_count{stage="scale"} 4\n', text)
+
+    def test_render_while_adding_labels(self):
+        # Initiation
+        counter = Counter('calls_total', 'Calls.', ('call',), self.registry)
+        done = threading.Event()
+
+        def add_labels():
+            for i in range(20_000):
+                counter.labels(str(i)).inc()
+            done.set()
+
+        # Test: render while another thread adds children
+        thread = threading.Thread(target=add_labels)
+        thread.start()
+        while not done.is_set():
+            self.registry.render()
+        thread.join()
+
+        # Assertions
+        self.assertEqual(self.registry.render().count('\ncalls_total{'), 20_000)
+
+    def test_stage_counts_every_call(self):
+        # Initiation
+        n = 20_000
+        counts = STAGE_SECONDS.labels('overhead').counts[:]
+
+        # Test
+        for _ in range(n):
+            with stage('overhead'):
+                pass
+
+        # Assertions: the timing itself is measured by benchmark_controller_metrics.py
+        self.assertEqual(sum(STAGE_SECONDS.labels('overhead').counts), sum(counts) + n)
+
+
+class Test_Controller_Instrumentation(unittest.TestCase):
+    """Tests the metrics recorded by cls: K8s_Controller()"""
+
+    def setUp(self):
+        self.server = Fake_Api_Server().start()
+        self.server.cluster.add_deployment('metrics-ns', 'my-app-deployment', 2, '80m')
+        fd, self.config_file = tempfile.mkstemp()
+        os.close(fd)
+        self.server.write_kubeconfig(self.config_file)
+        self.k8s_controller = K8s_Controller(Kube_Client(self.config_file))
+
+    def tearDown(self):
+        self.server.stop()
+        os.remove(self.config_file)
+
+    def test_stages_and_api_calls(self):
+        # Initiation
+        calls = API_CALLS.labels('list_namespaced_pod').value
+        scales = STAGE_SECONDS.labels('scale').counts[:]
+
+        # Test
+        self.k8s_controller.pod_count('metrics-ns')
+        self.k8s_controller.pod_cpu_usage('metrics-ns')
+        self.k8s_controller.scale_replicas('metrics-ns', 'my-app-deployment', 3)
+
+        # Assertions
+        self.assertEqual(API_CALLS.labels('list_namespaced_pod').value, calls + 1)
+        self.assertEqual(sum(STAGE_SECONDS.labels('scale').counts), sum(scales) + 1)
+        self.assertGreater(sum(STAGE_SECONDS.labels('pod_metrics').counts), 0)
+
+    def test_api_errors(self):
+        # Initiation
+        errors = API_ERRORS.labels('patch_namespaced_deployment_scale', '404').value
+
+        # Test
+        self.k8s_controller.scale_replicas('metrics-ns', 'missing-deployment', 3)
+        with self.assertRaises(client.exceptions.ApiException):
+            with api_call('patch_namespaced_deployment_scale'):
+                raise client.exceptions.ApiException(status=404)
+
+        # Assertions
+        self.assertEqual(API_ERRORS.labels('patch_namespaced_deployment_scale', '404').value,
+                         errors + 2)
+
+    def test_metrics_endpoint(self):
+        # Initiation
+        metrics_server = Metrics_Server(host='127.0.0.1', port=0).start()
+        record_decision('metrics-ns', 2, 5, 'metric')
+        url = f'http://127.0.0.1:{metrics_server.port}'
+
+        # Test
+        try:
+            with urllib.request.urlopen(f'{url}/metrics') as response:
+                content_type = response.headers['Content-Type']
+                text = response.read().decode()
+        finally:
+            metrics_server.stop()
+
+        # Assertions
+        self.assertTrue(content_type.startswith('text/plain'))
+        self.assertIn('k8s_controller_desired_replicas{namespace="metrics-ns"} 5.0', text)
+        self.assertIn('k8s_controller_current_replicas{namespace="metrics-ns"} 2.0', text)
+        self.assertGreaterEqual(DECISIONS.labels('metrics-ns', 'scale_up', 'metric').value, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import threading
+import unittest
+
+import numpy as np
+
+from cpu_time_series import Cpu_Series, Cpu_Store
+
+
+class Test_Cpu_Series(unittest.TestCase):
+    """Tests cls: Cpu_Series() rolling aggregates."""
+
+    def test_mean_by_samples_and_seconds(self):
+        # Initiation
+        series = Cpu_Series(capacity=10)
+        for t, value in enumerate([10, 20, 30, 40]):
+            series.append(value, timestamp=float(t))
+
+        # Assertions
+        self.assertEqual(series.mean(), 25)
+        self.assertEqual(series.mean(samples=2), 35)
+        self.assertEqual(series.mean(seconds=1), 35)
+        self.assertEqual(series.last, 40)
+
+    def test_capacity_bound(self):
+        # Initiation
+        series = Cpu_Series(capacity=5)
+        values = np.arange(100, dtype=float)
+        for t, value in enumerate(values):
+            series.append(value, timestamp=float(t))
+
+        # Assertions
+        self.assertEqual(len(series), 5)
+        np.testing.assert_array_equal(series.values(), values[-5:])
+        self.assertEqual(series.mean(), values[-5:].mean())
+        self.assertEqual(series.mean(samples=3), values[-3:].mean())
+        self.assertEqual(series.max(), 99)
+
+    def test_max_age_bound(self):
+        # Initiation
+        series = Cpu_Series(capacity=100, max_age=10)
+        series.append(500, timestamp=0)
+        for t in range(5, 20):
+            series.append(t, timestamp=float(t))
+
+        # Assertions
+        self.assertEqual(series.timestamps()[0], 9)
+        self.assertEqual(series.max(), 19)
+        self.assertEqual(series.mean(), np.arange(9, 20).mean())
+
+    def test_max_and_percentile_window(self):
+        # Initiation
+        series = Cpu_Series(capacity=100)
+        for t, value in enumerate([90, 10, 20, 30, 40]):
+            series.append(value, timestamp=float(t))
+
+        # Assertions
+        self.assertEqual(series.max(), 90)
+        self.assertEqual(series.max(samples=4), 40)
+        self.assertEqual(series.percentile(50, samples=4), 25)
+
+    def test_ewma(self):
+        # Initiation
+        series = Cpu_Series(ewma_tau=10)
+        series.append(0, timestamp=0)
+        series.append(100, timestamp=10)
+
+        # Assertions
+        self.assertAlmostEqual(series.ewma, 100 * (1 - np.exp(-1)))
+
+
+class Test_Cpu_Store(unittest.TestCase):
+    """Tests cls: Cpu_Store() per pod and per deployment series."""
+
+    def test_record(self):
+        # Initiation
+        store = Cpu_Store(pod_ttl=5, pod_history=True)
+
+        # Test
+        avg = store.record('my-app-namespace', {'pod-1': 40, 'pod-2': 60}, timestamp=0)
+        store.record('my-app-namespace', {'pod-2': 100}, timestamp=10)
+
+        # Assertions
+        self.assertEqual(avg, 50)
+        self.assertEqual(store.series('my-app-namespace').mean(), 75)
+        self.assertIsNone(store.pod_series('my-app-namespace', 'pod-1'))
+        self.assertEqual(len(store.pod_series('my-app-namespace', 'pod-2')), 2)
+        self.assertEqual(store.pod_series('my-app-namespace', 'pod-2').capacity, 60)
+
+    def test_no_pod_history(self):
+        # Initiation
+        store = Cpu_Store()
+
+        # Test
+        avg = store.record('my-app-namespace', {'pod-1': 40, 'pod-2': 60}, 'app', timestamp=0)
+        store.record_mean('my-app-namespace', 70, 'app', timestamp=1)
+
+        # Assertions: only the deployment series is kept
+        self.assertEqual(avg, 50)
+        self.assertEqual(store.pods, {})
+        self.assertEqual(store.series('my-app-namespace', 'app').values().tolist(), [50, 70])
+
+    def test_concurrent_eviction(self):
+        # Initiation: 200 pods of two namespaces, expired by both threads
+        store = Cpu_Store(pod_ttl=5, pod_history=True)
+        for namespace in ('a', 'b'):
+            store.record(namespace, {f'pod-{i}': 10 for i in range(100)}, timestamp=0)
+        errors = []
+
+        def record(namespace):
+            try:
+                for timestamp in range(10, 30):
+                    store.record(namespace, {'pod-0': 10}, timestamp=timestamp)
+            except Exception as e:
+                errors.append(e)
+
+        # Test
+        threads = [threading.Thread(target=record, args=(namespace,)) for namespace in 'ab']
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assertions
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(store.pods), [('a', 'pod-0'), ('b', 'pod-0')])
+
+
+if __name__ == '__main__':
+    unittest.main()
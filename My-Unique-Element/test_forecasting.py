@@ -0,0 +1,81 @@
+import os
+import unittest
+
+import numpy as np
+
+from forecast_replay import evaluate, load_trace
+from forecasting import (Holt_Forecaster, Last_Value_Forecaster,
+                         Linear_Regression_Forecaster, make_forecaster,
+                         predicted_metric_value)
+
+METRICS_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           '..', 'Testing', 'metrics_logs.json')
+
+
+class Test_Forecasters(unittest.TestCase):
+    """Tests the forecasters on synthetic load."""
+
+    def test_linear_ramp(self):
+        # Initiation
+        holt = Holt_Forecaster(level_tau=2, trend_tau=5)
+        linear = Linear_Regression_Forecaster(window=20)
+        for t in range(60):
+            holt.update(t, 10 + 2 * t)
+            linear.update(t, 10 + 2 * t)
+
+        # Assertions
+        expected = 10 + 2 * (59 + 10)
+        self.assertAlmostEqual(linear.forecast(10), expected)
+        self.assertAlmostEqual(holt.forecast(10), expected, delta=2)
+
+    def test_constant_load(self):
+        # Initiation
+        for forecaster in (Holt_Forecaster(), Linear_Regression_Forecaster(),
+                           Last_Value_Forecaster()):
+            for t in range(30):
+                forecaster.update(t, 50)
+
+            # Assertions
+            self.assertAlmostEqual(forecaster.forecast(10), 50)
+
+    def test_no_samples(self):
+        # Assertions
+        self.assertIsNone(Holt_Forecaster().forecast(10))
+        self.assertIsNone(Linear_Regression_Forecaster().forecast(10))
+        with self.assertRaises(ValueError):
+            make_forecaster('arima')
+
+    def test_predicted_metric_value(self):
+        # Initiation
+        forecaster = Linear_Regression_Forecaster()
+
+        # Assertions
+        self.assertEqual(predicted_metric_value(None, 0, 40, 10), 40)
+        self.assertEqual(predicted_metric_value(forecaster, 0, 40, 10), 40)
+        self.assertEqual(predicted_metric_value(forecaster, 1, 50, 10), 150)
+        # Falling load does not scale down ahead of time
+        self.assertEqual(predicted_metric_value(forecaster, 2, 30, 10), 30)
+
+
+class Test_Forecast_Replay(unittest.TestCase):
+    """Replays Testing/metrics_logs.json through the forecasters."""
+
+    def test_replay_metrics_logs(self):
+        # Initiation
+        traces = load_trace(METRICS_LOG)
+        times, values = traces['Real-Time-HPA']
+
+        # Test
+        last = evaluate(times, values, 'last', horizon=10, pod_capacity=20)
+        linear = evaluate(times, values, 'linear', horizon=10, pod_capacity=20)
+
+        # Assertions
+        self.assertEqual(set(traces), {'Real-Time-HPA', 'HPA'})
+        self.assertTrue(np.all(np.diff(times) > 0))
+        self.assertEqual(last['lead_time'], 0)
+        self.assertLess(linear['mae'], last['mae'])
+        self.assertGreater(linear['lead_time'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+import time
+import unittest
+from unittest import mock
+
+from kubernetes import client
+from urllib3.exceptions import ProtocolError
+
+from informer_cache import (Pod_Informer, Deployment_Informer,
+                            Fake_List_Response, Fake_Watch)
+from k8s_controller import K8s_Controller
+
+
+def make_pod(name, phase='Running', rv='1', namespace='my-app-namespace', labels=None):
+    return client.V1Pod(
+        metadata=client.V1ObjectMeta(name=name, namespace=namespace,
+                                     resource_version=rv, labels=labels),
+        status=client.V1PodStatus(phase=phase, pod_ip='10.0.0.1'))
+
+
+def make_deployment(name, rv='1', namespace='my-app-namespace', replicas=1):
+    return client.V1Deployment(
+        metadata=client.V1ObjectMeta(name=name, namespace=namespace,
+                                     resource_version=rv),
+        spec=client.V1DeploymentSpec(
+            replicas=replicas,
+            selector=client.V1LabelSelector(match_labels={'app': 'my-app'}),
+            template=client.V1PodTemplateSpec()))
+
+
+class Test_Pod_Informer(unittest.TestCase):
+    """Tests cls: Pod_Informer() against cls: Fake_Watch()"""
+
+    def setUp(self):
+        self.list_func = mock.Mock(return_value=Fake_List_Response(
+            [make_pod('pod-1'), make_pod('pod-2', phase='Pending')], '10'))
+
+    def test_relist(self):
+        # Initiation
+        informer = Pod_Informer(self.list_func, Fake_Watch())
+        informer.relist()
+
+        # Assertions
+        self.assertTrue(informer.has_synced())
+        self.assertEqual(informer.resource_version, '10')
+        self.assertEqual(informer.running_count('my-app-namespace'), 1)
+        self.assertEqual(informer.running_count('other-namespace'), 0)
+
+    def test_selected_pods(self):
+        # Initiation: Pods of two Deployments in one namespace
+        informer = Pod_Informer(mock.Mock(return_value=Fake_List_Response([
+            make_pod('web-1', labels={'app': 'web', 'tier': 'front'}),
+            make_pod('web-2', phase='Pending', labels={'app': 'web', 'tier': 'front'}),
+            make_pod('worker-1', labels={'app': 'worker'}),
+            make_pod('bare')], '10')), Fake_Watch())
+        informer.relist()
+
+        # Assertions
+        self.assertEqual(informer.running_count('my-app-namespace'), 3)
+        self.assertEqual(informer.running_count('my-app-namespace', {'app': 'web'}), 1)
+        self.assertEqual(informer.running_count('my-app-namespace',
+                                                {'app': 'web', 'tier': 'back'}), 0)
+        self.assertEqual(informer.pending_count('my-app-namespace', {'app': 'web'}), (1, 1))
+        self.assertEqual(informer.pending_count('my-app-namespace', {'app': 'worker'}), (0, 0))
+        self.assertEqual(informer.running_pod_ips('my-app-namespace', {'app': 'worker'}),
+                         ['10.0.0.1'])
+
+    def test_watch_events(self):
+        # Initiation
+        fake_watch = Fake_Watch([[
+            ('MODIFIED', make_pod('pod-2', rv='11')),
+            ('ADDED', make_pod('pod-3', rv='12')),
+            ('DELETED', make_pod('pod-1', rv='13')),
+        ]])
+        informer = Pod_Informer(self.list_func, fake_watch)
+
+        # Test
+        informer.watch_once()
+
+        # Assertions
+        self.assertEqual(self.list_func.call_count, 1)
+        self.assertEqual(fake_watch.calls[0]['resource_version'], '10')
+        self.assertEqual(informer.resource_version, '13')
+        self.assertEqual(informer.running_count('my-app-namespace'), 2)
+        self.assertIsNone(informer.get('my-app-namespace', 'pod-1'))
+
+    def test_relist_on_410_gone(self):
+        # Initiation
+        fake_watch = Fake_Watch([410, [('ADDED', make_pod('pod-3', rv='21'))]])
+        informer = Pod_Informer(self.list_func, fake_watch)
+
+        # Test
+        informer.watch_once()
+        informer.watch_once()
+
+        # Assertions
+        self.assertEqual(informer.relist_count, 2)
+        self.assertEqual(informer.running_count('my-app-namespace'), 2)
+
+    def test_transport_errors(self):
+        # Initiation: the first LIST and every WATCH fail on the transport
+        self.list_func.side_effect = [ProtocolError('Connection reset by peer')] + (
+            [self.list_func.return_value] * 1000)
+        fake_watch = mock.Mock()
+        fake_watch.stream.side_effect = ProtocolError('Response ended prematurely')
+        informer = Pod_Informer(self.list_func, fake_watch)
+        informer.min_backoff = informer.max_backoff = 0.01
+
+        # Test
+        informer.start(timeout=2)
+        time.sleep(0.1)
+        informer.stop()
+
+        # Assertions: the thread kept relisting instead of dying
+        self.assertGreater(informer.relist_count, 1)
+        self.assertGreater(informer.error_count, 2)
+        self.assertEqual(informer.running_count('my-app-namespace'), 1)
+
+    def test_empty_streams(self):
+        # Initiation: every WATCH stream ends at once without any event
+        fake_watch = Fake_Watch()
+        informer = Pod_Informer(self.list_func, fake_watch)
+        informer.min_backoff = 0.05
+
+        # Test
+        informer.start()
+        time.sleep(0.2)
+        informer.stop()
+
+        # Assertions: waited between the streams instead of spinning
+        self.assertLessEqual(len(fake_watch.calls), 6)
+        self.assertEqual(informer.error_count, 0)
+
+    def test_start_timeout(self):
+        # Initiation
+        self.list_func.side_effect = ProtocolError('Connection refused')
+        informer = Pod_Informer(self.list_func, Fake_Watch())
+        informer.min_backoff = 0.01
+
+        # Test
+        informer.start(timeout=0.1)
+        informer.stop()
+
+        # Assertions
+        self.assertFalse(informer.has_synced())
+
+
+class Test_Deployment_Informer(unittest.TestCase):
+
+    def test_deployment_name(self):
+        # Initiation
+        list_func = mock.Mock(return_value=Fake_List_Response(
+            [make_deployment('my-app-deployment')], '5'))
+        fake_watch = Fake_Watch([[('DELETED', make_deployment('my-app-deployment', rv='6'))]])
+        informer = Deployment_Informer(list_func, fake_watch)
+        informer.relist()
+
+        # Assertions
+        self.assertEqual(informer.deployment_name('my-app-namespace'),
+                         'my-app-deployment')
+
+        informer.watch_once()
+        self.assertIsNone(informer.deployment_name('my-app-namespace'))
+
+
+class Test_K8s_Controller_Informers(unittest.TestCase):
+    """Tests reads of cls: K8s_Controller() served from the cache."""
+
+    def test_reads_from_cache(self):
+        # Initiation
+        k8s_controller = K8s_Controller(kube_client=mock.Mock())
+        k8s_controller.core_v1 = mock.Mock()
+        k8s_controller.core_v1.list_pod_for_all_namespaces.return_value = (
+            Fake_List_Response([make_pod('pod-1'), make_pod('pod-2')], '1'))
+        k8s_controller.apps_v1 = mock.Mock()
+        k8s_controller.apps_v1.list_deployment_for_all_namespaces.return_value = (
+            Fake_List_Response([make_deployment('my-app-deployment')], '1'))
+
+        # Test
+        k8s_controller.start_informers(watcher_factory=Fake_Watch)
+        k8s_controller.stop_informers()
+
+        # Assertions
+        self.assertEqual(k8s_controller.pod_count('my-app-namespace'), 2)
+        self.assertEqual(k8s_controller.get_deployment_name('my-app-namespace'),
+                         'my-app-deployment')
+        k8s_controller.core_v1.list_namespaced_pod.assert_not_called()
+        k8s_controller.apps_v1.list_namespaced_deployment.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import json
+import unittest
+
+from json_stream import iter_json_items
+
+
+def chunked(payload: bytes, size: int) -> list:
+    return [payload[i:i + size] for i in range(0, len(payload), size)]
+
+
+class Test_Iter_Json_Items(unittest.TestCase):
+    """Tests the incremental parser of func: iter_json_items()"""
+
+    BODY = {
+        'kind': 'PodMetricsList',
+        'apiVersion': 'metrics.k8s.io/v1beta1',
+        'metadata': {'selfLink': '/items', 'items': [1, 2]},
+        'items': [
+            {'metadata': {'name': f'pod-{i}', 'namespace': 'my-app-namespace'},
+             'timestamp': '2024-12-05T21:58:50Z', 'window': 15.5,
+             'containers': [{'name': 'my-app', 'usage': {'cpu': f'{i}n', 'memory': 'ü'}}]}
+            for i in range(20)
+        ],
+        'trailing': 12345,
+    }
+
+    def test_every_chunk_size(self):
+        # Initiation
+        payload = json.dumps(self.BODY).encode()
+
+        # Assertions
+        for size in (1, 2, 3, 7, 64, len(payload)):
+            items = list(iter_json_items(chunked(payload, size)))
+            self.assertEqual(items, self.BODY['items'])
+
+    def test_pretty_printed(self):
+        payload = json.dumps(self.BODY, indent=2).encode()
+
+        # Assertions
+        self.assertEqual(list(iter_json_items(chunked(payload, 5))), self.BODY['items'])
+
+    def test_empty_items(self):
+        # Assertions
+        self.assertEqual(list(iter_json_items([b'{"items": []}'])), [])
+        self.assertEqual(list(iter_json_items([b'{}'])), [])
+        self.assertEqual(list(iter_json_items([b'{"kind": "PodMetricsList"}'])), [])
+
+    def test_invalid_json(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_items([b'{"items": [{"a": 1}']))
+        with self.assertRaises(ValueError):
+            list(iter_json_items([b'[1, 2]']))
+
+
+if __name__ == '__main__':
+    unittest.main()
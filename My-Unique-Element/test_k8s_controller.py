@@ -1,7 +1,11 @@
+import os
+import tempfile
 import unittest
 from kubernetes import client
 
+from fake_api_server import Fake_Api_Server
 from k8s_controller import K8s_Controller
+from kube_client import Kube_Client
 from metric_data_class import (Metrics_Collector,
                                Pod_NAME_Collector)
 
@@ -93,6 +97,68 @@ class Test_K8s_Controller(unittest.TestCase,
         self.assertTrue(int(pod_count))
 
 
+class Test_K8s_Controller_Scale(unittest.TestCase):
+    """
+    Tests the /scale subresource fast path of cls: K8s_Controller()
+    against cls: Fake_Api_Server().
+    """
+
+    def setUp(self):
+        self.server = Fake_Api_Server().start()
+        self.cluster = self.server.cluster
+        self.cluster.add_deployment('my-app-namespace', 'my-app-deployment', 1)
+        self.cluster.add_deployment('other-namespace', 'other-deployment', 1)
+
+        fd, self.config_file = tempfile.mkstemp()
+        os.close(fd)
+        self.server.write_kubeconfig(self.config_file)
+        self.k8s_controller = K8s_Controller(Kube_Client(self.config_file))
+
+    def tearDown(self):
+        self.server.stop()
+        os.remove(self.config_file)
+
+    def _patches(self):
+        return [path for method, path in self.cluster.requests if method == 'PATCH']
+
+    def test_scale_replicas(self):
+        # Test
+        response = self.k8s_controller.scale_replicas('my-app-namespace',
+                                                      'my-app-deployment', 3)
+
+        # Assertions
+        self.assertEqual(response.spec.replicas, 3)
+        self.assertEqual(self.cluster.replicas('my-app-namespace', 'my-app-deployment'), 3)
+        self.assertEqual(self._patches(),
+                         ['/apis/apps/v1/namespaces/my-app-namespace/'
+                          'deployments/my-app-deployment/scale'])
+
+    def test_scale_replicas_skips_unchanged(self):
+        # Initiation
+        self.k8s_controller.scale_replicas('my-app-namespace', 'my-app-deployment', 3)
+
+        # Test
+        response = self.k8s_controller.scale_replicas('my-app-namespace',
+                                                      'my-app-deployment', 3)
+
+        # Assertions
+        self.assertIsNone(response)
+        self.assertEqual(len(self._patches()), 1)
+
+    def test_scale_replicas_after_external_scale(self):
+        # Initiation: kubectl scale between two ticks
+        self.k8s_controller.scale_replicas('my-app-namespace', 'my-app-deployment', 3)
+        self.cluster.set_replicas('my-app-namespace', 'my-app-deployment', 5)
+
+        # Test
+        response = self.k8s_controller.scale_replicas('my-app-namespace',
+                                                      'my-app-deployment', 3)
+
+        # Assertions
+        self.assertEqual(response.spec.replicas, 3)
+        self.assertEqual(self.cluster.replicas('my-app-namespace', 'my-app-deployment'), 3)
+        self.assertEqual(len(self._patches()), 2)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from kubernetes import client
+
+from kube_client import Kube_Client
+from k8s_controller import K8s_Controller
+
+
+@mock.patch('kube_client.config.load_kube_config')
+class Test_Kube_Client(unittest.TestCase):
+    """Tests cls: Kube_Client() loads the kubeconfig only when needed."""
+
+    def setUp(self):
+        fd, self.config_file = tempfile.mkstemp()
+        os.close(fd)
+        self.kube_client = Kube_Client(config_file=self.config_file,
+                                       check_interval=0)
+
+    def tearDown(self):
+        os.remove(self.config_file)
+
+    def test_get_reuses_api_client(self, load_kube_config):
+        # Test
+        api_client = self.kube_client.get()
+
+        # Assertions
+        self.assertIs(self.kube_client.get(), api_client)
+        self.assertEqual(load_kube_config.call_count, 1)
+        self.assertEqual(api_client.configuration.connection_pool_maxsize, 8)
+
+    def test_reload_on_config_change(self, load_kube_config):
+        # Initiation
+        api_client = self.kube_client.get()
+        mtime = os.stat(self.config_file).st_mtime
+        os.utime(self.config_file, (mtime + 10, mtime + 10))
+
+        # Assertions
+        self.assertIsNot(self.kube_client.get(), api_client)
+        self.assertEqual(self.kube_client.load_count, 2)
+
+    def test_reload_on_unauthorized(self, load_kube_config):
+        # Initiation
+        api_client = self.kube_client.get()
+
+        # Test
+        self.kube_client.handle_api_exception(client.exceptions.ApiException(status=500))
+        self.assertIs(self.kube_client.get(), api_client)
+
+        self.kube_client.handle_api_exception(client.exceptions.ApiException(status=401))
+
+        # Assertions
+        self.assertIsNot(self.kube_client.get(), api_client)
+        self.assertEqual(load_kube_config.call_count, 2)
+
+    def test_controller_reuses_api_client(self, load_kube_config):
+        # Initiation
+        k8s_controller = K8s_Controller(self.kube_client)
+        core_v1 = k8s_controller.core_v1
+
+        # Test
+        k8s_controller.refresh()
+
+        # Assertions
+        self.assertIs(k8s_controller.core_v1, core_v1)
+        self.assertIs(k8s_controller.custom_objects.api_client,
+                      self.kube_client.get())
+        self.assertEqual(load_kube_config.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
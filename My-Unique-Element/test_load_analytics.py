@@ -0,0 +1,116 @@
+import math
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from load_analytics import (Hdr_Histogram, Load_Test_Analyzer, load_k6_log,
+                            load_monitor_csv, pod_seconds)
+
+LOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        '..', 'Testing', 'metrics_logs.json')
+
+
+class Test_Hdr_Histogram(unittest.TestCase):
+    """Tests the log-linear latency histogram"""
+
+    def test_percentiles(self):
+        # Initiation
+        values = np.random.default_rng(3).lognormal(6, 1, 50_000)
+        histogram = Hdr_Histogram()
+
+        # Test
+        histogram.record_many(values)
+
+        # Assertions: within 1% of the exact percentiles
+        for percentile in (50, 90, 95, 99, 99.9):
+            exact = np.percentile(values, percentile, method='inverted_cdf')
+            self.assertAlmostEqual(histogram.value_at_percentile(percentile) / exact, 1, delta=0.01)
+        self.assertEqual(histogram.value_at_percentile(100), values.max())
+        self.assertAlmostEqual(histogram.mean, values.mean())
+
+    def test_record_and_merge(self):
+        # Initiation
+        values = [0.5, 1, 12.25, 480, 480, 60_000, 10 ** 9]
+        single, many, merged = Hdr_Histogram(), Hdr_Histogram(), Hdr_Histogram()
+
+        # Test
+        for value in values:
+            single.record(value)
+        many.record_many(values)
+        merged.record_many(values[:3])
+        other = Hdr_Histogram()
+        other.record_many(values[3:])
+        merged.merge(other)
+
+        # Assertions
+        self.assertTrue((single.counts == many.counts).all())
+        self.assertTrue((merged.counts == many.counts).all())
+        self.assertEqual(merged.count, 7)
+        self.assertTrue(math.isnan(Hdr_Histogram().value_at_percentile(50)))
+        with self.assertRaises(ValueError):
+            merged.merge(Hdr_Histogram(highest=1000))
+
+
+class Test_Load_Test_Analyzer(unittest.TestCase):
+    """Tests the windows of the comparison analytics"""
+
+    def test_pod_seconds(self):
+        # Initiation: 1 Pod until 5s, then 3 Pods
+        times, pods = np.array([2.0, 5.0]), np.array([1, 3])
+
+        # Assertions
+        self.assertEqual(pod_seconds(times, pods, 0, 10), 5 * 1 + 5 * 3)
+        self.assertEqual(pod_seconds(times, pods, 6, 8), 6)
+        self.assertEqual(pod_seconds(np.empty(0), np.empty(0), 0, 10), 0)
+
+    def test_windows(self):
+        # Initiation
+        analyzer = Load_Test_Analyzer(window=10)
+        for second in range(20):
+            analyzer.add_request(100 + second, 'HPA', 100 + second, failed=second % 5 == 0)
+        analyzer.add_requests([100, 105, 112], ['Real-Time-HPA'] * 3, [50, 70, 90], [0, 0, 1])
+        analyzer.add_pod_sample(100, 'HPA', 1)
+        analyzer.add_pod_sample(115, 'HPA', 2)
+
+        # Test
+        report = analyzer.report()
+        summary = analyzer.summary()
+
+        # Assertions
+        self.assertEqual([(row['scaler'], row['window_start'], row['requests']) for row in report],
+                         [('HPA', 100, 10), ('Real-Time-HPA', 100, 2),
+                          ('HPA', 110, 10), ('Real-Time-HPA', 110, 1)])
+        self.assertEqual(report[0]['throughput'], 1.0)
+        self.assertEqual(report[0]['failure_rate'], 0.2)
+        self.assertAlmostEqual(report[0]['p50'], 104, delta=1)
+        self.assertEqual(report[2]['pod_seconds'], 15)
+        self.assertTrue(math.isnan(report[1]['pod_seconds']))
+        self.assertEqual(summary['HPA']['pod_seconds'], 25)
+        self.assertAlmostEqual(summary['Real-Time-HPA']['failure_rate'], 1 / 3)
+
+    def test_k6_log_and_monitor_csv(self):
+        # Initiation
+        analyzer = Load_Test_Analyzer(window=10)
+        fd, csv_file = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as file:
+            file.write("Count,Datetime,HPA Pod Count,Real Time HPA Pod Count\n"
+                       "1,2024-12-30T19:59:00,1,1\n"
+                       "2,2024-12-30T20:00:00,4,8\n")
+
+        # Test
+        requests = load_k6_log(analyzer, LOG_FILE)
+        samples = load_monitor_csv(analyzer, csv_file)
+        os.remove(csv_file)
+        summary = analyzer.summary()
+
+        # Assertions: every request belongs to one scaler
+        self.assertEqual((requests, samples), (2275, 2))
+        self.assertEqual(summary['HPA']['requests'] + summary['Real-Time-HPA']['requests'], requests)
+        self.assertGreater(summary['Real-Time-HPA']['pod_seconds'], summary['HPA']['pod_seconds'])
+        self.assertLessEqual(summary['HPA']['p50'], summary['HPA']['p95'])
+
+
+if __name__ == '__main__':
+    unittest.main()
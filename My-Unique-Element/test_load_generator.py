@@ -0,0 +1,121 @@
+import asyncio
+import unittest
+
+from fake_api_server import Fake_Pod_Server
+from load_generator import (Http_Pool, Load_Generator, Open_Loop_Load_Generator,
+                            ramp_rate, spiky_rate, stage_target)
+
+
+class Test_Load_Generator(unittest.TestCase):
+    """Tests the asyncio load generator against a fake Pod"""
+
+    def setUp(self):
+        self.pod = Fake_Pod_Server(stats={'in_flight': 1}).start()
+        self.target = ('127.0.0.1', self.pod.port)
+
+    def tearDown(self):
+        self.pod.stop()
+
+    def test_stage_target(self):
+        # Initiation
+        stages = [(10, 100), (20, 100), (10, 0)]
+
+        # Assertions
+        self.assertEqual(stage_target(stages, 0), 0)
+        self.assertEqual(stage_target(stages, 5), 50)
+        self.assertEqual(stage_target(stages, 15), 100)
+        self.assertEqual(stage_target(stages, 35), 50)
+        self.assertIsNone(stage_target(stages, 40))
+        self.assertEqual(stage_target([(10, 20)], 5, start=10), 15)
+
+    def test_keep_alive_pool(self):
+        # Initiation
+        pool = Http_Pool()
+
+        async def requests():
+            results = [await pool.get(*self.target, '/stats') for _ in range(5)]
+            results.append(await pool.get(*self.target, '/missing'))
+            return results
+
+        # Test
+        results = asyncio.run(requests())
+        pool.close()
+
+        # Assertions: one connection for every request
+        self.assertEqual(results[0], (200, b'{"in_flight": 1}'))
+        self.assertEqual(results[-1][0], 404)
+        self.assertEqual(pool.connections_opened, 1)
+
+    def test_stages(self):
+        # Initiation
+        load_generator = Load_Generator(lambda: [self.target], [(0.5, 4), (0.5, 4)],
+                                        think_time=0.05, path='/stats', seed=1)
+
+        # Test
+        records = asyncio.run(load_generator.run(tick=0.05))
+
+        # Assertions
+        self.assertGreater(len(records), 20)
+        self.assertEqual({record.http_req_failed for record in records}, {0})
+        self.assertEqual(max(record.vus for record in records), 4)
+        self.assertLessEqual(load_generator.pool.connections_opened, 4)
+
+    def test_no_ready_pod(self):
+        # Initiation
+        load_generator = Load_Generator(lambda: [], [(0.2, 1)], think_time=0.05)
+
+        # Test
+        records = asyncio.run(load_generator.run(tick=0.05))
+
+        # Assertions
+        self.assertTrue(records)
+        self.assertEqual({record.http_req_failed for record in records}, {1})
+
+    def test_arrival_profiles(self):
+        # Initiation
+        ramp = Open_Loop_Load_Generator(lambda: [], *ramp_rate(0, 20, 2))
+        spiky_stages, base = spiky_rate(10, 100, 30, period=10, spike=1)
+
+        # Assertions: 0 to 20 requests per second over 2 seconds
+        self.assertEqual(len(list(ramp.send_times())), 20)
+        self.assertEqual(stage_target(spiky_stages, 5, base), 10)
+        self.assertEqual(stage_target(spiky_stages, 9.5, base), 100)
+        self.assertEqual(stage_target(spiky_stages, 10.5, base), 10)
+        self.assertIsNone(stage_target(spiky_stages, 31, base))
+        poisson = [list(Open_Loop_Load_Generator(lambda: [], [(5, 10)], 10, poisson=True,
+                                                 seed=3).send_times()) for _ in range(2)]
+        self.assertEqual(poisson[0], poisson[1])
+        self.assertAlmostEqual(len(poisson[0]), 50, delta=20)
+
+    def test_open_loop(self):
+        # Initiation: each answer takes 0.1s, a closed loop VU would send 10/s
+        self.pod.delay = 0.1
+        load_generator = Open_Loop_Load_Generator(lambda: [self.target], [(1, 40)], 40,
+                                                  path='/stats')
+
+        # Test
+        summary = asyncio.run(load_generator.run())
+
+        # Assertions: the offered load did not drop with the latency
+        self.assertEqual(summary['sent'], 40)
+        self.assertEqual(summary['completed'], 40)
+        self.assertGreaterEqual(summary['p50'], 100)
+        self.assertGreater(summary['connections'], 1)
+
+    def test_open_loop_drops(self):
+        # Initiation
+        self.pod.delay = 0.3
+        load_generator = Open_Loop_Load_Generator(lambda: [self.target], [(0.5, 20)], 20,
+                                                  path='/stats', max_in_flight=3)
+
+        # Test
+        summary = asyncio.run(load_generator.run())
+
+        # Assertions
+        self.assertEqual(summary['completed'] + summary['dropped'], summary['sent'])
+        self.assertGreater(summary['dropped'], 0)
+        self.assertEqual(summary['failures'], summary['dropped'])
+
+
+if __name__ == '__main__':
+    unittest.main()
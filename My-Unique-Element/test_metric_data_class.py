@@ -2,9 +2,20 @@ import unittest
 from unittest import skip  # noqa
 
 from custom_exceptions import AlreadyExistsError
+from fake_api_server import Fake_Api_Server
 from metric_data_class import (Metric_Data, Metrics_Collector,
                                Pod_CPU_Collector, Pod_NAME_Collector,
-                               Pod_Datetime_Collector)
+                               Pod_Datetime_Collector, Pod_Metrics_Snapshot)
+
+SAMPLE_METRICS = [
+    {'metadata': {'name': 'pod-1', 'namespace': 'my-app-namespace',
+                  'creationTimestamp': '2024-12-05T21:58:50Z'},
+     'containers': [{'name': 'my-app', 'usage': {'cpu': '50m', 'memory': '25Mi'}}]},
+    {'metadata': {'name': 'pod-2', 'namespace': 'my-app-namespace',
+                  'creationTimestamp': '2024-12-05T21:59:50Z'},
+     'containers': [{'name': 'my-app', 'usage': {'cpu': '30000000n', 'memory': '1Ki'}},
+                    {'name': 'sidecar', 'usage': {'cpu': '5000u', 'memory': '1Ki'}}]},
+]
 
 
 class Test_Metrics_Collector(unittest.TestCase):
@@ -24,13 +35,52 @@ class Test_Metrics_Collector(unittest.TestCase):
                          'my-app-namespace')
 
 
+class Test_Metrics_Collector_Offline(unittest.TestCase):
+    """Tests cls: MetricsCollector against cls: Fake_Api_Server()"""
+
+    def setUp(self):
+        self.server = Fake_Api_Server().start()
+        self.server.cluster.add_deployment('my-app-namespace', 'my-app-deployment',
+                                           3, '30000000n')
+        self.metrics_url = (f"{self.server.url}/apis/metrics.k8s.io/"
+                            "v1beta1/namespaces/my-app-namespace/pods")
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_get_metrics(self):
+        # Initiation
+        mc = Metrics_Collector(self.metrics_url)
+        metrics = mc.get_metrics()
+
+        # Assertions
+        self.assertEqual(len(metrics), 3)
+        self.assertEqual(metrics[0]['metadata']['namespace'], 'my-app-namespace')
+
+    def test_iter_metrics(self):
+        # Initiation
+        mc = Metrics_Collector(self.metrics_url)
+
+        # Assertions
+        self.assertEqual(list(mc.iter_metrics(chunk_size=16)), mc.get_metrics())
+
+    def test_keep_alive_session(self):
+        # Initiation
+        mc = Metrics_Collector(self.metrics_url)
+        other = Metrics_Collector(self.metrics_url)
+
+        # Assertions
+        self.assertIs(mc.session, other.session)
+        self.assertEqual(mc.timeout, 5.0)
+
+
 class Test_Metric_Data(unittest.TestCase, Metric_Data):
     """Tests cls: Pod_CPU_Collector();
     Test CRUD operation on variables.
     """
 
     def setUp(self):
-        super().__init__()
+        Metric_Data.__init__(self)
 
     def test_create_name(self):
         """Test if CRUD operation on var: NAME"""
@@ -76,7 +126,7 @@ class Test_Pod_CPU_Collector(unittest.TestCase, Metric_Data):
                    "v1beta1/namespaces/my-app-namespace/pods")
 
     def setUp(self):
-        super().__init__()
+        Metric_Data.__init__(self)
 
         # Initiation
         mc = Metrics_Collector(self.METRICS_URL)
@@ -138,7 +188,7 @@ class Test_Pod_CPU_Collector(unittest.TestCase, Metric_Data):
 
         # Assertions
         for name, val in cpu_values:
-            self.assertEqual(self.CPU[name], val)
+            self.assertEqual(self.pod_collector.CPU[name], val)
 
     def test_remove(self):
         """Test removing Pod name from dict(): CPU"""
@@ -161,7 +211,7 @@ class Test_Pod_CPU_Collector(unittest.TestCase, Metric_Data):
         # Assertions
         for name, val in cpu_values:
             with self.assertRaises(KeyError):
-                self.CPU[name]
+                self.pod_collector.CPU[name]
 
 
 class Test_Pod_Name_Collector(unittest.TestCase, Metric_Data):
@@ -170,7 +220,7 @@ class Test_Pod_Name_Collector(unittest.TestCase, Metric_Data):
                    "v1beta1/namespaces/my-app-namespace/pods")
 
     def setUp(self):
-        super().__init__()
+        Metric_Data.__init__(self)
 
         # Initiation
         mc = Metrics_Collector(self.METRICS_URL)
@@ -199,13 +249,6 @@ class Test_Pod_Name_Collector(unittest.TestCase, Metric_Data):
 
         name_values = self.pod_collector.get_all()
 
-        # uncomment when running single test only
-        # this is because pod_names are present in
-        # name_value after running previous tests.
-        # Adding pod name and cpu value to dict{}
-        # for ele in name_values:
-        #     self.pod_collector.add(ele)
-
         # Assertions
         self.assertFalse(self.pod_collector.is_present('Sample_Pod'))
 
@@ -217,12 +260,6 @@ class Test_Pod_Name_Collector(unittest.TestCase, Metric_Data):
         """Test removing Pod name from dict(): CPU"""
         name_values = self.pod_collector.get_all()
 
-        # uncomment when running single test only
-        # this is because pod_names are present in
-        # name_value after running previous tests.
-        # for ele in name_values:
-        #     self.pod_collector.add(ele)
-
         # Deleting the pod_name from collection
         name_values = list(name_values)
         self.pod_collector.remove(name_values[0])
@@ -237,7 +274,7 @@ class Test_Pod_Datetime_Collector(unittest.TestCase, Metric_Data):
                    "v1beta1/namespaces/my-app-namespace/pods")
 
     def setUp(self):
-        super().__init__()
+        Metric_Data.__init__(self)
 
         # Initiation
         mc = Metrics_Collector(self.METRICS_URL)
@@ -271,8 +308,8 @@ class Test_Pod_Datetime_Collector(unittest.TestCase, Metric_Data):
 
         # Assertion
         for name, dt in dt_values:
-            self.assertIn(name, self.CREATION_DATETIME)
-            self.assertEqual(dt, self.CREATION_DATETIME.get(name))
+            self.assertIn(name, self.pod_collector.CREATION_DATETIME)
+            self.assertEqual(dt, self.pod_collector.CREATION_DATETIME.get(name))
 
     def test_datetime_raise_pod_exists_exception(self):
         """Test raising an exception if pod name already
@@ -280,11 +317,7 @@ class Test_Pod_Datetime_Collector(unittest.TestCase, Metric_Data):
         dt_values = self.pod_collector.extract(self.metrics)
 
         name, dt = dt_values[0]
-
-        # uncomment when running single test only
-        # this is because pod_names are present in
-        # dt_value after running previous tests.
-        # self.pod_collector.add(name, dt)
+        self.pod_collector.add(name, dt)
 
         # Assertion
         with self.assertRaises(AlreadyExistsError):
@@ -295,12 +328,9 @@ class Test_Pod_Datetime_Collector(unittest.TestCase, Metric_Data):
 
         dt_values = self.pod_collector.extract(self.metrics)
 
-        # uncomment when running single test only
-        # this is because pod_names are present in
-        # name_value after running previous tests.
-        # Adding pod name and cpu value to dict{}
-        # for name, dt in dt_values:
-        #     self.pod_collector.add(name, dt)
+        # Adding pod name and datetime value to dict{}
+        for name, dt in dt_values:
+            self.pod_collector.add(name, dt)
 
         # Assertions
         self.assertFalse(self.pod_collector.is_present('Sample_Pod'))
@@ -313,11 +343,8 @@ class Test_Pod_Datetime_Collector(unittest.TestCase, Metric_Data):
         """Test retrieving Pod's datetime value"""
         dt_values = self.pod_collector.extract(self.metrics)
 
-        # uncomment when running single test only
-        # this is because pod_names are present in
-        # name_value after running previous tests.
-        # for name, dt in dt_values:
-        #     self.pod_collector.add(name, dt)
+        for name, dt in dt_values:
+            self.pod_collector.add(name, dt)
 
         # Assertions
         for name, dt in dt_values:
@@ -328,11 +355,8 @@ class Test_Pod_Datetime_Collector(unittest.TestCase, Metric_Data):
         """Test removing Pod name from dict(): CPU"""
         dt_values = self.pod_collector.extract(self.metrics)
 
-        # uncomment when running single test only
-        # this is because pod_names are present in
-        # name_value after running previous tests.
-        # for name, dt in dt_values:
-        #     self.pod_collector.add(name, dt)
+        for name, dt in dt_values:
+            self.pod_collector.add(name, dt)
 
         # Deleting the pod_name from collection
         name, dt = dt_values[0]
@@ -342,5 +366,60 @@ class Test_Pod_Datetime_Collector(unittest.TestCase, Metric_Data):
         self.assertFalse(self.pod_collector.is_present(name))
 
 
+class Test_Pod_Metrics_Snapshot(unittest.TestCase):
+    """Test Class tests cls: Pod_Metrics_Snapshot()"""
+
+    def setUp(self):
+        self.snapshot = Pod_Metrics_Snapshot.from_metrics(SAMPLE_METRICS, taken_at=0)
+
+    def test_from_metrics(self):
+        pod = self.snapshot.get('pod-2')
+
+        # Assertions
+        self.assertEqual(len(self.snapshot), 2)
+        self.assertEqual(self.snapshot.get('pod-1').cpu, 50)
+        self.assertEqual(self.snapshot.get('pod-1').memory, 25 * 2 ** 20)
+        self.assertEqual(pod.cpu, 35)
+        self.assertEqual(pod.memory, 2048)
+        self.assertEqual(pod.creation_timestamp, '2024-12-05T21:59:50Z')
+        self.assertEqual(self.snapshot.avg_cpu(), 42.5)
+
+    def test_immutable(self):
+        # Assertions
+        with self.assertRaises(AttributeError):
+            self.snapshot.taken_at = 1
+        with self.assertRaises(KeyError):
+            self.snapshot.get('Sample_Pod')
+        with self.assertRaises(TypeError):
+            self.snapshot.cpu[0] = 0
+        with self.assertRaises(TypeError):
+            self.snapshot.memory[0] = 0
+        self.assertEqual(list(self.snapshot.cpu), [50, 35])
+
+    def test_diff(self):
+        # Initiation
+        metrics = [SAMPLE_METRICS[1], {
+            'metadata': {'name': 'pod-3', 'namespace': 'my-app-namespace'},
+            'containers': [{'name': 'my-app', 'usage': {'cpu': '0', 'memory': '0'}}]}]
+        current = Pod_Metrics_Snapshot.from_metrics(metrics, taken_at=1)
+
+        # Test
+        diff = current.diff(self.snapshot)
+
+        # Assertions
+        self.assertEqual(diff.added, {'pod-3'})
+        self.assertEqual(diff.removed, {'pod-1'})
+        self.assertEqual(diff.cpu_delta, {'pod-2': 0})
+
+    def test_collectors_do_not_share_state(self):
+        # Initiation
+        first = Pod_NAME_Collector(SAMPLE_METRICS[:1])
+        second = Pod_NAME_Collector(SAMPLE_METRICS[1:])
+
+        # Assertions
+        self.assertEqual(first.get_all(), {'pod-1'})
+        self.assertEqual(second.get_all(), {'pod-2'})
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,138 @@
+import os
+import tempfile
+import time
+import unittest
+
+from fake_api_server import Fake_Api_Server, Fake_Cluster, Fake_Pod_Server
+from k8s_controller import K8s_Controller
+from kube_client import Kube_Client
+from metric_sources import (Metric_Unavailable, Metrics_Server_Source,
+                            Pod_Stats_Source, make_metric_source)
+from scaling_policy import Policy_Engine, Scaling_Policy
+
+
+class Test_Metric_Sources(unittest.TestCase):
+    """Tests the metric sources against fake Pods on 127.0.0.x"""
+
+    def setUp(self):
+        # Pod i of the fake cluster has the IP 127.0.0.{i + 1}
+        self.server = Fake_Api_Server(Fake_Cluster(pod_ip_prefix='127.0.0.')).start()
+        self.server.cluster.add_deployment('stats-ns', 'my-app-deployment', 4, '120m')
+        fd, self.config_file = tempfile.mkstemp()
+        os.close(fd)
+        self.server.write_kubeconfig(self.config_file)
+        self.k8s_controller = K8s_Controller(Kube_Client(self.config_file))
+
+        # Same port on every Pod IP, like the containerPort of the app
+        self.pods = [Fake_Pod_Server('127.0.0.1', stats={'in_flight': 0, 'rps': 1.5}).start()]
+        self.port = self.pods[0].port
+        self.pods += [Fake_Pod_Server(f'127.0.0.{i + 1}', self.port,
+                                      stats={'in_flight': i * 2, 'rps': 1.5}).start()
+                      for i in range(1, 4)]
+
+    def tearDown(self):
+        for pod in self.pods:
+            pod.stop()
+        self.server.stop()
+        os.remove(self.config_file)
+
+    def test_running_pod_ips(self):
+        # Assertions
+        self.assertEqual(self.k8s_controller.running_pod_ips('stats-ns'),
+                         ['127.0.0.1', '127.0.0.2', '127.0.0.3', '127.0.0.4'])
+
+    def test_pod_stats_source(self):
+        # Initiation
+        source = make_metric_source('pod-stats', self.k8s_controller, port=self.port)
+
+        # Assertions: in flight 0, 2, 4 and 6
+        self.assertEqual(source.read('stats-ns'), 3.0)
+        source.field = 'rps'
+        self.assertEqual(source.read('stats-ns'), 1.5)
+        source.close()
+
+    def test_concurrent_scrape(self):
+        # Initiation
+        for pod in self.pods:
+            pod.delay = 0.3
+        source = Pod_Stats_Source(self.k8s_controller, port=self.port)
+
+        # Test
+        started = time.perf_counter()
+        stats = source.scrape('stats-ns')
+        elapsed = time.perf_counter() - started
+
+        # Assertions: one round trip, not four
+        self.assertEqual(len(stats), 4)
+        self.assertLess(elapsed, 0.9)
+        source.close()
+
+    def test_unreachable_pods(self):
+        # Initiation
+        self.pods[1].stop()
+        self.pods[3].stats = {'rps': 0.0}
+        source = Pod_Stats_Source(self.k8s_controller, port=self.port, timeout=0.2,
+                                  max_failed_fraction=0.25)
+
+        # Test
+        value = source.read('stats-ns')
+
+        # Assertions: Pods 0 and 2 report 0 and 4 in flight, Pod 1 counts as 4
+        self.assertAlmostEqual(value, 8 / 3)
+        self.assertEqual(source.error_count, 1)
+        for pod in self.pods[::2]:
+            pod.stats = {}
+        with self.assertRaises(Metric_Unavailable):
+            source.read('stats-ns')
+        source.close()
+
+    def test_timed_out_pods(self):
+        # Initiation: the busiest Pod is too slow to answer
+        self.pods[3].delay = 0.5
+        strict = Pod_Stats_Source(self.k8s_controller, port=self.port, timeout=0.2)
+        tolerant = Pod_Stats_Source(self.k8s_controller, port=self.port, timeout=0.2,
+                                    max_failed_fraction=0.25)
+
+        # Assertions: 1 of 4 Pods failed, above 10%, or counted as the busiest Pod
+        with self.assertRaises(Metric_Unavailable):
+            strict.read('stats-ns')
+        self.assertEqual(tolerant.read('stats-ns'), (0 + 2 + 4 + 4) / 4)
+        strict.close()
+        tolerant.close()
+
+    def test_scale_on_in_flight(self):
+        # Initiation
+        source = Pod_Stats_Source(self.k8s_controller, port=self.port)
+        engine = Policy_Engine(Scaling_Policy(target_cpu=1, scale_up_max_pods=100))
+
+        # Test: 3 requests in flight per Pod, 1 wanted
+        desired = engine.decide(0, self.k8s_controller.pod_count('stats-ns'),
+                                source.read('stats-ns'))
+
+        # Assertions
+        self.assertEqual(desired, 12)
+        source.close()
+
+    def test_metrics_server_source(self):
+        # Initiation
+        source = Metrics_Server_Source(self.k8s_controller)
+        windowed = Metrics_Server_Source(self.k8s_controller, window=30)
+
+        # Assertions
+        self.assertEqual(source.read('stats-ns'), 120)
+        self.assertAlmostEqual(windowed.read('stats-ns'), 120)
+        with self.assertRaises(ValueError):
+            make_metric_source('prometheus', self.k8s_controller)
+
+    def test_metrics_server_no_pods(self):
+        # Initiation
+        self.server.cluster.set_pods('stats-ns', 'my-app-deployment', 0)
+
+        # Assertions: no Pod is not a division by zero
+        self.assertIsNone(self.k8s_controller.pod_cpu_usage('stats-ns'))
+        with self.assertRaises(Metric_Unavailable):
+            Metrics_Server_Source(self.k8s_controller).read('stats-ns')
+
+
+if __name__ == '__main__':
+    unittest.main()
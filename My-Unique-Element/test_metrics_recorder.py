@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+
+from openpyxl import load_workbook
+
+from metrics_recorder import Metrics_Recorder
+
+
+class Fake_Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Test_Metrics_Recorder(unittest.TestCase):
+    """Tests the append-only recorder of the monitor scripts"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.columns = ["Count", "Datetime", "Pod Count", "CPU Usage (%)"]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_csv_round_trip(self):
+        # Initiation
+        with Metrics_Recorder(self.path('metrics.csv'), self.columns) as recorder:
+            # Test
+            recorder.append([1, '2025-01-01T00:00:00', 2, 48.5])
+            recorder.append({'Count': 2, 'Pod Count': 3, 'CPU Usage (%)': 51})
+
+            # Assertions
+            self.assertEqual(list(recorder.rows()), [['1', '2025-01-01T00:00:00', '2', '48.5'],
+                                                     ['2', '', '3', '51']])
+            self.assertEqual(recorder.row_count, 2)
+
+    def test_ndjson_round_trip(self):
+        # Initiation
+        with Metrics_Recorder(self.path('metrics.ndjson'), self.columns) as recorder:
+            # Test
+            recorder.append([1, '2025-01-01T00:00:00', 2, 48.5])
+
+            # Assertions
+            self.assertEqual(recorder.file_format, 'ndjson')
+            self.assertEqual(list(recorder.rows()), [[1, '2025-01-01T00:00:00', 2, 48.5]])
+
+    def test_batched_sync(self):
+        # Initiation
+        clock = Fake_Clock()
+        recorder = Metrics_Recorder(self.path('metrics.csv'), self.columns,
+                                    flush_rows=10, fsync_interval=5.0, clock=clock)
+
+        # Test: 25 rows within the interval
+        for count in range(25):
+            recorder.append([count, '', 1, 10])
+
+        # Assertions
+        self.assertEqual(recorder.sync_count, 2)
+        clock.now = 6.0
+        recorder.append([25, '', 1, 10])
+        self.assertEqual(recorder.sync_count, 3)
+        recorder.close()
+        self.assertEqual(recorder.sync_count, 4)
+
+    def test_append_to_existing_file(self):
+        # Initiation
+        with Metrics_Recorder(self.path('metrics.csv'), self.columns) as recorder:
+            recorder.append([1, '', 2, 50])
+
+        # Test: restarted monitor
+        with Metrics_Recorder(self.path('metrics.csv'), self.columns, append=True) as recorder:
+            recorder.append([2, '', 3, 60])
+
+            # Assertions
+            self.assertEqual(len(list(recorder.rows())), 2)
+        with open(self.path('metrics.csv')) as file:
+            self.assertEqual(file.read().count('Datetime'), 1)
+
+    def test_new_run_truncates(self):
+        # Initiation
+        with Metrics_Recorder(self.path('metrics.csv'), self.columns) as recorder:
+            recorder.append([1, '', 2, 50])
+
+        # Test: second monitor run
+        with Metrics_Recorder(self.path('metrics.csv'), self.columns) as recorder:
+            recorder.append([1, '', 3, 60])
+
+            # Assertions
+            self.assertEqual(list(recorder.rows()), [['1', '', '3', '60']])
+
+    def test_append_header_mismatch(self):
+        # Initiation
+        for name in ('metrics.csv', 'metrics.ndjson'):
+            with Metrics_Recorder(self.path(name), self.columns) as recorder:
+                recorder.append([1, '', 2, 50])
+
+            # Assertions
+            with self.assertRaises(ValueError):
+                Metrics_Recorder(self.path(name), self.columns + ['Revised Replica Count'],
+                                 append=True)
+
+    def test_export_excel(self):
+        # Initiation
+        recorder = Metrics_Recorder(self.path('metrics.csv'), self.columns)
+        recorder.append([1, '2025-01-01T00:00:00', 2, 48.5])
+        recorder.append([2, '2025-01-01T00:00:01', 3, 51])
+
+        # Test
+        count = recorder.export_excel(self.path('metrics.xlsx'), 'K8s Pod Metrics')
+        recorder.close()
+
+        # Assertions
+        self.assertEqual(count, 2)
+        sheet = load_workbook(self.path('metrics.xlsx'))['K8s Pod Metrics']
+        rows = list(sheet.values)
+        self.assertEqual(list(rows[0]), self.columns)
+        self.assertEqual(list(rows[2]), [2, '2025-01-01T00:00:01', 3, 51])
+        self.assertEqual(sheet['A1'].alignment.horizontal, 'center')
+
+    def test_unknown_format(self):
+        # Assertions
+        with self.assertRaises(ValueError):
+            Metrics_Recorder(self.path('metrics.txt'), self.columns, file_format='xlsx')
+
+
+if __name__ == '__main__':
+    unittest.main()
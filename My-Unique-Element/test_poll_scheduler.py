@@ -0,0 +1,135 @@
+import threading
+import time
+import unittest
+
+from kubernetes import client
+
+from poll_scheduler import Poll_Scheduler
+
+
+class Fake_Clock:
+    """Manual clock, sleep() and work just move the time forward."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class Test_Poll_Scheduler(unittest.TestCase):
+    """Tests cls: Poll_Scheduler() on a fake clock."""
+
+    def setUp(self):
+        self.clock = Fake_Clock()
+
+    def scheduler(self, **kwargs) -> Poll_Scheduler:
+        return Poll_Scheduler(clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    def test_work_time_subtracted(self):
+        # Initiation
+        scheduler = self.scheduler(min_interval=2, max_interval=2)
+        starts = []
+
+        def tick():
+            starts.append(self.clock.now)
+            self.clock.now += 0.5  # Work
+            return 50
+
+        # Test
+        scheduler.run(tick, max_ticks=5)
+
+        # Assertions: no drift, the 0.5s of work is part of the 2s
+        self.assertEqual(starts, [100, 102, 104, 106, 108])
+        self.assertEqual(self.clock.sleeps, [1.5] * 4)
+        self.assertEqual(scheduler.missed_deadlines, 0)
+        self.assertEqual(scheduler.max_lag, 0)
+        self.assertAlmostEqual(scheduler.metrics()['mean_work_time'], 0.5)
+
+    def test_missed_deadline(self):
+        # Initiation
+        scheduler = self.scheduler(min_interval=1, max_interval=1)
+        work = iter([3.0, 0.2, 0.2])
+
+        def tick():
+            self.clock.now += next(work)
+            return None
+
+        # Test
+        scheduler.run(tick, max_ticks=3)
+
+        # Assertions: the late tick runs at once, no burst of catch up ticks
+        self.assertEqual(scheduler.missed_deadlines, 1)
+        self.assertEqual(len(self.clock.sleeps), 1)
+        self.assertAlmostEqual(self.clock.sleeps[0], 0.8)
+        self.assertEqual(scheduler.tick_count, 3)
+
+    def test_adaptive_interval(self):
+        # Initiation
+        scheduler = self.scheduler(min_interval=1, max_interval=8, relax_factor=2)
+
+        # Test
+        steady = [scheduler.adapt(50) for _ in range(6)]
+        fast = scheduler.adapt(80)
+        moderate = scheduler.adapt(85)
+
+        # Assertions
+        self.assertEqual(steady, [1, 2, 4, 8, 8, 8])
+        self.assertEqual(fast, 1)
+        self.assertEqual(moderate, 1)
+        self.assertEqual(scheduler.adapt(None), 1)
+
+    def test_error_backoff(self):
+        # Initiation
+        scheduler = self.scheduler(min_interval=1, backoff_base=1, max_backoff=5)
+        results = iter([client.exceptions.ApiException(status=500)] * 4 + [50, 50])
+
+        def tick():
+            result = next(results)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        # Test
+        scheduler.run(tick, max_ticks=6)
+
+        # Assertions
+        self.assertEqual(self.clock.sleeps, [1, 2, 4, 5, 1])
+        self.assertEqual(scheduler.error_count, 4)
+        self.assertEqual(scheduler.consecutive_errors, 0)
+
+    def test_other_errors_raised(self):
+        scheduler = self.scheduler()
+
+        def tick():
+            raise KeyError('bug')
+
+        # Assertions: bugs are not retried, a division by zero neither
+        with self.assertRaises(KeyError):
+            scheduler.run(tick)
+        with self.assertRaises(ZeroDivisionError):
+            scheduler.run(lambda: 1 // 0)
+
+    def test_stop_interrupts_sleep(self):
+        # Initiation
+        scheduler = Poll_Scheduler(min_interval=30, max_interval=30)
+        thread = threading.Thread(target=scheduler.run, args=(lambda: 1,))
+        thread.start()
+
+        # Test
+        time.sleep(0.1)
+        scheduler.stop()
+        thread.join(timeout=2)
+
+        # Assertions
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(scheduler.tick_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
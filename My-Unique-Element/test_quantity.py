@@ -0,0 +1,95 @@
+import unittest
+
+import numpy as np
+
+from benchmark_quantity import (controller_average, legacy_controller_average, make_payload,
+                                per_string_pod_usage)
+from quantity import (container_cpu, cpu_to_millicores, memory_to_bytes, parse_quantity,
+                      parse_quantities, parse_pod_metrics)
+
+
+class Test_Quantity(unittest.TestCase):
+    """Tests the Kubernetes quantity grammar."""
+
+    def test_cpu_to_millicores(self):
+        # Assertions
+        self.assertAlmostEqual(cpu_to_millicores('30000000n'), 30)
+        self.assertAlmostEqual(cpu_to_millicores('5000u'), 5)
+        self.assertEqual(cpu_to_millicores('250m'), 250)
+        self.assertEqual(cpu_to_millicores('2'), 2000)
+        self.assertEqual(cpu_to_millicores('0.5'), 500)
+        self.assertEqual(cpu_to_millicores(1), 1000)
+
+    def test_memory_to_bytes(self):
+        # Assertions
+        self.assertEqual(memory_to_bytes('25Mi'), 25 * 2 ** 20)
+        self.assertEqual(memory_to_bytes('1.5Gi'), 3 * 2 ** 29)
+        self.assertEqual(memory_to_bytes('128974848'), 128974848)
+        self.assertEqual(memory_to_bytes('129M'), 129_000_000)
+        self.assertEqual(memory_to_bytes('123Ki'), 123 * 1024)
+
+    def test_exponent_and_sign(self):
+        # Assertions
+        self.assertEqual(parse_quantity('1e3'), 1000)
+        self.assertEqual(parse_quantity('12E-1'), 1.2)
+        self.assertEqual(parse_quantity('2E'), 2e18)
+        self.assertEqual(parse_quantity('-.5k'), -500)
+        self.assertEqual(parse_quantity('+1Ki'), 1024)
+
+    def test_invalid_quantity(self):
+        for value in ('', 'm', '1.2.3', '5mi', '1e3m', 'abc', '1 Ki'):
+            with self.assertRaises(ValueError):
+                parse_quantity(value)
+            with self.assertRaises(ValueError):
+                parse_quantities([value])
+
+    def test_parse_quantities(self):
+        values = parse_quantities(['30000000n', '250m', '1', '1e3'], 1_000)
+
+        # Assertions
+        np.testing.assert_allclose(values, [30, 250, 1000, 1_000_000])
+
+    def test_parse_quantities_fast_paths(self):
+        # Assertions: one suffix, mixed suffixes, then the slow path
+        np.testing.assert_allclose(parse_quantities(['1Ki', '2Ki', '3Ki']), [1024, 2048, 3072])
+        np.testing.assert_allclose(parse_quantities(['7', '8']), [7, 8])
+        np.testing.assert_allclose(parse_quantities(['250m', '2', '5000u', '1Mi'], 1_000),
+                                   [250, 2000, 5, 2 ** 20 * 1_000])
+        np.testing.assert_allclose(parse_quantities(['1E', '1e3', '0.5', 2], 1_000),
+                                   [1e21, 1e6, 500, 2000])
+        self.assertEqual(len(parse_quantities([])), 0)
+        with self.assertRaises(ValueError):
+            parse_quantities(['2', '1 2'])
+
+    def test_parse_pod_metrics(self):
+        # Initiation
+        items = make_payload(100, containers=2)
+
+        # Test
+        usage = parse_pod_metrics(items)
+
+        # Assertions
+        names, cpu, memory = per_string_pod_usage(items)
+        self.assertEqual(usage.names, names)
+        np.testing.assert_allclose(usage.cpu, cpu)
+        np.testing.assert_array_equal(usage.memory, memory)
+
+    def test_container_cpu(self):
+        # Initiation
+        items = make_payload(100, containers=2)
+
+        # Assertions: the same average as the old controller loop
+        self.assertEqual(len(container_cpu(items)), 200)
+        self.assertAlmostEqual(controller_average(items), legacy_controller_average(items))
+        self.assertEqual(len(container_cpu([])), 0)
+
+    def test_parse_empty_pod_metrics(self):
+        usage = parse_pod_metrics([])
+
+        # Assertions
+        self.assertEqual(len(usage.cpu), 0)
+        self.assertEqual(len(usage.memory), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from kubernetes.client.exceptions import ApiException
+
+from fake_api_server import Fake_Api_Server
+from k8s_controller import K8s_Controller
+from kube_client import Kube_Client
+from metric_sources import Metrics_Server_Source
+from scaling_loop import Scaling_Loop
+from scaling_policy import Policy_Engine, Scaling_Policy
+
+
+class Test_Scaling_Loop(unittest.TestCase):
+    """Tests the shared scaling tick against cls: Fake_Api_Server()"""
+
+    def setUp(self):
+        self.server = Fake_Api_Server().start()
+        self.cluster = self.server.cluster
+        self.cluster.add_deployment('my-app-namespace', 'my-app-deployment', 2, '100m')
+
+        fd, self.config_file = tempfile.mkstemp()
+        os.close(fd)
+        self.server.write_kubeconfig(self.config_file)
+        self.kube_client = Kube_Client(self.config_file)
+        k8s_controller = self.k8s_controller = K8s_Controller(self.kube_client)
+        self.scaling_loop = Scaling_Loop(
+            k8s_controller, Metrics_Server_Source(k8s_controller),
+            Policy_Engine(Scaling_Policy(target_cpu=50, scale_down_stabilization=60)),
+            'my-app-namespace', keep_decisions=True)
+
+    def tearDown(self):
+        self.server.stop()
+        os.remove(self.config_file)
+
+    def test_scale_up_patched_once(self):
+        # Test: the new Pods stay Pending over three ticks
+        self.cluster.set_pods('my-app-namespace', 'my-app-deployment', 2)
+        metric_values = [self.scaling_loop.tick() for _ in range(3)]
+
+        # Assertions
+        self.assertEqual(metric_values, [100, 100, 100])
+        self.assertEqual(self.cluster.replicas('my-app-namespace', 'my-app-deployment'), 4)
+        self.assertEqual([decision.patched for decision in self.scaling_loop.decisions],
+                         [4, None, None])
+        self.assertEqual(self.scaling_loop.decisions[1].reason, 'in flight')
+        self.assertEqual(self.scaling_loop.scale_count, 1)
+        self.assertEqual(self.scaling_loop.deployment_name, 'my-app-deployment')
+
+    def test_refresh_without_pod_metrics(self):
+        # Initiation: a source which does not call pod_cpu_usage()
+        self.scaling_loop.metric_source = mock.Mock(**{'read.return_value': 50})
+        core_v1 = self.k8s_controller.core_v1
+
+        # Test: the API server rejected the credentials
+        self.kube_client.handle_api_exception(ApiException(status=401))
+        self.scaling_loop.tick()
+
+        # Assertions
+        self.assertEqual(self.kube_client.load_count, 2)
+        self.assertIsNot(self.k8s_controller.core_v1, core_v1)
+        self.assertIs(self.k8s_controller.apps_v1.api_client, self.kube_client.get())
+
+
+if __name__ == '__main__':
+    unittest.main()
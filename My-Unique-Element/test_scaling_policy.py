@@ -0,0 +1,170 @@
+import json
+import os
+import tempfile
+import unittest
+
+from scaling_policy import Policy_Engine, Scaling_Policy, load_policies
+
+
+def replay(engine: Policy_Engine, metric_values: list, replicas: int = 1,
+           step: float = 1.0) -> list:
+    """Feed one metric value per `step` seconds and apply every decision."""
+    history = []
+    for i, value in enumerate(metric_values):
+        desired = engine.decide(i * step, replicas, value)
+        if desired != replicas:
+            engine.commit(i * step, desired)
+        replicas = desired
+        history.append(replicas)
+    return history
+
+
+class Test_Policy_Engine(unittest.TestCase):
+    """Drives cls: Policy_Engine() with synthetic metric streams."""
+
+    def test_tolerance_band(self):
+        # Initiation
+        engine = Policy_Engine(Scaling_Policy(target_cpu=50, tolerance=0.1))
+
+        # Assertions
+        self.assertEqual(engine.decide(0, 4, 54), 4)
+        self.assertEqual(engine.last_reason, 'within tolerance')
+        self.assertEqual(engine.decide(1, 4, 46), 4)
+        self.assertEqual(engine.decide(2, 4, 60), 5)
+
+    def test_no_flapping_on_noisy_load(self):
+        # Initiation
+        policy = Scaling_Policy(target_cpu=50, scale_down_stabilization=30)
+        noisy = [60, 40, 70, 35, 65, 30, 75, 40] * 5
+
+        # Test
+        history = replay(Policy_Engine(policy), noisy, replicas=4)
+
+        # Assertions: only scale ups, never back down inside the window
+        self.assertEqual(history, sorted(history))
+
+    def test_scale_down_stabilization(self):
+        # Initiation
+        policy = Scaling_Policy(target_cpu=50, scale_down_stabilization=10)
+        engine = Policy_Engine(policy)
+        engine.decide(0, 4, 50)
+
+        # Test
+        held = [engine.decide(t, 4, 10) for t in range(1, 10)]
+        released = engine.decide(11, 4, 10)
+
+        # Assertions
+        self.assertEqual(held, [4] * 9)
+        self.assertEqual(released, 1)
+
+    def test_scale_up_stabilization(self):
+        # Initiation
+        engine = Policy_Engine(Scaling_Policy(target_cpu=50, scale_up_stabilization=3))
+
+        # Test
+        history = replay(engine, [50, 200, 200, 200, 200], replicas=2)
+
+        # Assertions: 8 recommended, +4 pods allowed per period
+        self.assertEqual(history, [2, 2, 2, 2, 6])
+
+    def test_scale_up_rate_limit(self):
+        # Initiation
+        policy = Scaling_Policy(target_cpu=10, scale_up_max_pods=2,
+                                scale_up_max_percent=50, scale_up_period=10)
+        engine = Policy_Engine(policy)
+
+        # Test
+        first = engine.decide(0, 2, 100)
+        engine.commit(0, first)
+        within_period = engine.decide(5, first, 100)
+        next_period = engine.decide(11, within_period, 100)
+
+        # Assertions
+        self.assertEqual(first, 4)
+        self.assertEqual(within_period, 4)
+        self.assertEqual(engine.last_reason, 'rate limit')
+        self.assertEqual(next_period, 6)
+
+    def test_scale_down_rate_limit(self):
+        # Initiation
+        policy = Scaling_Policy(target_cpu=50, scale_down_stabilization=0,
+                                scale_down_max_percent=50, scale_down_period=10)
+        engine = Policy_Engine(policy)
+
+        # Test
+        first = engine.decide(0, 10, 1)
+        engine.commit(0, first)
+        within_period = engine.decide(1, first, 1)
+        next_period = engine.decide(11, within_period, 1)
+
+        # Assertions
+        self.assertEqual(first, 5)
+        self.assertEqual(within_period, 5)
+        self.assertEqual(next_period, 3)
+
+    def test_lagging_running_pods(self):
+        # Initiation: the new pods stay Pending for the whole test
+        policy = Scaling_Policy(target_cpu=50, scale_up_max_pods=4,
+                                scale_down_stabilization=60)
+        engine = Policy_Engine(policy)
+
+        # Test: patch only when spec.replicas changes, like scale_replicas()
+        history = []
+        for t in range(8):
+            desired = engine.decide(t, 2, 100)
+            if desired != engine.applied_replicas:
+                engine.commit(t, desired)
+            history.append(desired)
+
+        # Assertions: the one scale up is not counted again on each tick
+        self.assertEqual(history, [4] * 8)
+        self.assertEqual(len(engine._events), 1)
+
+        # A capped patch counts as what was applied
+        capped = Policy_Engine(Scaling_Policy(target_cpu=10, scale_up_max_pods=4,
+                                              scale_up_period=10))
+        capped.decide(0, 2, 100)
+        capped.commit(0, 3)
+        self.assertEqual(capped.decide(1, 2, 100), 6)
+
+    def test_bounds(self):
+        # Initiation
+        policy = Scaling_Policy(target_cpu=50, min_replicas=2, max_replicas=5,
+                                scale_down_stabilization=0)
+
+        # Assertions
+        self.assertEqual(Policy_Engine(policy).decide(0, 3, 500), 5)
+        self.assertEqual(Policy_Engine(policy).decide(0, 3, 1), 2)
+        self.assertEqual(Policy_Engine(policy).decide(0, 0, 0), 2)
+        with self.assertRaises(ValueError):
+            Scaling_Policy(min_replicas=3, max_replicas=2)
+
+    def test_deterministic(self):
+        # Initiation
+        stream = [10, 80, 120, 300, 250, 90, 20, 5, 5, 5] * 3
+        policy = Scaling_Policy(target_cpu=50, scale_down_stabilization=5)
+
+        # Assertions
+        self.assertEqual(replay(Policy_Engine(policy), stream),
+                         replay(Policy_Engine(policy), stream))
+
+    def test_load_policies(self):
+        # Initiation
+        values = {'my-app-namespace/my-app-deployment': {'target_cpu': 40, 'max_replicas': 8}}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'policies.json')
+            with open(path, 'w') as file:
+                json.dump(values, file)
+
+            # Test
+            policies = load_policies(path)
+
+        # Assertions
+        policy = policies['my-app-namespace/my-app-deployment']
+        self.assertEqual(policy.target_cpu, 40)
+        self.assertEqual(policy.max_replicas, 8)
+        self.assertEqual(policy.min_replicas, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import unittest
+
+import numpy as np
+
+from controller_metrics import DECISIONS
+from scaling_policy import Scaling_Policy
+from scaling_simulator import load_arrivals, simulate, stage_arrivals
+
+METRICS_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           '..', 'Testing', 'metrics_logs.json')
+
+
+class Test_Scaling_Simulator(unittest.TestCase):
+    """Runs the real controller logic against the simulated Deployment."""
+
+    # 60s ramp to 8 requests/s, held for 60s, then back to 1 request/s
+    STAGES = [(60, 8), (60, 8), (30, 1)]
+
+    def test_stage_arrivals(self):
+        # Initiation
+        arrivals = stage_arrivals([(100, 10)], seed=1)
+
+        # Assertions: ~500 requests, more in the second half of the ramp
+        self.assertTrue(np.all(np.diff(arrivals) >= 0))
+        self.assertAlmostEqual(len(arrivals), 500, delta=75)
+        self.assertGreater((arrivals >= 50).sum(), 2 * (arrivals < 50).sum())
+
+    def test_scales_with_load(self):
+        # Initiation
+        arrivals = stage_arrivals(self.STAGES, seed=2)
+
+        # Test
+        result = simulate(arrivals, startup_time=5, cooldown=30,
+                          policy=Scaling_Policy(scale_down_stabilization=10))
+        summary = result.summary()
+
+        # Assertions: ~6 Pods of 100m serve 8 requests/s of 0.75s each
+        self.assertEqual(summary['requests'], len(arrivals))
+        self.assertGreaterEqual(summary['max_replicas'], 6)
+        self.assertGreater(summary['scale_events'], 2)
+        self.assertLess(summary['failure_rate'], 0.05)
+        self.assertLessEqual(summary['p50_ms'], summary['p95_ms'])
+        self.assertLessEqual(summary['p95_ms'], summary['p99_ms'])
+        # Scaled back down during the cooldown
+        self.assertLess(result.timeline[-1][2], summary['max_replicas'])
+
+    def test_startup_delay(self):
+        # Initiation
+        arrivals = stage_arrivals(self.STAGES[:1], seed=3)
+
+        # Test
+        fast = simulate(arrivals, startup_time=1).summary()
+        slow = simulate(arrivals, startup_time=30).summary()
+
+        # Assertions
+        self.assertGreater(slow['p95_ms'], fast['p95_ms'])
+
+    def test_controller_tick(self):
+        # Initiation
+        arrivals = stage_arrivals(self.STAGES[:1], seed=5)
+
+        # Test: Pods start slower than the load grows
+        simulate(arrivals, startup_time=20, namespace='sim-tick-ns')
+
+        # Assertions: the Pending Pods were held as in flight by cap_scale_up()
+        self.assertGreater(DECISIONS.labels('sim-tick-ns', 'hold', 'in flight').value, 0)
+        self.assertGreater(DECISIONS.labels('sim-tick-ns', 'scale_up', 'metric').value, 0)
+
+    def test_reproducible(self):
+        # Initiation
+        arrivals = stage_arrivals(self.STAGES, seed=4)
+
+        # Assertions
+        self.assertEqual(simulate(arrivals, seed=7).summary(),
+                         simulate(arrivals, seed=7).summary())
+
+    def test_load_arrivals(self):
+        # Test
+        arrivals = load_arrivals(METRICS_LOG, 'http://127.0.0.1:7080/')
+
+        # Assertions
+        self.assertEqual(len(arrivals), 1137)
+        self.assertEqual(arrivals[0], 0)
+        self.assertTrue(np.all(np.diff(arrivals) >= 0))
+        self.assertEqual(len(load_arrivals(METRICS_LOG, 'http://unknown/')), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
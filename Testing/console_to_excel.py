@@ -1,60 +1,113 @@
+import argparse
 import json
+import os
+import re
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from multiprocessing import Pool
+
+import numpy as np
 import openpyxl
 import pytz
-from datetime import datetime
 
-# Function to read the JSON-like log entries and extract relevant data
-def extract_metrics_from_log(log_file):
-    metrics_list = []
+# JSON part of a k6 console line: INFO[0006] {...}  source=console
+K6_LINE = re.compile(r'^INFO\[\d+\]\s+(\{.*\})')
+
+HEADERS = ['URL', 'Timestamp', 'VUs', 'Iterations', 'HTTP Request Duration',
+           'HTTP Request Waiting', 'HTTP Request Failed',
+           'Iteration Duration', 'HTTP Requests']
+
+# Rows of one worksheet, the last one is the header (Excel limit: 1,048,576)
+MAX_SHEET_ROWS = 1_048_575
+
+
+@lru_cache(maxsize=None)
+def get_timezone(name):
+    return pytz.timezone(name)
 
-    with open(log_file, 'r') as file:
+
+def iter_log_lines(log_file, start=0, end=None):
+    """
+    Yield the lines of the byte range [start, end) of the log file. A
+    range starting inside a line skips it, a range ending inside a line
+    reads it to the end, so adjacent ranges yield every line once.
+    """
+    with open(log_file, 'rb') as file:
+        if start:
+            # Skip the rest of the line before start, nothing when start
+            # is the first byte of a line
+            file.seek(start - 1)
+            file.readline()
+        position = file.tell()
         for line in file:
-            try:
-                # Check if the line contains valid JSON
-                if line.strip().startswith('INFO'):
-                    # Extract the JSON part of the line
-                    start_idx = line.find('{')
-                    end_idx = line.rfind('}') + 1
-                    json_data = line[start_idx:end_idx]
-
-                    # Parse the JSON data
-                    metrics = json.loads(json_data)
-                    metrics_list.append(metrics)
-            except Exception as e:
-                print(f"Error parsing line: {line}. Error: {e}")
-
-    return metrics_list
+            if end is not None and position >= end:
+                break
+            position += len(line)
+            yield line.decode('utf-8', errors='replace')
+
+
+# Function to read the JSON-like log entries and extract relevant data
+def extract_metrics_from_log(log_file, start=0, end=None, errors=None):
+    """
+    Yield the metrics dict of every k6 console line, in constant memory.
+
+    :param errors: List collecting the lines that could not be parsed.
+    """
+    match_line = K6_LINE.match
+    loads = json.loads
+    for line in iter_log_lines(log_file, start, end):
+        match = match_line(line)
+        if not match:
+            continue
+        try:
+            yield loads(match.group(1))
+        except ValueError:
+            if errors is not None:
+                errors.append(line)
+
 
 def convert_dub_datetime(dt):
     utc_time = datetime.strptime(dt, '%Y-%m-%dT%H:%M:%S.%fZ')
-    utc_zone = pytz.utc
-    utc_time = utc_zone.localize(utc_time)
-    dublin_zone = pytz.timezone('Europe/Dublin')
-    dublin_time = utc_time.astimezone(dublin_zone)
+    utc_time = pytz.utc.localize(utc_time)
+    dublin_time = utc_time.astimezone(get_timezone('Europe/Dublin'))
     return dublin_time.strftime('%Y-%m-%dT%H:%M:%S')
 
-# Function to save extracted metrics to an Excel file
-def save_metrics_to_excel(metrics_data, output_file):
-    # Create a new workbook and select the active worksheet
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Metrics"
-
-    # Write headers
-    headers = ['URL', 'Timestamp', 'VUs', 'Iterations', 'HTTP Request Duration',
-               'HTTP Request Waiting', 'HTTP Request Failed',
-               'Iteration Duration', 'HTTP Requests']
-    ws.append(headers)
-
-    # Write the metrics data to the Excel sheet
-    for metrics in metrics_data:
-        datetime = convert_dub_datetime(metrics.get('timestamp'))
-
-        url = metrics.get('url'),
-        url = 'Real-Time-HPA' if url[0] == 'http://127.0.0.1:7080/' else 'HPA'
-        ws.append([
+
+def convert_dub_datetimes(timestamps, zone='Europe/Dublin'):
+    """
+    Vectorized convert_dub_datetime() of a batch of k6 timestamps: the
+    UTC offset is looked up once per distinct hour of the batch.
+    """
+    utc = np.array([timestamp.rstrip('Z') for timestamp in timestamps], dtype='datetime64[ms]')
+    hours, inverse = np.unique(utc.astype('datetime64[h]'), return_inverse=True)
+    timezone = get_timezone(zone)
+    offsets = np.array([pytz.utc.localize(hour.astype(datetime)).astimezone(timezone)
+                        .utcoffset().total_seconds() for hour in hours],
+                       dtype=np.int64).astype('timedelta64[s]')
+    local = utc.astype('datetime64[s]') + offsets[inverse.reshape(-1)]
+    return np.datetime_as_string(local, unit='s').tolist()
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def metrics_to_rows(metrics_batch):
+    """:return: Excel rows of a batch of metrics dicts."""
+    datetimes = convert_dub_datetimes([metrics.get('timestamp') for metrics in metrics_batch])
+    rows = []
+    for metrics, dublin_time in zip(metrics_batch, datetimes):
+        url = 'Real-Time-HPA' if metrics.get('url') == 'http://127.0.0.1:7080/' else 'HPA'
+        rows.append([
             url,
-            datetime,
+            dublin_time,
             metrics.get('vus', ''),
             metrics.get('iterations', ''),
             metrics.get('http_req_duration', ''),
@@ -63,20 +116,107 @@ def save_metrics_to_excel(metrics_data, output_file):
             metrics.get('iteration_duration', ''),
             metrics.get('http_reqs', '')
         ])
+    return rows
+
+
+def iter_rows(log_file, batch_size=50_000, start=0, end=None, errors=None):
+    """Yield batches of Excel rows of the log file."""
+    metrics = extract_metrics_from_log(log_file, start, end, errors)
+    for metrics_batch in batched(metrics, batch_size):
+        yield metrics_to_rows(metrics_batch)
+
+
+def _chunk_rows(chunk):
+    """:return: (rows, number of lines not parsed, first of them or None)"""
+    log_file, start, end = chunk
+    errors = []
+    rows = [row for rows in iter_rows(log_file, start=start, end=end, errors=errors)
+            for row in rows]
+    return rows, len(errors), errors[0] if errors else None
+
+
+def iter_rows_parallel(log_file, workers=None, chunk_bytes=32 << 20, errors=None):
+    """
+    Yield batches of Excel rows, parsed by a pool of processes over
+    chunks of chunk_bytes of the log file, in the order of the file.
+    At most two chunks per process are parsed ahead of the consumer,
+    so a slow writer does not pile up the rows of the whole file.
+
+    :param errors: List collecting (chunk start, number of lines not
+                   parsed, first of them) of the chunks with errors.
+    """
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(log_file)
+    chunks = ((log_file, start, min(start + chunk_bytes, size))
+              for start in range(0, size, chunk_bytes))
+    with Pool(workers) as pool:
+        in_flight = deque()
+        for chunk in islice(chunks, workers * 2):
+            in_flight.append((chunk[1], pool.apply_async(_chunk_rows, (chunk,))))
+        while in_flight:
+            start, result = in_flight.popleft()
+            rows, error_count, first_error = result.get()
+            # Submit the next chunk before the consumer takes these rows
+            for chunk in islice(chunks, 1):
+                in_flight.append((chunk[1], pool.apply_async(_chunk_rows, (chunk,))))
+            if error_count and errors is not None:
+                errors.append((start, error_count, first_error))
+            yield rows
+
+
+# Function to save extracted metrics to an Excel file
+def save_metrics_to_excel(row_batches, output_file):
+    """
+    Stream batches of rows to a write-only workbook, continued on new
+    'Metrics N' sheets past the row limit of a sheet.
+
+    :return: Number of rows written.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws, sheet_rows, count = None, MAX_SHEET_ROWS, 0
+
+    for rows in row_batches:
+        for row in rows:
+            if sheet_rows == MAX_SHEET_ROWS:
+                ws = wb.create_sheet("Metrics" if ws is None else f"Metrics {len(wb.worksheets) + 1}")
+                ws.append(HEADERS)
+                sheet_rows = 0
+            ws.append(row)
+            sheet_rows += 1
+            count += 1
 
+    if ws is None:
+        wb.create_sheet("Metrics").append(HEADERS)
     # Save the workbook to the file
     wb.save(output_file)
+    return count
 
 
 # Main function
 if __name__ == "__main__":
-    log_file = "metrics_logs.json"  # Path to your log file
-    output_file = "k6_metrics_Warm_Start_Test_400vm_4m.xlsx"  # Path to the output Excel file
+    parser = argparse.ArgumentParser(description='Save the k6 console metrics to an Excel file.')
+    parser.add_argument('log_file', nargs='?', default="metrics_logs.json")  # Path to your log file
+    parser.add_argument('output_file', nargs='?', default="k6_metrics_Warm_Start_Test_400vm_4m.xlsx")
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes parsing the log, 0 for one per core')
+    args = parser.parse_args()
 
     # Extract metrics data from the log file
-    metrics_data = extract_metrics_from_log(log_file)
+    errors = []
+    if args.workers == 1:
+        row_batches = iter_rows(args.log_file, errors=errors)
+    else:
+        row_batches = iter_rows_parallel(args.log_file, args.workers or None, errors=errors)
 
     # Save the extracted data to an Excel file
-    save_metrics_to_excel(metrics_data, output_file)
+    count = save_metrics_to_excel(row_batches, args.output_file)
 
-    print(f"Metrics data has been saved to {output_file}.")
+    if args.workers != 1:
+        # One (chunk start, lines, first line) per chunk with errors
+        errors = [(error_count, first_error) for _, error_count, first_error in errors]
+    else:
+        errors = [(1, line) for line in errors]
+    if errors:
+        print(f"{sum(error_count for error_count, _ in errors)} lines could not be parsed, "
+              f"first one: {errors[0][1]}")
+    print(f"{count} rows of metrics data have been saved to {args.output_file}.")
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from console_to_excel import (convert_dub_datetime, convert_dub_datetimes, iter_log_lines,
+                              iter_rows, iter_rows_parallel)
+
+LINE = ('INFO[0006] {"url":"http://127.0.0.1:7080/","timestamp":"2024-12-30T19:59:%02d.739Z",'
+        '"vus":1,"iterations":%d,"http_req_duration":471.488,"http_req_waiting":471.429,'
+        '"http_req_failed":0,"iteration_duration":null,"http_reqs":1}  source=console\n')
+
+
+class Test_Console_To_Excel(unittest.TestCase):
+    """Tests the sequential and parallel parsing of a k6 console log."""
+
+    def setUp(self):
+        # Initiation: 100 lines of the same length
+        self.lines = [LINE % (i % 60, i % 10) for i in range(100)]
+        fd, self.log_file = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as file:
+            file.writelines(self.lines)
+
+    def tearDown(self):
+        os.remove(self.log_file)
+
+    def test_lines_on_chunk_boundaries(self):
+        # Test: every chunk starts exactly at the first byte of a line
+        chunk_bytes = 10 * len(self.lines[0])
+        size = os.path.getsize(self.log_file)
+        lines = [line for start in range(0, size, chunk_bytes)
+                 for line in iter_log_lines(self.log_file, start, start + chunk_bytes)]
+
+        # Assertions
+        self.assertEqual(lines, self.lines)
+
+    def test_lines_inside_chunks(self):
+        # Test: the chunks start and end inside the lines
+        size = os.path.getsize(self.log_file)
+        lines = [line for start in range(0, size, 1000)
+                 for line in iter_log_lines(self.log_file, start, start + 1000)]
+
+        # Assertions
+        self.assertEqual(lines, self.lines)
+
+    def test_parallel_equals_sequential(self):
+        # Test
+        sequential = [row for rows in iter_rows(self.log_file) for row in rows]
+        errors = []
+        parallel = [row for rows in iter_rows_parallel(
+            self.log_file, workers=2, chunk_bytes=10 * len(self.lines[0]), errors=errors)
+            for row in rows]
+
+        # Assertions
+        self.assertEqual(len(sequential), 100)
+        self.assertEqual(parallel, sequential)
+        self.assertEqual(errors, [])
+
+    def test_parallel_errors(self):
+        # Initiation: one line of broken JSON in the second chunk
+        with open(self.log_file, 'a') as file:
+            file.write('INFO[0007] {"url": broken}  source=console\n')
+
+        # Test
+        errors = []
+        rows = [row for rows in iter_rows_parallel(self.log_file, workers=2,
+                                                   chunk_bytes=50 * len(self.lines[0]),
+                                                   errors=errors)
+                for row in rows]
+
+        # Assertions
+        self.assertEqual(len(rows), 100)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0][1:], (1, 'INFO[0007] {"url": broken}  source=console\n'))
+
+    def test_convert_dub_datetimes(self):
+        # Initiation: winter, summer and the hours around a DST change
+        timestamps = ['2024-12-30T19:59:01.739Z', '2024-07-01T12:00:00.000Z',
+                      '2024-03-31T00:59:59.999Z', '2024-03-31T01:00:00.000Z',
+                      '2024-10-27T00:30:00.500Z', '2024-10-27T01:30:00.000Z']
+
+        # Assertions
+        self.assertEqual(convert_dub_datetimes(timestamps),
+                         [convert_dub_datetime(timestamp) for timestamp in timestamps])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Compute kernels of the synthetic request work: count from 0 to `val`.
+
+python      -- The interpreted while loop, the reference (~50-100 ms).
+numpy       -- The same count in vectorized chunks of ones.
+closed_form -- The arithmetic result of the loop, constant time.
+
+All kernels return the same number for every input, only the CPU cost
+of a request changes. Kernels are module level functions so that they
+can be sent to the process pool. numpy is only imported by the first
+numpy request, the other kernels leave it out of the worker memory.
+
+Usage:
+    python -m app.kernels
+"""
+
+import time
+
+CHUNK = 1 << 16  # Ones per vectorized step, keeps the memory small
+
+
+def count_python(val: int) -> int:
+    """
+    :param val: Number to count to.
+    :return: The counted number.
+    """
+    n = 0
+    while n < val:
+        n += 1
+    return n
+
+
+def count_numpy(val: int) -> int:
+    import numpy as np
+
+    n = 0
+    ones = np.ones(CHUNK, dtype=np.int64)
+    for start in range(0, max(val, 0), CHUNK):
+        n += int(ones[:min(CHUNK, val - start)].sum())
+    return n
+
+
+def count_closed_form(val: int) -> int:
+    return max(val, 0)
+
+
+KERNELS = {
+    'python': count_python,
+    'numpy': count_numpy,
+    'closed_form': count_closed_form,
+}
+
+
+if __name__ == '__main__':
+    val = 1_000_000
+    for name, kernel in KERNELS.items():
+        started = time.perf_counter()
+        for _ in range(10):
+            result = kernel(val)
+        elapsed = (time.perf_counter() - started) / 10
+        print(f"{name:<12}{result:>10}{elapsed * 1000:>10.3f} ms")
@@ -1,25 +1,217 @@
+import asyncio
+import math
 import os
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Optional
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from .kernels import KERNELS
+from .server import available_cpus
+from .stats import Request_Stats, shared_stats_from_env, timed_call
+
+EXECUTION_MODES = ('inline', 'threadpool', 'process')
+
+
+class Overloaded(Exception):
+    """Raised when the bounded work queue is full."""
+
+
+class Work_Executor:
+    """
+    Runs the CPU bound work of the requests:
+
+    inline     -- on the event loop, one request at a time.
+    threadpool -- on `pool_size` threads, serialized by the GIL.
+    process    -- on `pool_size` processes, one core each.
+
+    At most `pool_size + max_queue` requests wait for the pool, any
+    further request is shed so the Pod answers 503 instead of queueing
+    without bound.
+    """
+
+    def __init__(self, mode: str = 'threadpool', pool_size: int = 1, max_queue: int = 0):
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode '{mode}', use one of {EXECUTION_MODES}.")
+        self.mode = mode
+        self.pool_size = pool_size
+        self.max_queue = max_queue
+        self.pending = 0  # Only changed on the event loop
+        self.on_pending = None  # Called after `pending` changed
+        self._executor = None
+
+    def start(self) -> None:
+        if self.mode == 'threadpool':
+            self._executor = ThreadPoolExecutor(self.pool_size, thread_name_prefix='work')
+        elif self.mode == 'process':
+            self._executor = ProcessPoolExecutor(self.pool_size)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, func, *args):
+        """
+        :return: Result of func(*args).
+        :raise Overloaded: When the queue is full.
+        """
+        result, _, _ = await self.run_timed(func, *args)
+        return result
+
+    async def run_timed(self, func, *args) -> tuple:
+        """
+        :return: (result, seconds waiting for the pool, seconds computing)
+        :raise Overloaded: When the queue is full.
+        """
+        submitted = time.time()
+        if self.mode == 'inline':
+            started, compute_seconds, result = timed_call(func, *args)
+            return result, 0.0, compute_seconds
+
+        if self.pending >= self.pool_size + self.max_queue:
+            raise Overloaded()
+        self._set_pending(self.pending + 1)
+        try:
+            started, compute_seconds, result = await asyncio.get_running_loop().run_in_executor(
+                self._executor, timed_call, func, *args)
+        finally:
+            self._set_pending(self.pending - 1)
+        return result, max(0.0, started - submitted), compute_seconds
+
+    def _set_pending(self, pending: int) -> None:
+        self.pending = pending
+        if self.on_pending is not None:
+            self.on_pending()
+
+
+def executor_from_env() -> Work_Executor:
+    """
+    EXECUTION_MODE   -- inline, threadpool (default) or process.
+    WORKER_POOL_SIZE -- Threads or processes, default the available
+                        cores shared by the WEB_CONCURRENCY workers.
+    MAX_QUEUE        -- Requests waiting for the pool before 503s, default 100.
+    """
+    workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+    pool_size = max(1, math.ceil(available_cpus() / workers))
+    return Work_Executor(os.environ.get('EXECUTION_MODE', 'threadpool'),
+                         int(os.environ.get('WORKER_POOL_SIZE', pool_size)),
+                         int(os.environ.get('MAX_QUEUE', 100)))
+
+
+executor = executor_from_env()
+default_kernel = os.environ.get('KERNEL', 'python')
+stats = Request_Stats()
+# Counters of all the uvicorn workers, None when run without app.server
+shared_stats = shared_stats_from_env(stats.window)
+ready = False
+
+
+def publish_stats() -> None:
+    if shared_stats is not None:
+        shared_stats.publish(stats, executor.pending)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global ready
+    executor.start()
+    if shared_stats is not None:
+        shared_stats.open()
+        executor.on_pending = publish_stats
+    ready = True
+    yield
+    # Requests in flight were drained by uvicorn, stop the pool
+    ready = False
+    executor.shutdown()
+    if shared_stats is not None:
+        shared_stats.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
-app = FastAPI()
 
 @app.get("/")
-def root():
+async def root(kernel: Optional[str] = None):
     """
     Handles a request to execute iterations of a while loop until a
     randomly generated value meets a specific condition.
 
+    :param kernel: 'python', 'numpy' or 'closed_form', by default the
+                   KERNEL environment variable or 'python'.
     :return: A JSON response containing the result of the loop execution.
     """
-    n = 0
+    kernel = kernel or default_kernel
+    if kernel not in KERNELS:
+        raise HTTPException(status_code=400,
+                            detail=f"Unknown kernel '{kernel}', use one of {sorted(KERNELS)}.")
 
     val = get_random_number(500_000, 1_000_000)
-    while n < val:
-        n += 1
+    started = stats.start()
+    publish_stats()
+    try:
+        _, queue_seconds, compute_seconds = await executor.run_timed(KERNELS[kernel], val)
+    except Overloaded:
+        stats.reject(started)
+        publish_stats()
+        raise HTTPException(status_code=503, detail="Server overloaded, retry later.",
+                            headers={"Retry-After": "1"})
+    except BaseException:
+        stats.reject(started)
+        publish_stats()
+        raise
+    stats.finish(started, queue_seconds, compute_seconds)
+    publish_stats()
     return {f"Counted till random number: {val} "}
 
+
+@app.get("/stats")
+async def request_stats():
+    """
+    Server side statistics of the Pod: requests in flight, rolling
+    requests per second and pending work summed over the uvicorn
+    workers, queue / compute / total latency in seconds of this worker.
+    """
+    snapshot = {**stats.snapshot(), 'pending': executor.pending,
+                'pool_size': executor.pool_size, 'mode': executor.mode, 'workers': 1}
+    if shared_stats is not None:
+        snapshot.update(shared_stats.totals())
+    return snapshot
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """:return: The statistics of /stats in the Prometheus text format."""
+    totals = shared_stats.totals() if shared_stats is not None else {'pending': executor.pending}
+    return stats.render_prometheus({'work_pending': totals.pop('pending'),
+                                    'work_pool_size': executor.pool_size}, totals)
+
+
+@app.get("/healthz")
+async def liveness():
+    """
+    Liveness probe, answered by the event loop so it stays fast while
+    the work pool is saturated (not in the inline mode).
+    """
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+async def readiness():
+    """
+    Readiness probe, ready from start-up until shutdown begins. A busy
+    Pod stays ready, the 503s of a full queue shed the excess load.
+    """
+    if not ready:
+        raise HTTPException(status_code=503, detail="Not ready.")
+    return {"status": "ready", "mode": executor.mode,
+            "pending": executor.pending, "pool_size": executor.pool_size}
+
+
 def get_random_number(min_value: int, max_value:int) -> int:
     """
     Generates a random integer between min_value and max_value (inclusive),
@@ -0,0 +1,88 @@
+"""
+Runs the app with uvicorn in multi-worker mode.
+
+The number of workers comes from WEB_CONCURRENCY or, by default, from
+the CPU quota of the container cgroup, so a Pod with a larger CPU limit
+serves more requests in parallel. On SIGTERM uvicorn stops accepting
+connections and waits up to GRACEFUL_TIMEOUT seconds for the requests
+in flight.
+
+Usage:
+    python -m app.server
+"""
+
+import math
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+CGROUP_V2_CPU_MAX = '/sys/fs/cgroup/cpu.max'
+CGROUP_V1_QUOTA = '/sys/fs/cgroup/cpu/cpu.cfs_quota_us'
+CGROUP_V1_PERIOD = '/sys/fs/cgroup/cpu/cpu.cfs_period_us'
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit(cpu_max: str = CGROUP_V2_CPU_MAX, quota: str = CGROUP_V1_QUOTA,
+                     period: str = CGROUP_V1_PERIOD) -> Optional[float]:
+    """
+    :return: CPU limit of the container in cores, None without a limit.
+    """
+    value = _read(cpu_max)
+    if value is not None:
+        limit, _, cfs_period = value.partition(' ')
+        if limit == 'max':
+            return None
+        return int(limit) / int(cfs_period or 100_000)
+
+    cfs_quota, cfs_period = _read(quota), _read(period)
+    if cfs_quota is None or cfs_period is None or int(cfs_quota) <= 0:
+        return None
+    return int(cfs_quota) / int(cfs_period)
+
+
+def available_cpus() -> float:
+    """:return: Cores the container may use, the cgroup limit or the CPU count."""
+    cpu_count = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    return cpu_count if limit is None else min(limit, cpu_count)
+
+
+def worker_count() -> int:
+    """:return: WEB_CONCURRENCY or one worker per (started) core."""
+    if 'WEB_CONCURRENCY' in os.environ:
+        return max(1, int(os.environ['WEB_CONCURRENCY']))
+    return max(1, math.ceil(available_cpus()))
+
+
+def run() -> None:
+    import uvicorn
+
+    workers = worker_count()
+    # Inherited by the workers, which size their work pools from it
+    os.environ['WEB_CONCURRENCY'] = str(workers)
+    # Directory the workers publish their counters to, summed by /stats
+    stats_dir = None
+    if 'STATS_DIR' not in os.environ:
+        stats_dir = os.environ['STATS_DIR'] = tempfile.mkdtemp(prefix='app-stats-')
+    try:
+        uvicorn.run('app.main:app',
+                    host=os.environ.get('HOST', '0.0.0.0'),
+                    port=int(os.environ.get('PORT', 80)),
+                    workers=workers,
+                    timeout_graceful_shutdown=int(os.environ.get('GRACEFUL_TIMEOUT', 25)),
+                    timeout_keep_alive=int(os.environ.get('KEEP_ALIVE', 5)))
+    finally:
+        if stats_dir is not None:
+            shutil.rmtree(stats_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run()
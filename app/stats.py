@@ -0,0 +1,234 @@
+"""
+Server side statistics of the requests: time spent waiting for the
+work pool versus computing, requests in flight and a rolling requests
+per second figure.
+
+The numbers are per worker process. They are updated on the event loop
+only, so recording needs no locks. With several uvicorn workers each one
+also publishes its counters to a memory mapped file of a directory the
+workers share (cls: Shared_Stats()), so /stats reports the whole Pod.
+"""
+
+import mmap
+import os
+import struct
+import time
+from collections import deque
+from typing import Optional
+
+
+def timed_call(func, *args):
+    """
+    Run func(*args) in the work pool and time it there.
+
+    :return: (wall clock start, compute seconds, result), the wall clock
+             is comparable between the processes of the host.
+    """
+    started = time.time()
+    started_perf = time.perf_counter()
+    result = func(*args)
+    return started, time.perf_counter() - started_perf, result
+
+
+class Request_Stats:
+    """Rolling statistics of the requests of one worker."""
+
+    def __init__(self, window: int = 10, samples: int = 1024, clock=time.monotonic):
+        """
+        :param window: Seconds the requests per second are averaged over.
+        :param samples: Recent requests the latency percentiles cover.
+        :param clock: Monotonic clock, replaceable in tests.
+        """
+        self.window = window
+        self.clock = clock
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        # One bucket per second, plus the current one
+        self._seconds = [-1] * (window + 1)  # Second each bucket counts
+        self._counts = [0] * (window + 1)
+        self._queue = deque(maxlen=samples)
+        self._compute = deque(maxlen=samples)
+        self._total = deque(maxlen=samples)
+
+    def start(self) -> float:
+        """:return: Start time to pass to finish() or reject()."""
+        self.in_flight += 1
+        return self.clock()
+
+    def finish(self, started: float, queue_seconds: float, compute_seconds: float) -> None:
+        now = self.clock()
+        self.in_flight -= 1
+        self.completed += 1
+        self._queue.append(queue_seconds)
+        self._compute.append(compute_seconds)
+        self._total.append(now - started)
+
+        second = int(now)
+        index = second % len(self._counts)
+        if self._seconds[index] != second:
+            self._seconds[index] = second
+            self._counts[index] = 0
+        self._counts[index] += 1
+
+    def reject(self, started: float) -> None:
+        self.in_flight -= 1
+        self.rejected += 1
+
+    def rps(self) -> float:
+        """:return: Requests completed per second over the last complete seconds."""
+        now = int(self.clock())
+        return sum(count for second, count in zip(self._seconds, self._counts)
+                   if now - self.window <= second < now) / self.window
+
+    @staticmethod
+    def _percentiles(samples: deque) -> dict:
+        """Linear interpolation between the closest ranks, like numpy.percentile()."""
+        if not samples:
+            return {'p50': None, 'p95': None, 'p99': None}
+        ordered = sorted(samples)
+        result = {}
+        for q in (50, 95, 99):
+            rank = (len(ordered) - 1) * q / 100
+            low = int(rank)
+            high = min(low + 1, len(ordered) - 1)
+            result[f'p{q}'] = ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+        return result
+
+    def snapshot(self) -> dict:
+        """:return: All statistics, latencies in seconds."""
+        return {
+            'in_flight': self.in_flight,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'rps': self.rps(),
+            'queue_seconds': self._percentiles(self._queue),
+            'compute_seconds': self._percentiles(self._compute),
+            'total_seconds': self._percentiles(self._total),
+        }
+
+    def render_prometheus(self, gauges: dict = None, totals: dict = None) -> str:
+        """
+        :param gauges: Extra {name: value} gauges of the app.
+        :param totals: Counters of all the workers, see cls: Shared_Stats().
+        :return: The snapshot in the Prometheus text exposition format.
+        """
+        snapshot = {**self.snapshot(), **(totals or {})}
+        metrics = [('requests_in_flight', 'gauge', snapshot['in_flight']),
+                   ('requests_completed_total', 'counter', snapshot['completed']),
+                   ('requests_rejected_total', 'counter', snapshot['rejected']),
+                   ('requests_per_second', 'gauge', snapshot['rps'])]
+        metrics += [(name, 'gauge', value) for name, value in (gauges or {}).items()]
+
+        lines = []
+        for name, kind, value in metrics:
+            lines.append(f'# TYPE app_{name} {kind}')
+            lines.append(f'app_{name} {float(value)!r}')
+        for stage in ('queue', 'compute', 'total'):
+            lines.append(f'# TYPE app_request_{stage}_seconds summary')
+            for quantile, value in snapshot[f'{stage}_seconds'].items():
+                if value is not None:
+                    lines.append(f'app_request_{stage}_seconds'
+                                 f'{{quantile="0.{quantile[1:]}"}} {value!r}')
+        return '\n'.join(lines) + '\n'
+
+
+class Shared_Stats:
+    """
+    Counters of all the workers of a Pod. Every worker owns one memory
+    mapped file `<pid>.stats` of the directory and rewrites it on each
+    change, /stats sums the files of the live workers. The latency
+    percentiles stay per worker.
+    """
+
+    COUNTERS = ('in_flight', 'completed', 'rejected', 'pending')
+
+    def __init__(self, directory: str, window: int = 10, clock=time.monotonic):
+        """
+        :param directory: Directory shared by the workers of the Pod.
+        :param window: Seconds of the requests per second, as Request_Stats.
+        :param clock: Clock shared by the processes of the host.
+        """
+        self.directory = directory
+        self.window = window
+        self.clock = clock
+        # Counters, window, then the second and count of each rps bucket
+        self._layout = struct.Struct(f'<{len(self.COUNTERS) + 1 + 2 * (window + 1)}q')
+        self._map = None
+        self._path = None
+
+    def open(self) -> 'Shared_Stats':
+        os.makedirs(self.directory, exist_ok=True)
+        self._path = os.path.join(self.directory, f'{os.getpid()}.stats')
+        with open(self._path, 'wb') as file:
+            file.write(self._layout.pack(*[0] * len(self.COUNTERS), self.window,
+                                         *[-1] * (self.window + 1), *[0] * (self.window + 1)))
+        with open(self._path, 'r+b') as file:
+            self._map = mmap.mmap(file.fileno(), self._layout.size)
+        return self
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            try:
+                os.remove(self._path)
+            except OSError:
+                pass
+
+    def publish(self, stats: Request_Stats, pending: int) -> None:
+        """Write the counters of this worker."""
+        if self._map is None:
+            return
+        self._layout.pack_into(self._map, 0, stats.in_flight, stats.completed, stats.rejected,
+                               pending, stats.window, *stats._seconds, *stats._counts)
+
+    @staticmethod
+    def _alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def totals(self) -> dict:
+        """:return: Counters and requests per second summed over the live workers."""
+        totals = dict.fromkeys(self.COUNTERS, 0)
+        totals['rps'] = 0.0
+        totals['workers'] = 0
+        now = int(self.clock())
+        size = len(self.COUNTERS)
+        for name in os.listdir(self.directory):
+            pid, _, suffix = name.partition('.')
+            if suffix != 'stats' or not pid.isdigit():
+                continue
+            path = os.path.join(self.directory, name)
+            if not self._alive(int(pid)):
+                # Worker restarted by uvicorn, its file is stale
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path, 'rb') as file:
+                    values = self._layout.unpack(file.read(self._layout.size))
+            except (OSError, struct.error):
+                continue
+            for key, value in zip(self.COUNTERS, values):
+                totals[key] += value
+            window = values[size]
+            seconds = values[size + 1:size + 2 + window]
+            counts = values[size + 2 + window:]
+            totals['rps'] += sum(count for second, count in zip(seconds, counts)
+                                 if now - window <= second < now) / window
+            totals['workers'] += 1
+        return totals
+
+
+def shared_stats_from_env(window: int = 10) -> Optional[Shared_Stats]:
+    """:return: cls: Shared_Stats() of STATS_DIR, None when not set."""
+    directory = os.environ.get('STATS_DIR')
+    return Shared_Stats(directory, window) if directory else None
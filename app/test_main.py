@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import unittest
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.kernels import KERNELS, count_python as count_to
+from app.main import Overloaded, Work_Executor
+
+
+class Test_Root(unittest.TestCase):
+    """Tests the / endpoint in every execution mode."""
+
+    def setUp(self):
+        self.default_executor = main.executor
+
+    def tearDown(self):
+        main.executor = self.default_executor
+
+    def test_execution_modes(self):
+        for mode in ('inline', 'threadpool', 'process'):
+            # Initiation
+            main.executor = Work_Executor(mode, pool_size=2, max_queue=2)
+
+            # Test
+            with TestClient(main.app) as test_client:
+                response = test_client.get('/')
+
+            # Assertions
+            self.assertEqual(response.status_code, 200, mode)
+            self.assertIn('Counted till random number: ', response.json()[0])
+
+    def test_overloaded(self):
+        # Initiation
+        main.executor = Work_Executor('threadpool', pool_size=1, max_queue=0)
+
+        # Test
+        with TestClient(main.app) as test_client:
+            main.executor.pending = 1  # The pool is busy
+            response = test_client.get('/')
+            main.executor.pending = 0
+
+        # Assertions
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+
+class Test_Kernels(unittest.TestCase):
+    """The kernels only differ in their CPU cost."""
+
+    def test_identical_results(self):
+        # Initiation
+        values = [-5, 0, 1, 2, 65_535, 65_536, 65_537, 500_000, 1_000_000]
+
+        # Assertions
+        for val in values:
+            expected = count_to(val)
+            for name, kernel in KERNELS.items():
+                self.assertEqual(kernel(val), expected, (name, val))
+
+    def test_kernel_query_parameter(self):
+        # Test
+        with TestClient(main.app) as test_client:
+            responses = {name: test_client.get('/', params={'kernel': name})
+                         for name in KERNELS}
+            unknown = test_client.get('/', params={'kernel': 'gpu'})
+
+        # Assertions
+        for name, response in responses.items():
+            self.assertEqual(response.status_code, 200, name)
+        self.assertEqual(unknown.status_code, 400)
+
+
+class Test_Stats_Endpoints(unittest.TestCase):
+    """Tests /stats and /metrics of the app."""
+
+    def setUp(self):
+        self.default_stats = main.stats
+        main.stats = main.Request_Stats()
+
+    def tearDown(self):
+        main.stats = self.default_stats
+
+    def test_stats(self):
+        # Test
+        with TestClient(main.app) as test_client:
+            for _ in range(3):
+                test_client.get('/', params={'kernel': 'numpy'})
+            stats = test_client.get('/stats').json()
+            metrics = test_client.get('/metrics')
+
+        # Assertions
+        self.assertEqual(stats['completed'], 3)
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertGreaterEqual(stats['rps'], 0)
+        self.assertGreater(stats['compute_seconds']['p50'], 0)
+        self.assertGreaterEqual(stats['queue_seconds']['p50'], 0)
+        self.assertGreaterEqual(stats['total_seconds']['p99'], stats['compute_seconds']['p50'])
+        self.assertTrue(metrics.headers['Content-Type'].startswith('text/plain'))
+        self.assertIn('app_requests_completed_total 3.0\n', metrics.text)
+        self.assertIn('app_request_compute_seconds{quantile="0.95"}', metrics.text)
+
+
+class Test_Probes(unittest.TestCase):
+    """Tests the liveness and readiness endpoints."""
+
+    def test_probes(self):
+        # Test
+        with TestClient(main.app) as test_client:
+            liveness = test_client.get('/healthz')
+            readiness = test_client.get('/readyz')
+
+        # Assertions
+        self.assertEqual(liveness.status_code, 200)
+        self.assertEqual(readiness.status_code, 200)
+        self.assertEqual(readiness.json()['mode'], main.executor.mode)
+        self.assertFalse(main.ready)
+
+    def test_not_ready_outside_lifespan(self):
+        # Assertions
+        self.assertEqual(TestClient(main.app).get('/readyz').status_code, 503)
+
+
+class Test_Work_Executor(unittest.TestCase):
+    """Tests the bounded queue of cls: Work_Executor()"""
+
+    def test_load_shedding(self):
+        # Initiation
+        executor = Work_Executor('threadpool', pool_size=1, max_queue=1)
+        release = threading.Event()
+
+        async def submit():
+            executor.start()
+            try:
+                blocked = [asyncio.ensure_future(executor.run(release.wait))
+                           for _ in range(2)]
+                await asyncio.sleep(0.05)
+                with self.assertRaises(Overloaded):
+                    await executor.run(count_to, 10)
+                release.set()
+                await asyncio.gather(*blocked)
+                return await executor.run(count_to, 10)
+            finally:
+                executor.shutdown()
+
+        # Test
+        result = asyncio.run(submit())
+
+        # Assertions
+        self.assertEqual(result, 10)
+        self.assertEqual(executor.pending, 0)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            Work_Executor('gpu')
+
+
+if __name__ == '__main__':
+    unittest.main()
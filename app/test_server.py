@@ -0,0 +1,116 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import urllib.error
+import urllib.request
+from unittest import mock
+
+from app import server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Test_Cpu_Quota(unittest.TestCase):
+    """Tests the cgroup CPU limit parsing of func: cgroup_cpu_limit()"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name: str, content: str) -> str:
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as file:
+            file.write(content)
+        return path
+
+    def missing(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def test_cgroup_v2(self):
+        # Assertions
+        self.assertEqual(server.cgroup_cpu_limit(self.write('cpu.max', '150000 100000\n')), 1.5)
+        self.assertEqual(server.cgroup_cpu_limit(self.write('cpu.max', '10000 100000')), 0.1)
+        self.assertIsNone(server.cgroup_cpu_limit(self.write('cpu.max', 'max 100000')))
+
+    def test_cgroup_v1(self):
+        # Initiation
+        period = self.write('period', '100000')
+
+        # Assertions
+        self.assertEqual(server.cgroup_cpu_limit(self.missing('cpu.max'),
+                                                 self.write('quota', '200000'), period), 2.0)
+        self.assertIsNone(server.cgroup_cpu_limit(self.missing('cpu.max'),
+                                                  self.write('quota', '-1'), period))
+        self.assertIsNone(server.cgroup_cpu_limit(self.missing('cpu.max'),
+                                                  self.missing('quota'), period))
+
+    def test_worker_count(self):
+        with mock.patch.dict(os.environ, {'WEB_CONCURRENCY': '3'}):
+            self.assertEqual(server.worker_count(), 3)
+
+        with mock.patch.dict(os.environ), \
+                mock.patch.object(server, 'cgroup_cpu_limit', return_value=0.1), \
+                mock.patch('os.cpu_count', return_value=8):
+            os.environ.pop('WEB_CONCURRENCY', None)
+            self.assertEqual(server.worker_count(), 1)
+
+        with mock.patch.dict(os.environ), \
+                mock.patch.object(server, 'cgroup_cpu_limit', return_value=2.5), \
+                mock.patch('os.cpu_count', return_value=8):
+            os.environ.pop('WEB_CONCURRENCY', None)
+            self.assertEqual(server.worker_count(), 3)
+
+
+class Test_Server_Process(unittest.TestCase):
+    """Starts `python -m app.server` with two workers."""
+
+    def test_serve_and_graceful_shutdown(self):
+        # Initiation
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        env = dict(os.environ, PORT=str(port), HOST='127.0.0.1', WEB_CONCURRENCY='2',
+                   EXECUTION_MODE='process', WORKER_POOL_SIZE='1')
+        process = subprocess.Popen([sys.executable, '-m', 'app.server'], cwd=ROOT, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        # Test
+        try:
+            ready = None
+            for _ in range(100):
+                try:
+                    with urllib.request.urlopen(f'http://127.0.0.1:{port}/readyz') as response:
+                        ready = response.status
+                    break
+                except (urllib.error.URLError, ConnectionError):
+                    time.sleep(0.1)
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/') as response:
+                body = response.read().decode()
+            # Whichever worker answers, /stats counts the requests of both
+            for _ in range(50):
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/stats') as response:
+                    pod_stats = json.load(response)
+                if pod_stats['workers'] == 2:
+                    break
+                time.sleep(0.1)
+        finally:
+            process.send_signal(signal.SIGTERM)
+            returncode = process.wait(timeout=30)
+
+        # Assertions
+        self.assertEqual(ready, 200)
+        self.assertIn('Counted till random number: ', body)
+        self.assertEqual((pod_stats['workers'], pod_stats['completed']), (2, 1))
+        self.assertEqual(returncode, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from app.stats import Request_Stats, Shared_Stats, timed_call
+
+
+class Fake_Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Test_Request_Stats(unittest.TestCase):
+    """Tests cls: Request_Stats() on a fake clock."""
+
+    def setUp(self):
+        self.clock = Fake_Clock()
+        self.stats = Request_Stats(window=10, clock=self.clock)
+
+    def test_rolling_rps(self):
+        # Initiation: 5 requests per second for 20 seconds
+        for _ in range(20):
+            for _ in range(5):
+                self.stats.finish(self.stats.start(), 0.0, 0.1)
+            self.clock.now += 1
+
+        # Assertions
+        self.assertEqual(self.stats.rps(), 5.0)
+        self.clock.now += 5
+        self.assertEqual(self.stats.rps(), 2.5)
+        self.clock.now += 10
+        self.assertEqual(self.stats.rps(), 0.0)
+
+    def test_in_flight_and_latency(self):
+        # Initiation
+        first = self.stats.start()
+        second = self.stats.start()
+        rejected = self.stats.start()
+
+        # Test
+        self.stats.reject(rejected)
+        in_flight = self.stats.in_flight
+        self.clock.now += 0.5
+        self.stats.finish(first, 0.2, 0.3)
+        snapshot = self.stats.snapshot()
+
+        # Assertions
+        self.assertEqual(in_flight, 2)
+        self.assertEqual(snapshot['in_flight'], 1)
+        self.assertEqual(snapshot['rejected'], 1)
+        self.assertEqual(snapshot['queue_seconds']['p50'], 0.2)
+        self.assertEqual(snapshot['compute_seconds']['p99'], 0.3)
+        self.assertEqual(snapshot['total_seconds']['p95'], 0.5)
+        self.stats.finish(second, 0.0, 0.0)
+        self.assertEqual(self.stats.in_flight, 0)
+
+    def test_empty(self):
+        # Assertions
+        self.assertIsNone(self.stats.snapshot()['total_seconds']['p50'])
+        self.assertNotIn('quantile', self.stats.render_prometheus())
+
+    def test_percentiles_like_numpy(self):
+        # Initiation
+        import numpy as np
+        samples = [0.05 * i * i % 1.7 for i in range(137)]
+        for sample in samples:
+            self.stats.finish(self.stats.start(), 0.0, sample)
+
+        # Test
+        percentiles = self.stats.snapshot()['compute_seconds']
+
+        # Assertions
+        for q, expected in zip((50, 95, 99), np.percentile(samples, [50, 95, 99])):
+            self.assertAlmostEqual(percentiles[f'p{q}'], expected)
+
+    def test_no_numpy_at_import(self):
+        # Test: the app alone must fit the memory limit of the Pod
+        result = subprocess.run(
+            [sys.executable, '-c', "import sys, app.main; print('numpy' in sys.modules)"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+        # Assertions
+        self.assertEqual(result.stdout.strip(), 'False')
+
+    def test_timed_call(self):
+        started, compute_seconds, result = timed_call(sum, [1, 2, 3])
+
+        # Assertions
+        self.assertEqual(result, 6)
+        self.assertGreater(started, 0)
+        self.assertGreaterEqual(compute_seconds, 0)
+
+
+def publish_worker(directory, started, stop):
+    """Second worker: 3 requests completed, 1 in flight."""
+    stats = Request_Stats(window=10, clock=Fake_Clock())
+    for _ in range(3):
+        stats.finish(stats.start(), 0.0, 0.1)
+    stats.start()
+    shared_stats = Shared_Stats(directory, 10).open()
+    shared_stats.publish(stats, pending=1)
+    started.set()
+    stop.wait(30)
+    shared_stats.close()
+
+
+class Test_Shared_Stats(unittest.TestCase):
+    """Tests cls: Shared_Stats() with a second worker process."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.clock = Fake_Clock()
+        self.stats = Request_Stats(window=10, clock=self.clock)
+        self.shared_stats = Shared_Stats(self.directory, 10, clock=self.clock).open()
+
+    def tearDown(self):
+        self.shared_stats.close()
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+
+    def test_totals(self):
+        # Initiation: 5 requests completed, 1 rejected by this worker
+        for _ in range(5):
+            self.stats.finish(self.stats.start(), 0.0, 0.1)
+        self.stats.reject(self.stats.start())
+        self.clock.now += 1
+        self.shared_stats.publish(self.stats, pending=2)
+
+        started, stop = multiprocessing.Event(), multiprocessing.Event()
+        worker = multiprocessing.Process(target=publish_worker,
+                                         args=(self.directory, started, stop))
+        worker.start()
+
+        # Test
+        try:
+            self.assertTrue(started.wait(30))
+            totals = self.shared_stats.totals()
+        finally:
+            stop.set()
+            worker.join(30)
+
+        # Assertions: both workers count their requests of second 1000
+        self.assertEqual(totals, {'in_flight': 1, 'completed': 8, 'rejected': 1, 'pending': 3,
+                                  'rps': 0.8, 'workers': 2})
+        self.assertEqual(self.shared_stats.totals()['workers'], 1)
+
+    def test_stale_worker(self):
+        # Initiation: file of a worker that exited
+        with open(os.path.join(self.directory, f'{self.dead_pid()}.stats'), 'wb') as file:
+            file.write(b'\0' * 8)
+
+        # Assertions
+        self.assertEqual(self.shared_stats.totals()['workers'], 1)
+        self.assertEqual(os.listdir(self.directory), [f'{os.getpid()}.stats'])
+
+    @staticmethod
+    def dead_pid() -> int:
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        return process.pid
+
+
+if __name__ == '__main__':
+    unittest.main()